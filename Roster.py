@@ -1,8 +1,19 @@
+from collections import deque
 from datetime import date
 from flight_crew import FlightCrew
 from aircraft import Aircraft
-from flights import Flight
-from backend.connection import db, connection
+from availability import Availability
+from crew_bidding import CrewBidding
+from crew_eligibility import CrewEligibility
+from flight_schedule import FlightSchedule
+from training import Training
+from tail_assignment import TailAssignment
+from crew_pairing import CrewPairing
+from maintenance import Maintenance
+from reserve_planner import ReservePlanner
+from roster_profile import RosterProfile
+from backend.connection import db, read_db
+from change_log import ChangeLog
 from models.roster_model import RosterModel
 
 
@@ -12,6 +23,7 @@ class Roster:
 
     Attributes:
         tablename (str): The name of the table in the database where the monthly roster data is stored.
+        DAYS_IN_MONTHS (dict): The number of days in each month of the roster year.
 
     Methods:
         addPairing(pairing: list) -> None:
@@ -23,17 +35,37 @@ class Roster:
         updatePairing(oldPairing: list, newPairing: list) -> None:
             Updates a pairing in the monthly roster in the database.
 
-        new_monthly_roster(month: int) -> list:
+        new_monthly_roster(month: int, progress=None, uncovered: list = None) -> list:
             Generates a new monthly roster for the specified month.
 
-        addRoster(month: int) -> None:
-            Adds the generated monthly roster to the database.
+        snapshot(month: int) -> dict:
+            Reads the crew, fleet, flights and daily unavailability the roster engine needs into memory.
+
+        generate(snapshot: dict, progress=None, parallel: bool = True, uncovered: list = None) -> list:
+            Runs the roster engine over a snapshot without touching the database.
+
+        addRoster(month: int, progress=None, uncovered: list = None) -> int:
+            Adds the generated monthly roster to the database and accrues its block time to each aircraft's engine hours.
 
         viewYourRoster(sap: int) -> list:
             Retrieves the monthly roster data for a specific flight crew member.
     """
 
     tablename = "monthly_roster"
+    DAYS_IN_MONTHS = {
+        1: 31,
+        2: 28,
+        3: 30,
+        4: 31,
+        5: 30,
+        6: 31,
+        7: 30,
+        8: 31,
+        9: 30,
+        10: 31,
+        11: 30,
+        12: 31,
+    }  # Dict stores no. of days in each month. Used to create only required no. of pairings
 
     @staticmethod
     def addPairing(pairing: list) -> None:
@@ -66,13 +98,15 @@ class Roster:
         )
         query = f"INSERT INTO {Roster.tablename} (date, flight_no, aircraft_msn, p1_id, p2_id) VALUES (%s,%s,%s,%s,%s)"
         db.execute(query, tuple(pair.model_dump().values()))
-        connection.commit()
+        ChangeLog.record(Roster.tablename, "add", f"{pair.flight_date}/{pair.flight_no}", pair.model_dump())
+        ChangeLog.commit()
 
     @staticmethod
     def deletePairing(flight_no, p1_id: int = False, p2_id: int = False) -> None:
         queryDel = f"DELETE FROM {Roster.tablename} WHERE p1_id={p1_id} AND p2_id={p2_id} AND flight_no={flight_no}"
         db.execute(queryDel)
-        connection.commit()
+        ChangeLog.record(Roster.tablename, "delete", flight_no, {"p1_id": p1_id, "p2_id": p2_id})
+        ChangeLog.commit()
 
     @staticmethod
     def updatePairing(oldPairing: list, newPairing: list) -> None:
@@ -80,12 +114,18 @@ class Roster:
         Roster.addPairing(newPairing)
 
     @staticmethod
-    def new_monthly_roster(month: int) -> list:
+    def new_monthly_roster(
+        month: int, progress=None, profile: RosterProfile = None, uncovered: list = None
+    ) -> list:
         """
         Generates a new monthly roster for the specified month.
 
         Parameters:
             month (int): The month for which the roster is generated.
+            progress (Callable[[int, int, int], None], optional): Called after every day with the days done, the days
+                to do and the pairings made so far. It may raise to abandon the build.
+            profile (RosterProfile, optional): Collects per-stage timings, query and model counts when given.
+            uncovered (list, optional): Passed on to 'generate'.
 
         Returns:
             list: A list of crew pairings for each day of the month. Each pairing is represented as a tuple with the following elements in order:
@@ -96,106 +136,359 @@ class Roster:
                 - p2 (FlightCrewModel): The second crew member assigned to the flight.
 
         Logic Flow:
-        1. Create a dictionary 'days_in_months' that stores the number of days in each month.
+        1. Read the crew, fleet, flights and each day's unavailable crew and tails into a snapshot with 'snapshot', then run 'generate' over it. 'DAYS_IN_MONTHS' stores the number of days in each month.
         2. Initialize an empty list 'pairs' to store the crew pairings.
         3. Retrieve a list of all available P1 crew members using the 'availableP1' method of the 'FlightCrew' class.
         4. Retrieve a list of all available P2 crew members using the 'availableP2' method of the 'FlightCrew' class.
-        5. Retrieve a list of all flights from the database using the 'allFlights' method of the 'Flight' class.
+        5. Read the daily flight schedule from the database with 'FlightSchedule.load', its times converted to minutes in SQL.
         6. Create two dictionaries 'dutyTimeP1' and 'dutyTimeP2' to store the duty time of each crew member. Initialize the duty time of all crew members to 0.
-        7. Iterate over the range of days in the specified month.
-        8. Iterate over each flight in the list of flights.
+        7. Generate base-to-base pairings for the daily schedule with 'CrewPairing', picking at most as many per base as there are P1/P2 crew based there. Iterate over the range of days in the specified month.
+        8. Retrieve the available aircraft of every type for the day and assign tails to the day's flights with 'TailAssignment.assignDay', keeping each tail's overnight station for the next day and reporting flights left without a tail as uncovered. Give every selected pairing a P1 and a P2 from its base who are not busy that day, then iterate over each flight in the list of flights, recording paired legs with their pairing crew.
         9. Check if the list of available P1 crew members is empty. If it is, retrieve a new list of available P1 crew members.
         10. Check if the list of available P2 crew members is empty. If it is, retrieve a new list of available P2 crew members.
-        11. Retrieve a list of available aircraft of the required type for the current flight using the 'availableFleet' method of the 'Aircraft' class.
-        12. Create a pairing for the current flight by assigning the flight date, flight number, aircraft, and suitable P1 and P2 crew members.
+        11. For legs not covered by a pairing, look up the tail assigned to the current flight. Skip the flight if no tail could be given to its rotation.
+        12. Skip crew booked for a training, on leave or with a lapsed medical on the current date and create a pairing for the current flight by assigning the flight date, flight number, aircraft, and suitable P1 and P2 crew members. When nobody left in a list is free, the list starts again from the whole crew; if still nobody is free, the flight is left uncrewed.
         13. Remove the assigned P1 and P2 crew members from the lists of available crew members.
         14. Append the pairing to the 'pairs' list.
         15. Return the 'pairs' list containing all the crew pairings for each day of the month.
+
+        When crew have bid for the month, steps 9 to 14 are replaced by 'CrewBidding': every day, the pairings and the
+        remaining single legs are handed out to the free P1 and P2 crew by an auction over their bids, senior crew's
+        bids counting for more. Further auction rounds give crew more duties that do not overlap theirs until every
+        duty is crewed or nobody free can take one; flights left without a tail or crew are reported through 'uncovered'.
+        """
+        return Roster.generate(
+            Roster.snapshot(month, profile), progress=progress, profile=profile, uncovered=uncovered
+        )
+
+    @staticmethod
+    def snapshot(month: int, profile: RosterProfile = None) -> dict:
         """
-        days_in_months = {
-            1: 31,
-            2: 28,
-            3: 30,
-            4: 31,
-            5: 30,
-            6: 31,
-            7: 30,
-            8: 31,
-            9: 30,
-            10: 31,
-            11: 30,
-            12: 31,
-        }  # Dict stores no. of days in each month. Used to create only required no. of pairings
+        Reads everything the roster engine needs for a month into memory.
 
+        Parameters:
+            month (int): The month to snapshot.
+            profile (RosterProfile, optional): Collects per-stage timings, query and model counts when given.
+
+        Returns:
+            dict: A dictionary with the following keys:
+                - month (int): The month.
+                - p1 (list[FlightCrewModel]): The available P1 crew.
+                - p2 (list[FlightCrewModel]): The available P2 crew.
+                - schedule (FlightSchedule): The daily flight schedule, its times in minutes.
+                - fleet (list[AircraftModel]): The aircraft with the availability flag set.
+                - busyCrew (dict[date, set[int]]): SAPs (Staff IDs) of crew in training, on leave or with a lapsed
+                  medical, per day.
+                - downTails (dict[date, set[int]]): MSNs of aircraft down or due a maintenance check, per day.
+                - bids (list[tuple]): (sap, bid_type, target, weight) of every crew bid for the month.
+
+        Note:
+            - The snapshot holds only plain models, arrays, sets and dates, so it can be edited freely and sent to
+              worker processes. 'generate' never touches the database.
+        """
+        profile = profile or RosterProfile(enabled=False)
+
+        with profile.stage("unavailability"):
+            # Crew booked for a training are kept off flight duty on that date only
+            inTraining = Training.crewInTraining(
+                date(year=2024, month=month, day=1),
+                date(year=2024, month=month, day=Roster.DAYS_IN_MONTHS[month]),
+            )
+            busyCrew = {}
+            downTails = {}
+            for day in range(1, Roster.DAYS_IN_MONTHS[month]):
+                flt_date = date(year=2024, month=month, day=day)
+                busyCrew[flt_date] = (
+                    inTraining.get(flt_date, set())
+                    | Availability.crewOnLeave(flt_date)
+                    | CrewEligibility.lapsedOn(flt_date)
+                )
+                downTails[flt_date] = Availability.fleetDown(flt_date) | Maintenance.dueBy(flt_date)
+
+        with profile.stage("fleet"):
+            db.execute("SELECT * FROM aircraft_fleet WHERE availability=1")
+            fleet = Aircraft.objectify(db.fetchall())
+        profile.models("AircraftModel", len(fleet))
+
+        with profile.stage("crew"):
+            p1 = FlightCrew.availableP1()  # Returns a list[FlightCrewModel] of all available P1
+            p2 = FlightCrew.availableP2()  # Returns a list[FlightCrewModel] of all available P2
+        profile.models("FlightCrewModel", len(p1) + len(p2))
+
+        with profile.stage("flights"):
+            # Times come as minutes from SQL, so the flights are never validated into models
+            schedule = FlightSchedule.load()
+
+        with profile.stage("bids"):
+            bids = CrewBidding.monthBids(month)
+
+        return {
+            "month": month,
+            "p1": p1,
+            "p2": p2,
+            "schedule": schedule,
+            "fleet": fleet,
+            "busyCrew": busyCrew,
+            "downTails": downTails,
+            "bids": bids,
+        }
+
+    @staticmethod
+    def generate(
+        snapshot: dict, progress=None, parallel: bool = True, profile: RosterProfile = None, uncovered: list = None
+    ) -> list:
+        """
+        Runs the roster engine over a snapshot taken by 'snapshot'. See 'new_monthly_roster' for the logic flow.
+
+        Parameters:
+            snapshot (dict): The crew, fleet, flights and daily unavailability to roster from.
+            progress (Callable[[int, int, int], None], optional): Called after every day with the days done, the days
+                to do and the pairings made so far.
+            parallel (bool, optional): Passed on to 'CrewPairing.generateAll'.
+            profile (RosterProfile, optional): Collects per-stage timings when given.
+            uncovered (list, optional): Receives the (date, flight_no) of every flight left without a tail or crew.
+
+        Returns:
+            list: The crew pairings, as returned by 'new_monthly_roster'.
+        """
+        profile = profile or RosterProfile(enabled=False)
+        uncovered = [] if uncovered is None else uncovered
+        month = snapshot["month"]
         pairs = []  # Empty list to fill Crew Pairings
 
-        availP1 = (
-            FlightCrew.availableP1()
-        )  # Returns a list[FlightCrewModel] of all available P1
-        availP2 = (
-            FlightCrew.availableP2()
-        )  # Returns a list[FlightCrewModel] of all available P2
-        flights = Flight.allFlights()  # Returns a list[Flight] of all flights in the DB
+        availP1 = list(snapshot["p1"])
+        availP2 = list(snapshot["p2"])
 
         dutyTimeP1 = {P1.sap: 0 for P1 in availP1}  # Set duty time 0 of all Crew
         dutyTimeP2 = {P2.sap: 0 for P2 in availP2}  # at the start of a monthly roster cycle
 
-        for day in range(1, days_in_months[month]):
-            for flight in flights:
-
-                # Resets all P1 as available when list of availP1 has been exhausted
-                if not availP1:
-                    availP1 = FlightCrew.availableP1()
-
-                # Resets all P2 as available when list of availP1 has been exhausted
-                if not availP2:
-                    availP2 = FlightCrew.availableP2()
+        # Pairing and tail assignment work on the integer-minute legs of the schedule
+        schedule = snapshot["schedule"]
+        actypes = schedule.actypes
+        positions = {}  # Overnight station of every tail, carried from one day to the next
+
+        # The schedule repeats daily, so base-to-base pairings are searched once for the whole month
+        with profile.stage("pairing search"):
+            legs = CrewPairing.legs(schedule)
+            baseP1 = Roster._crewByBase(availP1)
+            baseP2 = Roster._crewByBase(availP2)
+            capacity = {
+                base: min(len(baseP1[base]), len(baseP2.get(base, ()))) for base in baseP1
+            }
+            pairings = CrewPairing.select(
+                CrewPairing.generateAll(
+                    legs, [base for base in capacity if capacity[base]], parallel=parallel
+                ),
+                legs,
+                capacity,
+            )
+
+        # Crew who bid get their duties from an auction instead of first-come
+        bids = snapshot.get("bids")
+        if bids:
+            with profile.stage("bid evaluation"):
+                duties = CrewBidding.duties(pairings, legs, schedule)
+                biddingP1 = CrewBidding(snapshot["p1"], bids, schedule, duties)
+                biddingP2 = CrewBidding(snapshot["p2"], bids, schedule, duties)
+
+        for day in range(1, Roster.DAYS_IN_MONTHS[month]):
+            flt_date = date(year=2024, month=month, day=day)
+            busy = snapshot["busyCrew"].get(flt_date, set())
+
+            # Chain the day's legs into rotations and give each rotation one tail
+            with profile.stage("tail assignment"):
+                down = snapshot["downTails"].get(flt_date, set())
+                fleet = {
+                    actype: [
+                        aircraft
+                        for aircraft in snapshot["fleet"]
+                        if aircraft.actype == actype and aircraft.msn not in down
+                    ]
+                    for actype in actypes
+                }
+                tailless = []
+                tails = TailAssignment.assignDay(schedule, fleet, positions, tailless)
+                uncovered += [(flt_date, flight_no) for flight_no in tailless]
+
+            if bids:
+                with profile.stage("crew bidding"):
+                    pairs += Roster._crewByBids(flt_date, duties, tails, busy, biddingP1, biddingP2, uncovered)
+            else:
+                with profile.stage("crew selection"):
+                    # Crew the day's pairings from their base first; a crew flies every leg of its pairing
+                    crewed = {}
+                    for base, pairing in pairings:
+                        p1 = Roster._nextFromBase(baseP1[base], busy)
+                        p2 = Roster._nextFromBase(baseP2[base], busy)
+                        if p1 is None or p2 is None:
+                            continue
+                        busy = busy | {p1.sap, p2.sap}
+                        for i in pairing:
+                            crewed[legs[i][4]] = (p1, p2)
+
+                    for flight_no in schedule.flightNo.tolist():
+                        # Legs flown as part of a pairing already have their crew
+                        if flight_no in crewed:
+                            aircraft = tails.get(flight_no)
+                            if aircraft is not None:
+                                p1, p2 = crewed[flight_no]
+                                pairs.append((flt_date, flight_no, aircraft, p1, p2))
+                            continue
+
+                        # Resets all P1 as available when list of availP1 has been exhausted
+                        if not availP1:
+                            availP1 = list(snapshot["p1"])
+
+                        # Resets all P2 as available when list of availP1 has been exhausted
+                        if not availP2:
+                            availP2 = list(snapshot["p2"])
+
+                        # Create pairing for current flight in loop
+                        currentFlightNo = flight_no
+                        aircraft = tails.get(currentFlightNo)
+                        if aircraft is None:
+                            continue
+                        p1 = FlightCrew.find_suitable_P1(availP1, dutyTimeP1, busy)
+                        if p1 is None:
+                            # Everyone left in the list is busy today; start again from the whole crew
+                            availP1 = list(snapshot["p1"])
+                            p1 = FlightCrew.find_suitable_P1(availP1, dutyTimeP1, busy)
+                        p2 = FlightCrew.find_suitable_P2(availP2, dutyTimeP2, busy)
+                        if p2 is None:
+                            availP2 = list(snapshot["p2"])
+                            p2 = FlightCrew.find_suitable_P2(availP2, dutyTimeP2, busy)
+                        if p1 is None or p2 is None:
+                            # No P1 or P2 is free on this date, so the leg is left uncrewed
+                            uncovered.append((flt_date, currentFlightNo))
+                            continue
+
+                        # Delete assigned P1 P2 from available crew lists
+                        availP1.remove(p1)
+                        availP2.remove(p2)
+
+                        pairs.append((flt_date, currentFlightNo, aircraft, p1, p2))
+
+            if progress is not None:
+                progress(day, Roster.DAYS_IN_MONTHS[month] - 1, len(pairs))
+        return pairs
 
-                # Returns list of available aircraft of the required type for each flight in loop
-                availFleet = Aircraft.avaiableFleet(flight.actype)
-                print(availFleet)
-                # Create pairing for current flight in loop
-                flt_date = date(year=2024, month=month, day=day)
-                currentFlightNo = flight.flight_no
-                if not availFleet:
+    @staticmethod
+    def _crewByBids(
+        flt_date: date, duties: list, tails: dict, busy: set, biddingP1, biddingP2, uncovered: list
+    ) -> list:
+        # A duty needs both a P1 and a P2; P2 are only auctioned for the duties that got a P1
+        flying = [
+            index for index, (_, flightNos) in enumerate(duties) if any(flight_no in tails for flight_no in flightNos)
+        ]
+        captains = dict(zip(flying, biddingP1.assign(flt_date, flying, busy)))
+        captained = [index for index in flying if captains[index] is not None]
+        firstOfficers = dict(zip(captained, biddingP2.assign(flt_date, captained, busy)))
+        pairs, crewP1, crewP2 = [], [], []
+        for index in flying:
+            p1, p2 = captains[index], firstOfficers.get(index)
+            if p1 is not None and p2 is not None:
+                # Only duties that are published count towards the crew's monthly balance
+                crewP1.append(p1)
+                crewP2.append(p2)
+            for flight_no in duties[index][1]:
+                aircraft = tails.get(flight_no)
+                if aircraft is None:
                     continue
-                aircraft = availFleet.pop(0)
-                p1 = FlightCrew.find_suitable_P1(availP1, dutyTimeP1)
-                p2 = FlightCrew.find_suitable_P2(availP2, dutyTimeP2)
+                if p1 is None or p2 is None:
+                    uncovered.append((flt_date, flight_no))
+                else:
+                    pairs.append((flt_date, flight_no, aircraft, p1, p2))
+        biddingP1.flew(crewP1)
+        biddingP2.flew(crewP2)
+        return pairs
 
-                # Delete assigned P1 P2 from available crew lists
-                availP1.pop(0)
-                availP2.pop(0)
+    @staticmethod
+    def _crewByBase(crew: list) -> dict:
+        byBase = {}
+        for crewman in crew:
+            byBase.setdefault(crewman.base_ops, deque()).append(crewman)
+        return byBase
 
-                pairs.append((flt_date, currentFlightNo, aircraft, p1, p2))
-        return pairs
+    @staticmethod
+    def _nextFromBase(queue: deque, busy: set):
+        # Hands out crew round-robin so pairings are spread evenly over the month
+        for _ in range(len(queue)):
+            crewman = queue[0]
+            queue.rotate(-1)
+            if crewman.sap not in busy:
+                return crewman
+        return None
 
     @staticmethod
-    def addRoster(month: int) -> None:
+    def addRoster(month: int, progress=None, profile: RosterProfile = None, uncovered: list = None) -> int:
         """
         Adds the generated monthly roster to the database.
 
         Parameters:
             month (int): The month for which the roster is generated.
+            progress (Callable[[int, int, int], None], optional): Passed on to 'new_monthly_roster'. If it raises, the
+                exception propagates before anything is written.
+            profile (RosterProfile, optional): Collects per-stage timings, query and model counts of the whole build,
+                including the writes, when given. The caller starts and stops it.
+            uncovered (list, optional): Receives the (date, flight_no) of every flight left without a tail or crew.
 
         Returns:
-            None
+            int: The number of roster rows written.
 
         Raises:
             None
 
         Example:
             addRoster(1)
+
+        Note:
+            - Publishing accrues the block time of every rostered flight to its aircraft's 'engine_hours'. The block
+              time of the not-yet-flown part of the roster being replaced is taken back first, so publishing the same
+              month twice does not count it twice. Everything, including the 'publish' change log event, runs in one
+              transaction.
+            - Once the roster is written, 'ReservePlanner' picks the standby crew of every base for the rostered days
+              from the crew left free.
         """
-        db.execute(f"DELETE FROM {Roster.tablename}")
-        crewPairObj = Roster.new_monthly_roster(month=month)
+        profile = profile or RosterProfile(enabled=False)
+        uncovered = [] if uncovered is None else uncovered
+        crewPairObj = Roster.new_monthly_roster(month=month, progress=progress, profile=profile, uncovered=uncovered)
         crewPair = [
             (crew[0], crew[1], crew[2].msn, crew[3].sap, crew[4].sap)
             for crew in crewPairObj
         ]
-        query = f"INSERT INTO {Roster.tablename} (date, flight_no, aircraft_msn, p1_id, p2_id) VALUES (%s,%s,%s,%s,%s)"
-        db.executemany(query, crewPair)
-        connection.commit()
+        with profile.stage("engine hours"):
+            Roster._accrueEngineHours(-1)
+        with profile.stage("write"):
+            db.execute(f"DELETE FROM {Roster.tablename}")
+            query = f"INSERT INTO {Roster.tablename} (date, flight_no, aircraft_msn, p1_id, p2_id) VALUES (%s,%s,%s,%s,%s)"
+            db.executemany(query, crewPair)
+        with profile.stage("engine hours"):
+            Roster._accrueEngineHours(1)
+        # One event for the whole month; consumers re-read the roster rather than receiving every row
+        ChangeLog.record(
+            Roster.tablename, "publish", month, {"month": month, "rows": len(crewPair), "uncovered": len(uncovered)}
+        )
+        with profile.stage("commit"):
+            ChangeLog.commit()
+        Maintenance.invalidate()
+        with profile.stage("reserves"):
+            ReservePlanner.plan(
+                date(year=2024, month=month, day=1), date(year=2024, month=month, day=Roster.DAYS_IN_MONTHS[month] - 1)
+            )
+        return len(crewPair)
+
+    @staticmethod
+    def _accrueEngineHours(sign: int) -> None:
+        # One set-based UPDATE adds (or, with sign=-1, removes) the block hours of every upcoming rostered flight per tail
+        query = f"""UPDATE aircraft_fleet af
+            JOIN (
+                SELECT r.aircraft_msn AS msn, ROUND(SUM(TIME_TO_SEC(f.duration)) / 3600) AS hours
+                FROM {Roster.tablename} r JOIN flights f ON r.flight_no = f.flight_no
+                WHERE r.date >= CURDATE()
+                GROUP BY r.aircraft_msn
+            ) flown ON af.msn = flown.msn
+            SET af.engine_hours = af.engine_hours + {int(sign)} * flown.hours"""
+        db.execute(query)
 
     # Returns list of Roster Data, each flight as a tuple in the list
     @staticmethod
@@ -236,5 +529,5 @@ class Roster:
             WHERE
                 fc1.staffid = {sap}
                 OR fc2.staffid = {sap};"""
-        db.execute(query)
-        return db.fetchall()
+        read_db.execute(query)
+        return read_db.fetchall()
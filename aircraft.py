@@ -1,4 +1,9 @@
-from backend.connection import db, connection
+from datetime import date
+from availability import Availability
+from backend.connection import db, read_db
+from change_log import ChangeLog
+from disruption_recovery import DisruptionRecovery
+from maintenance import Maintenance
 from models.aircraft_model import AircraftModel
 
 
@@ -13,9 +18,9 @@ class Aircraft:
     - addAircraft(acdata: list): Adds a new aircraft to the database.
     - viewAircraft(): Retrieves all aircraft data from the database.
     - deleteAircraft(msn: int): Deletes an aircraft from the database based on its MSN (unique identification number).
-    - modifyAircraft(newData: list, msn: int): Modifies an existing aircraft in the database based on its MSN.
+    - modifyAircraft(newData: list, msn: int) -> dict: Modifies an existing aircraft in the database based on its MSN, recovering its rostered legs if it goes out of service.
     - objectify(fleetList: list): Converts a list of aircraft data retrieved from the database into a list of AircraftModel objects.
-    - avaiableFleet(actype: str) -> list[AircraftModel]: Retrieves a list of available aircraft of a specific type from the database.
+    - avaiableFleet(actype: str, on: date = None) -> list[AircraftModel]: Retrieves a list of available aircraft of a specific type from the database, optionally excluding aircraft down or due a check on a date.
 
     Note:
     - The addAircraft method expects a list of aircraft data in the following order: MSN, A/C Type, Registration, Availability, Engine, Engine Hours.
@@ -42,7 +47,8 @@ class Aircraft:
         Note:
         - The method validates the length and types of the `acdata` list before accessing its attributes.
         - The method creates an instance of the AircraftModel class using the validated aircraft data.
-        - The method then executes an SQL query to insert the aircraft data into the database.
+        - The method then executes an SQL query to insert the aircraft data into the database, and records every
+          maintenance check as done at the aircraft's current engine hours.
         - The method commits the changes to the database.
 
         Example:
@@ -63,7 +69,19 @@ class Aircraft:
         )
         query = "INSERT INTO {tablename} (msn, type, regn, availability, engine, engine_hours) VALUES (%s,%s,%s,%s,%s,%s)".format(tablename=Aircraft.tablename)
         db.execute(query, tuple(aeroplane.model_dump().values()))
-        connection.commit()
+        # An aircraft joins the fleet airworthy: its checks are taken as done at the hours it is added with
+        Maintenance.insertChecks(
+            [(aeroplane.msn, check, aeroplane.engine_hours, date.today()) for check in Maintenance.THRESHOLDS]
+        )
+        ChangeLog.record(Aircraft.tablename, "add", aeroplane.msn, aeroplane.model_dump())
+        ChangeLog.commit()
+        Aircraft._invalidateCaches()
+
+    @staticmethod
+    def _invalidateCaches() -> None:
+        # In-memory indexes built from aircraft_fleet are rebuilt on next use
+        Availability.invalidate()
+        Maintenance.invalidate()
 
     @staticmethod
     def viewAircraft() -> list:
@@ -81,8 +99,8 @@ class Aircraft:
             viewAircraft()
         """
         query = f"SELECT * FROM {Aircraft.tablename}"
-        db.execute(query)
-        return db.fetchall()
+        read_db.execute(query)
+        return read_db.fetchall()
 
     @staticmethod
     def deleteAircraft(msn: int) -> None:
@@ -108,10 +126,12 @@ class Aircraft:
             raise ValueError("Aircraft not found")
         delete_query = f"DELETE FROM {Aircraft.tablename} WHERE msn={msn}"
         db.execute(delete_query)
-        connection.commit()
+        ChangeLog.record(Aircraft.tablename, "delete", msn)
+        ChangeLog.commit()
+        Aircraft._invalidateCaches()
 
     @staticmethod
-    def modifyAircraft(newData: list, msn: int) -> None:
+    def modifyAircraft(newData: list, msn: int) -> dict:
         """
         Modifies an existing aircraft in the database based on its MSN.
 
@@ -120,13 +140,16 @@ class Aircraft:
         - msn (int): The MSN of the aircraft to be modified.
 
         Returns:
-        None
+        - dict: The result of 'DisruptionRecovery.aircraftDown' when the change takes a serviceable aircraft out of
+          service, otherwise None.
 
         Note:
         - The method retrieves the old data of the aircraft from the database based on its MSN.
         - The method modifies the new data by replacing empty values with the corresponding old values.
-        - The method deletes the old aircraft from the database.
-        - The method adds the modified aircraft with the new data to the database.
+        - The method updates the aircraft row in place, so the roster rows, downtime periods and AME assignments that
+          reference it are kept.
+        - When the availability goes from available to unavailable, the legs rostered on the aircraft from today on
+          are moved to other tails of its type.
 
         Example:
         modifyAircraft(['', 'Boeing 747', 'DEF456', True, 'CFM56', 6000], 123)
@@ -134,11 +157,21 @@ class Aircraft:
         query = f"SELECT * FROM {Aircraft.tablename} WHERE msn={msn}"
         db.execute(query)
         oldData = db.fetchone()
-        print(oldData)
+        if oldData is None:
+            raise ValueError("Aircraft not found")
         newData = [val2 if val2 != "" else val1 for val1, val2 in zip(oldData, newData)]  # type: ignore
-        print("NewDataModified= ", newData)
-        Aircraft.deleteAircraft(msn)
-        Aircraft.addAircraft(newData)
+        aeroplane = Aircraft.objectify([newData])[0]
+        query = f"UPDATE {Aircraft.tablename} SET type=%s, regn=%s, availability=%s, engine=%s, engine_hours=%s WHERE msn=%s"
+        db.execute(
+            query,
+            (aeroplane.actype, aeroplane.regn, aeroplane.availability, aeroplane.engine, aeroplane.engine_hours, msn),
+        )
+        ChangeLog.record(Aircraft.tablename, "modify", msn, aeroplane.model_dump())
+        ChangeLog.commit()
+        Aircraft._invalidateCaches()
+        if oldData[3] and not aeroplane.availability:
+            return DisruptionRecovery.aircraftDown(msn)
+        return None
 
     # Returns a list[AircraftModel] when provided input of a db.fetchall() list
     @staticmethod
@@ -174,12 +207,13 @@ class Aircraft:
 
     # Returns list[AircraftModel] of available aircraft.
     @staticmethod
-    def avaiableFleet(actype: str) -> list[AircraftModel]:
+    def avaiableFleet(actype: str, on: date = None) -> list[AircraftModel]:
         """
         Retrieves a list of available aircraft of a specific type from the database.
 
         Parameters:
         - actype (str): The type of aircraft to retrieve.
+        - on (date, optional): When given, aircraft with a downtime period covering this date, or due a maintenance check by then, are left out.
 
         Returns:
         - list[AircraftModel]: A list of AircraftModel objects representing the available aircraft of the specified type.
@@ -188,6 +222,7 @@ class Aircraft:
         - The method executes an SQL query to retrieve all available aircraft of the specified type from the database.
         - The method returns the fetched data as a list of AircraftModel objects.
         - The availability of an aircraft is determined by the 'availability' attribute in the database, where 1 represents available and 0 represents unavailable.
+        - When 'on' is given, aircraft under a downtime period on that date, or forecast to be due a maintenance check by then, are dropped before validation.
         - The method uses the 'model_validate' method of the AircraftModel class to validate and create the AircraftModel objects.
         - The method zips the attribute names of the AircraftModel class with the corresponding values from the fetched data to create a dictionary.
         - The 'model_validate' method validates the attributes of the AircraftModel object and returns the validated object.
@@ -199,6 +234,9 @@ class Aircraft:
         query = f"SELECT * FROM aircraft_fleet WHERE availability=1 AND type='{actype}'"
         db.execute(query)
         availFleet = db.fetchall()
+        if on is not None:
+            down = Availability.fleetDown(on) | Maintenance.dueBy(on)
+            availFleet = [aircraft for aircraft in availFleet if aircraft[0] not in down]
         return [
             AircraftModel.model_validate(
                 dict(zip(AircraftModel.__annotations__, aircraft))
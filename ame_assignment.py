@@ -0,0 +1,165 @@
+import heapq
+from collections import deque
+from datetime import date
+from backend.connection import db, connection, read_db
+from flights import Flight
+
+
+class AMEAssignment:
+    """
+    The 'AMEAssignment' class represents the engine that assigns certified AMEs to the departures of a published roster.
+
+    Every departure needs one AME certified on the type of the aircraft rostered on it, at the departure station, for a
+    window from COVER_BEFORE minutes before departure until COVER_AFTER minutes after. An AME works one shift per day
+    at one station, and a shift may not last longer than SHIFT_LENGTH minutes.
+
+    AMEs are looked up through a hash index from fleet type to AMEs. For each day, departures are walked in window
+    order. Each (type, station) pair keeps a heap of the AMEs already on shift there, keyed by the time they are next
+    free. A departure goes to the AME who has been free longest if their shift can still cover it. Otherwise an AME not
+    yet on shift starts a shift there. Work per day is O(n log n) in the number of departures.
+
+    Attributes:
+        tablename (str): The name of the table storing AME assignments.
+        SHIFT_LENGTH (int): Longest shift in minutes.
+        COVER_BEFORE (int): Minutes before departure the AME is needed at the aircraft.
+        COVER_AFTER (int): Minutes after departure the AME stays with the aircraft.
+
+    Methods:
+        departures(start: date, end: date) -> list[tuple]:
+            Reads the rostered departures between two dates with one query.
+
+        certifiedAMEs() -> dict[str, list[int]]:
+            Returns the hash index from fleet type to the SAPs (Staff IDs) of AMEs certified on it.
+
+        assign(departures: list[tuple], ames: dict[str, list[int]]) -> tuple[list[tuple], list[tuple]]:
+            Assigns AMEs to departures and returns the assignments and the uncovered departures.
+
+        assignRoster(start: date, end: date) -> list[tuple]:
+            Assigns AMEs to the published roster between two dates, saves the result and returns uncovered departures.
+
+        viewAssignments(start: date, end: date) -> list:
+            Retrieves the AME assignments between two dates.
+    """
+
+    tablename = "ame_assignment"
+
+    SHIFT_LENGTH = 8 * 60
+    COVER_BEFORE = 60
+    COVER_AFTER = 15
+
+    @staticmethod
+    def departures(start: date, end: date) -> list:
+        """
+        Reads the rostered departures between two dates.
+
+        Parameters:
+            start (date): The first date (inclusive).
+            end (date): The last date (inclusive).
+
+        Returns:
+            list[tuple]: (date, flight_no, departure, dep_time, actype) tuples, where 'actype' is the type of the
+            aircraft rostered on the flight.
+        """
+        query = """SELECT r.date, r.flight_no, f.departure, f.dep_time, af.type
+            FROM monthly_roster r
+                JOIN flights f ON r.flight_no = f.flight_no
+                JOIN aircraft_fleet af ON r.aircraft_msn = af.msn
+            WHERE r.date BETWEEN %s AND %s"""
+        db.execute(query, (start, end))
+        return db.fetchall()
+
+    @staticmethod
+    def certifiedAMEs() -> dict:
+        db.execute("SELECT staffid, fleet_certified FROM ame_crew ORDER BY staffid")
+        ames = {}
+        for sap, fleet in db.fetchall():
+            ames.setdefault(fleet, []).append(sap)
+        return ames
+
+    @staticmethod
+    def assign(departures: list, ames: dict) -> tuple:
+        """
+        Assigns AMEs to departures.
+
+        Parameters:
+            departures (list[tuple]): Departures as returned by 'departures'.
+            ames (dict[str, list[int]]): AMEs per fleet type as returned by 'certifiedAMEs'.
+
+        Returns:
+            tuple: A tuple containing the following elements in order:
+                - assignments (list[tuple]): (date, flight_no, ame_id) tuples.
+                - uncovered (list[tuple]): The departures no certified AME could cover.
+        """
+        byDay = {}
+        for departure in departures:
+            window = Flight.minutes(departure[3]) - AMEAssignment.COVER_BEFORE
+            byDay.setdefault(departure[0], []).append((window, departure))
+
+        assignments = []
+        uncovered = []
+        for day in sorted(byDay):
+            offShift = {fleet: deque(saps) for fleet, saps in ames.items()}
+            onShift = {}
+            for windowStart, departure in sorted(byDay[day], key=lambda item: item[0]):
+                flightDate, flightNo, station, _, fleet = departure
+                windowEnd = windowStart + AMEAssignment.COVER_BEFORE + AMEAssignment.COVER_AFTER
+                here = onShift.setdefault((fleet, station), [])
+                # AMEs whose shift can no longer reach this window are done for the day
+                while here and here[0][1] + AMEAssignment.SHIFT_LENGTH < windowEnd:
+                    heapq.heappop(here)
+                if here and here[0][0] <= windowStart:
+                    _, shiftStart, sap = heapq.heappop(here)
+                elif offShift.get(fleet):
+                    sap = offShift[fleet].popleft()
+                    shiftStart = windowStart
+                else:
+                    uncovered.append(departure)
+                    continue
+                heapq.heappush(here, (windowEnd, shiftStart, sap))
+                assignments.append((flightDate, flightNo, sap))
+        return assignments, uncovered
+
+    @staticmethod
+    def assignRoster(start: date, end: date) -> list:
+        """
+        Assigns AMEs to the published roster between two dates and saves the assignments.
+
+        Parameters:
+            start (date): The first date (inclusive).
+            end (date): The last date (inclusive).
+
+        Returns:
+            list[tuple]: The departures no certified AME could cover, as returned by 'departures'.
+
+        Note:
+            - Existing assignments in the range are replaced in the same transaction, and the new ones are written
+              with a single executemany.
+        """
+        assignments, uncovered = AMEAssignment.assign(
+            AMEAssignment.departures(start, end), AMEAssignment.certifiedAMEs()
+        )
+        db.execute(
+            f"DELETE FROM {AMEAssignment.tablename} WHERE date BETWEEN %s AND %s", (start, end)
+        )
+        query = f"INSERT INTO {AMEAssignment.tablename} (date, flight_no, ame_id) VALUES (%s,%s,%s)"
+        db.executemany(query, assignments)
+        connection.commit()
+        return uncovered
+
+    @staticmethod
+    def viewAssignments(start: date, end: date) -> list:
+        query = f"""SELECT
+                DATE_FORMAT(a.date, '%%d-%%m-%%Y'),
+                a.flight_no,
+                f.departure,
+                TIME_FORMAT(f.dep_time, '%%H:%%i'),
+                a.ame_id,
+                ame.name
+            FROM
+                {AMEAssignment.tablename} a
+                JOIN flights f ON a.flight_no = f.flight_no
+                JOIN ame_crew ame ON a.ame_id = ame.staffid
+            WHERE a.date BETWEEN %s AND %s
+            ORDER BY a.date, f.dep_time"""
+        read_db.execute(query, (start, end))
+        return read_db.fetchall()
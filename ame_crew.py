@@ -1,5 +1,6 @@
 from models.ame_crew_model import AMECrewModel
-from backend.connection import connection, db
+from backend.connection import db, read_db
+from change_log import ChangeLog
 
 
 class AMECrew:
@@ -43,18 +44,20 @@ class AMECrew:
         query = f"INSERT INTO {AMECrew.tablename} (staffid, name, fleet_certified, login, pw) VALUES (%s,%s,%s,%s,%s)"
         values = tuple(ame.model_dump().values())
         db.execute(query, values)
-        connection.commit()
+        ChangeLog.record(AMECrew.tablename, "add", ame.sap, ame.model_dump(exclude={"login", "pw"}))
+        ChangeLog.commit()
 
     @staticmethod
     def deleteCrew(sap):
         db.execute(f"DELETE FROM {AMECrew.tablename} WHERE staffid={sap}")
-        connection.commit()
+        ChangeLog.record(AMECrew.tablename, "delete", sap)
+        ChangeLog.commit()
 
     @staticmethod
     def viewCrew():
         query = f"SELECT * FROM {AMECrew.tablename}"
-        db.execute(query)
-        return db.fetchall()
+        read_db.execute(query)
+        return read_db.fetchall()
 
     @staticmethod
     def modifyCrew(newData: list, sap: int):
@@ -64,9 +67,10 @@ class AMECrew:
         newData = [val2 if val2 != "" else val1 for val1, val2 in zip(oldData, newData)]  # type: ignore
         modelDict = dict(zip(AMECrewModel.__annotations__.keys(), newData))
         ame = AMECrewModel.model_validate(modelDict)
-        db.execute(f"DELETE FROM {AMECrew.tablename} WHERE staffid={sap}")
-        queryNew = f"INSERT INTO {AMECrew.tablename} (staffid, name, fleet_certified, login, pw) VALUES (%s,%s,%s,%s,%s)"
+        # Updated in place: a DELETE would cascade to the AME's assignments
+        queryNew = f"UPDATE {AMECrew.tablename} SET staffid=%s, name=%s, fleet_certified=%s, login=%s, pw=%s WHERE staffid=%s"
         data = tuple(ame.model_dump().values())
-        db.execute(queryNew, data)
-        connection.commit()
+        db.execute(queryNew, (*data, sap))
+        ChangeLog.record(AMECrew.tablename, "modify", sap, ame.model_dump(exclude={"login", "pw"}))
+        ChangeLog.commit()
 
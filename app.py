@@ -1,10 +1,29 @@
 from aircraft import Aircraft
+from change_log import ChangeLog
+from availability import Availability
+from crew_bidding import CrewBidding
 from flight_crew import FlightCrew
 from ame_crew import AMECrew
+from ame_assignment import AMEAssignment
+from crew_eligibility import CrewEligibility
 from flights import Flight
+from maintenance import Maintenance
+from reserve_planner import ReservePlanner
 from roster import Roster
+from roster_analytics import RosterAnalytics
+from roster_export import RosterExport
+from roster_jobs import RosterJobs
+from roster_profile import RosterProfile
+from route_network import RouteNetwork
+from search_index import SearchIndex
+from simulation import Simulation
 from training import Training
-from flask import Flask, render_template, request
+from training_scheduler import TrainingScheduler
+import json
+import os
+from datetime import date, timedelta
+from backend.connection import pinToPrimary, replicaHas, takeWrite
+from flask import Flask, Response, jsonify, render_template, request, session, stream_with_context
 
 """
 A Flask application that handles various routes for managing flight crew, AME crew, aircraft, flights, monthly roster, and training.
@@ -17,29 +36,77 @@ The available routes and their functionalities are as follows:
 - "/viewCrew": Retrieves and renders the flight crew data from the database.
 - "/deleteCrew": Handles the deletion of flight crew data from the database.
 - "/modifyCrew": Handles the modification of flight crew data in the database.
-- "/applyLeave": Handles the updating of flight crew availability based on leave status.
+- "/applyLeave": Records a dated leave period for a flight crew member.
+- "/bulkAvailability": Records leave for, or switches the availability of, many flight crew at once, selected by SAP list, base or designation.
+- "/standby": Returns, as JSON, the reserve crew on standby at a base on a date (today by default).
+- "/expiryReport": Lists flight crew whose medical has lapsed or lapses within a number of days.
+- "/availability": Returns, as JSON, the crew available at a base or the aircraft of a type available on a date.
 - "/addAME": Handles the addition of AME crew data to the database.
 - "/viewAME": Retrieves and renders the AME crew data from the database.
 - "/deleteAME": Handles the deletion of AME crew data from the database.
 - "/modifyAME": Handles the modification of AME crew data in the database.
+- "/assignAME": Assigns certified AMEs to the departures of the published roster and lists uncovered departures.
 - "/addAC": Handles the addition of aircraft data to the database.
 - "/viewAC": Retrieves and renders the aircraft data from the database.
 - "/deleteAC": Handles the deletion of aircraft data from the database.
-- "/modifyAC": Handles the modification of aircraft data in the database.
+- "/modifyAC": Handles the modification of aircraft data in the database, moving the rostered legs of an aircraft taken out of service to other tails.
+- "/maintenanceForecast": Projects, for every aircraft, the date it reaches its next engine-hour maintenance check.
+- "/recordCheck": Records a maintenance check completed on an aircraft at its current flown hours.
 - "/addFlight": Handles the addition of flight data to the database.
 - "/viewFlights": Retrieves and renders the flight data from the database.
 - "/deleteFlight": Handles the deletion of flight data from the database.
-- "/createRoster": Handles the creation of monthly roster data in the database.
+- "/departures": Returns, as JSON, the flights leaving a station between two times ("HH:MM"), in departure order.
+- "/connections": Returns, as JSON, the direct and connecting itineraries between two stations, earliest arrival first.
+- "/createRoster": Queues a background build of the monthly roster and shows its progress.
+- "/rosterJob/<jobId>": Returns the progress, outcome and result of a roster build as JSON.
+- "/rosterJob/<jobId>/cancel": Cancels a queued or running roster build.
+- "/rosterProfiles": Returns, as JSON, the stage timings of recent profiled roster builds, newest first.
+- "/simulateRoster": Runs what-if scenarios through the roster engine against an in-memory snapshot, without writing to the database, and reports coverage and utilization.
 - "/viewRoster": Retrieves and renders the monthly roster data for a specific flight crew member.
-- "/addTraining": Handles the addition of training data to the database.
+- "/rosterAnalytics": Reports coverage, per-crew and per-tail workload and fairness of the published roster, as a page or as JSON.
+- "/exportRoster": Streams the roster of every flight crew member for a date range as a CSV file or a ZIP of iCalendar files,
+  or the whole network's roster, one row per flight, as CSV, Excel or Parquet.
+- "/addBid": Records a flight crew member's weighted bid for a flight, a day off or a destination in a month's roster.
+- "/viewBids": Lists the crew bids, optionally for one month.
+- "/deleteBid": Deletes a crew bid and shows the remaining bids.
+- "/addTraining": Handles the addition of training data to the database, rejecting sessions that clash with rostered duties or other trainings.
+- "/scheduleTrainings": Places a batch of training sessions on the earliest conflict-free dates and saves them.
 - "/viewTrainings": Retrieves and renders the training data from the database.
 - "/deleteTraining": Handles the deletion of training data from the database.
+- "/search": Returns, as JSON, the crew, aircraft and flights matching a typeahead query, by name, registration, flight number or station.
+- "/changes": Returns, as JSON, the change log events after a sequence number, for consumers that follow the data incrementally.
 
 Note: The code also includes the necessary import statements and the Flask application setup.
+Run 'serve.py' instead of this module to serve the application from several worker processes.
+Read-only views are served by the replicas listed in CREWOPS_REPLICAS, if any. The session cookie keeps the primary's
+GTID set as of the browser session's last write; the session reads from a replica only once the replica has applied it
+(waiting up to REPLICA_WAIT_SECONDS), and from the primary until then, so it always sees its own changes.
+The session cookie is signed with CREWOPS_SECRET_KEY, which must be set.
 
 """
 
 app = Flask(__name__)
+app.secret_key = os.environ.get("CREWOPS_SECRET_KEY")
+if not app.secret_key:
+    raise RuntimeError("CREWOPS_SECRET_KEY is not set: set it to a long random value to sign the session cookies.")
+
+REPLICA_WAIT_SECONDS = float(os.environ.get("CREWOPS_REPLICA_WAIT", 0.05))
+
+
+@app.before_request
+def routeReads():
+    # A session whose last write has not reached this thread's replica yet reads from the primary
+    gtids = session.get("write_gtids")
+    pinToPrimary(gtids is not None and not replicaHas(gtids, REPLICA_WAIT_SECONDS))
+    takeWrite()
+
+
+@app.after_request
+def rememberWrite(response):
+    gtids = takeWrite()
+    if gtids is not None:
+        session["write_gtids"] = gtids
+    return response
 
 
 @app.route("/")
@@ -127,9 +194,80 @@ def updateAvail():
         return render_template("updateAvail.html")
     else:
         sap = int(request.form["sap"])
-        availBool = request.form["leave"]
-        FlightCrew.updateAvail(sap, availBool)
-        return render_template("updateAvailSuccess.html", availBool=availBool, sap=sap)
+        start = date.fromisoformat(request.form["start"])
+        end = date.fromisoformat(request.form["end"])
+        Availability.addLeave(sap, start, end, request.form.get("reason") or None)
+        return render_template("updateAvailSuccess.html", sap=sap, start=start, end=end)
+
+
+@app.route("/bulkAvailability", methods=["GET", "POST"])
+def bulkAvailability():
+    if request.method == "GET":
+        return render_template("bulkAvailability.html")
+    if request.is_json:
+        body = request.get_json()
+        saps = [int(sap) for sap in body.get("saps") or []]
+        designations = body.get("designations") or []
+    else:
+        body = request.form
+        saps = [int(sap) for sap in body.get("saps", "").replace(",", " ").split()]
+        designations = request.form.getlist("designations")
+    action = body["action"]
+    base = body.get("base") or None
+    try:
+        if action == "leave":
+            start = date.fromisoformat(body["start"])
+            end = date.fromisoformat(body["end"])
+            count = Availability.addLeaveBulk(start, end, body.get("reason") or None, saps, base, designations)
+        elif action in ("available", "unavailable"):
+            start = end = None
+            count = FlightCrew.updateAvailBulk(action == "available", saps, base, designations)
+        else:
+            raise ValueError(f"Unknown action {action}")
+    except ValueError as error:
+        if request.is_json:
+            return jsonify(error=str(error)), 400
+        return render_template("bulkAvailability.html", error=str(error))
+    if request.is_json:
+        return jsonify(action=action, affected=count)
+    return render_template("bulkAvailabilitySuccess.html", action=action, count=count, start=start, end=end)
+
+
+@app.route("/availability")
+def availability():
+    day = date.fromisoformat(request.args["date"])
+    if "actype" in request.args:
+        return jsonify(
+            date=day.isoformat(),
+            actype=request.args["actype"],
+            msn=sorted(Availability.availableTails(day, request.args["actype"])),
+        )
+    return jsonify(
+        date=day.isoformat(),
+        base=request.args.get("base"),
+        sap=sorted(Availability.availableCrew(day, request.args.get("base"))),
+    )
+
+
+@app.route("/standby")
+def standby():
+    day = date.fromisoformat(request.args["date"]) if "date" in request.args else date.today()
+    base = request.args["base"].upper()
+    return jsonify(
+        date=day.isoformat(),
+        base=base,
+        standby=[
+            {"sap": sap, "name": name, "designation": designation, "position": position}
+            for sap, name, designation, position in ReservePlanner.standby(base, day)
+        ],
+    )
+
+
+@app.route("/expiryReport")
+def expiryReport():
+    days = int(request.args.get("days", 60))
+    expiring = CrewEligibility.expiringWithin(days)
+    return render_template("expiryReport.html", expiring=expiring, days=days, today=date.today())
 
 
 # AME management Routes
@@ -186,6 +324,20 @@ def modifyAME():
         return render_template("modifyAMESuccess.html")
 
 
+@app.route("/assignAME", methods=["GET", "POST"])
+def assignAME():
+    if request.method == "GET":
+        return render_template("assignAME.html")
+    else:
+        start = date.fromisoformat(request.form["start"])
+        end = date.fromisoformat(request.form["end"])
+        uncovered = AMEAssignment.assignRoster(start, end)
+        assignments = AMEAssignment.viewAssignments(start, end)
+        return render_template(
+            "assignAMEResult.html", assignments=assignments, uncovered=uncovered
+        )
+
+
 # Aircraft Management
 @app.route("/addac", methods=["POST", "GET"])
 def addAC():
@@ -240,9 +392,29 @@ def modifyAC():
             request.form["engine"],
             request.form["engine_hours"],
         ]
-        print(newData)
-        Aircraft.modifyAircraft(newData, int(request.form["msn"]))
-        return render_template("modifyACSuccess.html")
+        recovery = Aircraft.modifyAircraft(newData, int(request.form["msn"]))
+        return render_template("modifyACSuccess.html", recovery=recovery)
+
+
+@app.route("/maintenanceForecast")
+def maintenanceForecast():
+    acData = Aircraft.viewAircraft()
+    forecast = Maintenance.forecast()
+    return render_template("maintenanceForecast.html", acData=acData, forecast=forecast)
+
+
+@app.route("/recordCheck", methods=["POST"])
+def recordCheck():
+    try:
+        Maintenance.recordCheck(int(request.form["msn"]), request.form["check"])
+    except ValueError as error:
+        return render_template(
+            "maintenanceForecast.html",
+            acData=Aircraft.viewAircraft(),
+            forecast=Maintenance.forecast(),
+            error=str(error),
+        )
+    return render_template("maintenanceForecast.html", acData=Aircraft.viewAircraft(), forecast=Maintenance.forecast())
 
 
 # Flights Management
@@ -280,6 +452,28 @@ def deleteFlight():
         return render_template("deleteFlightSuccess.html", flt_no=flt_no)
 
 
+@app.route("/departures")
+def departures():
+    start = Flight.minutes(request.args.get("from", "00:00"))
+    end = Flight.minutes(request.args.get("to", "23:59"))
+    return jsonify(RouteNetwork.departures(request.args["station"], start, end))
+
+
+@app.route("/connections")
+def connections():
+    return jsonify(
+        RouteNetwork.connections(
+            request.args["from"],
+            request.args["to"],
+            after=Flight.minutes(request.args.get("after", "00:00")),
+            before=Flight.minutes(request.args.get("before", "23:59")),
+            minConnect=int(request.args["minConnect"]) if "minConnect" in request.args else None,
+            maxStops=min(int(request.args.get("maxStops", RouteNetwork.MAX_STOPS)), 3),
+            limit=min(int(request.args.get("limit", 20)), 100),
+        )
+    )
+
+
 # MONTHLY ROSTER MANAGEMENT
 @app.route("/createRoster", methods=["GET", "POST"])
 def createRoster():
@@ -287,8 +481,39 @@ def createRoster():
         return render_template("createRoster.html")
     else:
         month = int(request.form["month"])
-        Roster.addRoster(month=month)
-        return render_template("createRosterSuccessful.html")
+        jobId = RosterJobs.submit(month, profile="profile" in request.form)
+        return render_template("createRosterSuccessful.html", jobId=jobId)
+
+
+@app.route("/rosterJob/<jobId>")
+def rosterJob(jobId):
+    job = RosterJobs.status(jobId)
+    if job is None:
+        return jsonify(error="Unknown job"), 404
+    return jsonify(job)
+
+
+@app.route("/rosterJob/<jobId>/cancel", methods=["POST"])
+def cancelRosterJob(jobId):
+    return jsonify(cancelled=RosterJobs.cancel(jobId))
+
+
+@app.route("/simulateRoster", methods=["GET", "POST"])
+def simulateRoster():
+    if request.method == "GET":
+        return render_template("simulateRoster.html")
+    if request.is_json:
+        body = request.get_json()
+        return jsonify(Simulation.runAll(int(body["month"]), body.get("scenarios", {})))
+    month = int(request.form["month"])
+    scenarios = json.loads(request.form.get("scenarios") or "{}")
+    results = Simulation.runAll(month, scenarios)
+    return render_template("simulateRosterResult.html", month=month, results=results)
+
+
+@app.route("/rosterProfiles")
+def rosterProfiles():
+    return jsonify(RosterProfile.history(int(request.args.get("limit", 20))))
 
 
 @app.route("/viewRoster", methods=["GET", "POST"])
@@ -301,6 +526,95 @@ def viewRoster():
         return render_template("viewRoster.html", pairs=pairs)
 
 
+@app.route("/rosterAnalytics")
+def rosterAnalytics():
+    if "start" in request.args and "end" in request.args:
+        horizon = (date.fromisoformat(request.args["start"]), date.fromisoformat(request.args["end"]))
+    else:
+        horizon = RosterAnalytics.horizon()
+    if horizon is None:
+        report = None
+    else:
+        report = RosterAnalytics.summarise(*horizon)
+    if request.args.get("format") == "json":
+        return jsonify(report)
+    return render_template("rosterAnalytics.html", report=report)
+
+
+@app.route("/exportRoster", methods=["GET", "POST"])
+def exportRoster():
+    if request.method == "GET":
+        return render_template("exportRoster.html")
+    else:
+        start = date.fromisoformat(request.form["start"])
+        end = date.fromisoformat(request.form["end"])
+        filename = f"roster_{start.isoformat()}_{end.isoformat()}"
+        if request.form["format"] == "ics":
+            return Response(
+                stream_with_context(RosterExport.streamICS(start, end)),
+                mimetype="application/zip",
+                headers={"Content-Disposition": f"attachment; filename={filename}.zip"},
+            )
+        if request.form["format"] == "network_csv":
+            return Response(
+                stream_with_context(RosterExport.streamNetworkCSV(start, end)),
+                mimetype="text/csv",
+                headers={"Content-Disposition": f"attachment; filename=network_{filename}.csv"},
+            )
+        if request.form["format"] == "xlsx":
+            return Response(
+                stream_with_context(RosterExport.streamNetworkXLSX(start, end)),
+                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                headers={"Content-Disposition": f"attachment; filename=network_{filename}.xlsx"},
+            )
+        if request.form["format"] == "parquet":
+            return Response(
+                stream_with_context(RosterExport.streamNetworkParquet(start, end)),
+                mimetype="application/vnd.apache.parquet",
+                headers={"Content-Disposition": f"attachment; filename=network_{filename}.parquet"},
+            )
+        return Response(
+            stream_with_context(RosterExport.streamCSV(start, end)),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={filename}.csv"},
+        )
+
+
+# CREW BIDDING
+@app.route("/addBid", methods=["GET", "POST"])
+def addBid():
+    if request.method == "GET":
+        return render_template("addBid.html")
+    else:
+        try:
+            CrewBidding.addBid(
+                int(request.form["sap"]),
+                int(request.form["month"]),
+                request.form["bidType"],
+                request.form["target"],
+                int(request.form["weight"]),
+            )
+        except ValueError as error:
+            return render_template("addBid.html", error=str(error))
+        return render_template("addBidSuccess.html")
+
+
+@app.route("/viewBids")
+def viewBids():
+    month = request.args.get("month", type=int)
+    return render_template("viewBids.html", bids=CrewBidding.viewBids(month), month=month)
+
+
+@app.route("/deleteBid", methods=["POST"])
+def deleteBid():
+    month = request.form.get("month", type=int)
+    try:
+        CrewBidding.deleteBid(int(request.form["bidid"]))
+    except ValueError as error:
+        return render_template("viewBids.html", bids=CrewBidding.viewBids(month), month=month, error=str(error))
+    return render_template("viewBids.html", bids=CrewBidding.viewBids(month), month=month)
+
+
 # TRAINING MANAGEMENT
 @app.route("/addTraining.", methods=["GET", "POST"])
 def addTraining():
@@ -317,14 +631,75 @@ def addTraining():
             request.form["trglocation"],
             [request.form["duration"][0:2], request.form["duration"][2:4]],
         ]
-        Training.addTraining(trgdata=trgdata)
+        trainer = int(request.form["trainerid"])
+        trainee = int(request.form["traineeid"])
+        trgdate = date.fromisoformat(request.form["trgdate"])
+        duration = int(request.form["duration"][0:2]) * 60 + int(request.form["duration"][2:4])
 
-        FlightCrew.updateAvail(int(request.form["trainerid"]), False)
-        FlightCrew.updateAvail(int(request.form["traineeid"]), False)
+        # Trainer and trainee stay on the roster; the session only has to fit around their duties
+        scheduler = TrainingScheduler.load(trgdate, trgdate + timedelta(days=31))
+        if scheduler.conflict(trainer, trgdate, duration) or scheduler.conflict(trainee, trgdate, duration):
+            suggestion = scheduler.earliestSlot(trainer, trainee, duration, trgdate)
+            return render_template("addTraining.html", conflictDate=trgdate, suggestion=suggestion)
+
+        Training.addTraining(trgdata=trgdata)
 
         return render_template("addTrainingSuccess.html")
 
 
+@app.route("/scheduleTrainings", methods=["GET", "POST"])
+def scheduleTrainings():
+    if request.method == "GET":
+        return render_template("scheduleTrainings.html")
+    else:
+        # One session per line: name, description, trainer SAP, trainee SAP, location, duration HHMM, earliest date
+        sessions = []
+        for line in request.form["sessions"].splitlines():
+            if not line.strip():
+                continue
+            name, desc, trainer, trainee, location, duration, fromDate = [
+                field.strip() for field in line.split(",")
+            ]
+            sessions.append(
+                {
+                    "name": name,
+                    "desc": desc,
+                    "trainer": int(trainer),
+                    "trainee": int(trainee),
+                    "location": location,
+                    "hhmm": [duration[0:2], duration[2:4]],
+                    "duration": int(duration[0:2]) * 60 + int(duration[2:4]),
+                    "from_date": date.fromisoformat(fromDate),
+                }
+            )
+        firstDate = min((s["from_date"] for s in sessions), default=date.today())
+        lastDate = date.fromisoformat(request.form["until"])
+        scheduler = TrainingScheduler.load(firstDate, lastDate)
+        placed, unplaced = scheduler.scheduleBatch(sessions, lastDate)
+
+        trgid = Training.nextTrainingId()
+        trgdataList = []
+        for trainingSession, day in placed:
+            trgdataList.append(
+                [
+                    trgid,
+                    trainingSession["name"],
+                    trainingSession["desc"],
+                    trainingSession["trainer"],
+                    trainingSession["trainee"],
+                    day,
+                    trainingSession["location"],
+                    trainingSession["hhmm"],
+                ]
+            )
+            trgid += 1
+        if trgdataList:
+            Training.addTrainings(trgdataList)
+        return render_template(
+            "scheduleTrainingsResult.html", placed=trgdataList, unplaced=unplaced
+        )
+
+
 @app.route("/viewTrainings")
 def viewTrainings():
     trgdata = Training.viewTrainings()
@@ -341,6 +716,25 @@ def deleteTraining():
         return render_template("deleteTrainingSuccess.html")
 
 
+# Search
+@app.route("/search")
+def search():
+    kinds = request.args.getlist("kind") or None
+    limit = min(int(request.args.get("limit", 10)), 100)
+    return jsonify(SearchIndex.search(request.args.get("q", ""), kinds, limit))
+
+
+# Change Log
+@app.route("/changes")
+def changes():
+    offset = int(request.args.get("since", 0))
+    events = ChangeLog.since(offset, min(int(request.args.get("limit", 1000)), 10000))
+    return jsonify(
+        events=[event.model_dump(mode="json") for event in events],
+        next=events[-1].seq if events else offset,
+    )
+
+
 # @app.route('/test')
 # def test():
 #     return render_template('deleteCrew.html')
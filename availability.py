@@ -0,0 +1,259 @@
+from datetime import date
+from cache_bus import CacheBus
+from backend.connection import db, connection, read_db
+from interval_index import IntervalTree
+from models.downtime_model import DowntimeModel
+from models.leave_model import LeaveModel
+
+
+class Availability:
+    """
+    The 'Availability' class represents a utility class for managing date-ranged unavailability of flight crew (leave)
+    and aircraft (downtime), and for answering availability questions for a given date.
+
+    Periods are stored in the 'crew_leave' and 'aircraft_downtime' tables. An in-memory index holding one IntervalTree
+    per table, together with crew grouped by base and aircraft grouped by type, is built on first use and dropped
+    whenever a period, a crew member or an aircraft changes.
+
+    The boolean 'availability' columns of 'flight_crew' and 'aircraft_fleet' are still honoured as an open-ended switch;
+    dated periods are applied on top of them.
+
+    Attributes:
+        LEAVE_TABLE (str): The name of the table storing crew leave periods.
+        DOWNTIME_TABLE (str): The name of the table storing aircraft downtime periods.
+
+    Methods:
+        addLeave(sap: int, start: date, end: date, reason: str = None) -> None:
+            Records a leave period for a flight crew member.
+
+        addLeaveBulk(start: date, end: date, reason: str = None, saps: list = None, base: str = None, designations: list = None) -> int:
+            Records the same leave period for many flight crew members with one statement.
+
+        crewFilter(saps: list = None, base: str = None, designations: list = None) -> tuple[str, tuple]:
+            Builds the WHERE clause selecting flight crew by SAP list, base and/or designation.
+
+        addDowntime(msn: int, start: date, end: date, reason: str = None) -> None:
+            Records a downtime period for an aircraft.
+
+        deleteLeave(leave_id: int) -> None:
+            Deletes a leave period.
+
+        deleteDowntime(downtime_id: int) -> None:
+            Deletes a downtime period.
+
+        viewLeave() -> list:
+            Retrieves all leave periods with crew names.
+
+        crewOnLeave(day: date) -> set[int]:
+            Returns the SAPs (Staff IDs) of crew on leave on a date.
+
+        fleetDown(day: date) -> set[int]:
+            Returns the MSNs of aircraft down on a date.
+
+        availableCrew(day: date, base: str = None) -> set[int]:
+            Returns the SAPs (Staff IDs) of crew available on a date, optionally limited to one base.
+
+        availableTails(day: date, actype: str) -> set[int]:
+            Returns the MSNs of aircraft of a type available on a date.
+
+        invalidate() -> None:
+            Drops the in-memory index so it is rebuilt on next use.
+    """
+
+    LEAVE_TABLE = "crew_leave"
+    DOWNTIME_TABLE = "aircraft_downtime"
+
+    _index = None
+    _version = None
+
+    @staticmethod
+    def addLeave(sap: int, start: date, end: date, reason: str = None) -> None:
+        leave = LeaveModel(sap=sap, start_date=start, end_date=end, reason=reason)
+        query = f"INSERT INTO {Availability.LEAVE_TABLE} (staffid, start_date, end_date, reason) VALUES (%s,%s,%s,%s)"
+        db.execute(query, tuple(leave.model_dump().values()))
+        connection.commit()
+        Availability.invalidate()
+
+    @staticmethod
+    def addLeaveBulk(
+        start: date, end: date, reason: str = None, saps: list = None, base: str = None, designations: list = None
+    ) -> int:
+        """
+        Records the same leave period for every flight crew member matching a selection, e.g. a seasonal leave plan.
+
+        Parameters:
+            start (date): The first day of the leave (inclusive).
+            end (date): The last day of the leave (inclusive).
+            reason (str, optional): The reason for the leave.
+            saps (list[int], optional): The SAPs (Staff IDs) to put on leave.
+            base (str, optional): Only crew based at this station.
+            designations (list[str], optional): Only crew with one of these designations.
+
+        Returns:
+            int: The number of leave periods recorded.
+
+        Raises:
+            ValueError: If the period ends before it starts, the reason is too long or no selection is given.
+
+        Note:
+            - Selections combine: saps=[...] with base='DEL' only puts the listed crew based at DEL on leave.
+            - One INSERT ... SELECT writes every period, in one transaction.
+        """
+        if end < start:
+            raise ValueError("Leave can not end before it starts.")
+        if reason is not None and len(reason) > 255:
+            raise ValueError("Reason length should not exceed 255 characters.")
+        where, params = Availability.crewFilter(saps, base, designations)
+        query = f"""INSERT INTO {Availability.LEAVE_TABLE} (staffid, start_date, end_date, reason)
+            SELECT staffid, %s, %s, %s FROM flight_crew WHERE {where}"""
+        db.execute(query, (start, end, reason, *params))
+        added = db.rowcount
+        connection.commit()
+        Availability.invalidate()
+        return added
+
+    @staticmethod
+    def crewFilter(saps: list = None, base: str = None, designations: list = None) -> tuple:
+        # Parameterised, so SAP lists and station codes typed into a form never end up in the SQL text
+        clauses, params = [], []
+        if saps:
+            clauses.append(f"staffid IN ({', '.join(['%s'] * len(saps))})")
+            params.extend(int(sap) for sap in saps)
+        if base:
+            clauses.append("base_ops = %s")
+            params.append(base.upper())
+        if designations:
+            clauses.append(f"designation IN ({', '.join(['%s'] * len(designations))})")
+            params.extend(designations)
+        if not clauses:
+            raise ValueError("Select crew by SAP, base or designation")
+        return " AND ".join(clauses), tuple(params)
+
+    @staticmethod
+    def addDowntime(msn: int, start: date, end: date, reason: str = None) -> None:
+        downtime = DowntimeModel(msn=msn, start_date=start, end_date=end, reason=reason)
+        query = f"INSERT INTO {Availability.DOWNTIME_TABLE} (msn, start_date, end_date, reason) VALUES (%s,%s,%s,%s)"
+        db.execute(query, tuple(downtime.model_dump().values()))
+        connection.commit()
+        Availability.invalidate()
+
+    @staticmethod
+    def deleteLeave(leave_id: int) -> None:
+        db.execute(f"DELETE FROM {Availability.LEAVE_TABLE} WHERE leave_id={leave_id}")
+        connection.commit()
+        Availability.invalidate()
+
+    @staticmethod
+    def deleteDowntime(downtime_id: int) -> None:
+        db.execute(f"DELETE FROM {Availability.DOWNTIME_TABLE} WHERE downtime_id={downtime_id}")
+        connection.commit()
+        Availability.invalidate()
+
+    @staticmethod
+    def viewLeave() -> list:
+        query = f"""SELECT
+                l.leave_id,
+                l.staffid,
+                CONCAT("Capt ", fc.fname, " ", fc.lname) AS name,
+                DATE_FORMAT(l.start_date, '%d-%m-%Y'),
+                DATE_FORMAT(l.end_date, '%d-%m-%Y'),
+                l.reason
+            FROM
+                {Availability.LEAVE_TABLE} l
+                JOIN flight_crew fc ON l.staffid = fc.staffid
+            ORDER BY l.start_date"""
+        read_db.execute(query)
+        return read_db.fetchall()
+
+    @staticmethod
+    def invalidate() -> None:
+        Availability._index = None
+        CacheBus.publish("availability")
+
+    @staticmethod
+    def index() -> dict:
+        """
+        Returns the in-memory availability index, building it if needed.
+
+        Returns:
+            dict: A dictionary with the following keys:
+                - leave (IntervalTree): Leave periods keyed by SAP (Staff ID), as date ordinals.
+                - downtime (IntervalTree): Downtime periods keyed by MSN, as date ordinals.
+                - crewByBase (dict[str, frozenset[int]]): SAPs of crew with the availability flag set, per base.
+                - fleetByType (dict[str, frozenset[int]]): MSNs of aircraft with the availability flag set, per type.
+
+        Note:
+            - Four queries build the whole index. Every lookup after that is served from memory.
+        """
+        version = CacheBus.version("availability")
+        if Availability._index is not None and Availability._version == version:
+            return Availability._index
+
+        db.execute(f"SELECT start_date, end_date, staffid FROM {Availability.LEAVE_TABLE}")
+        leave = IntervalTree(
+            (start.toordinal(), end.toordinal(), sap) for start, end, sap in db.fetchall()
+        )
+        db.execute(f"SELECT start_date, end_date, msn FROM {Availability.DOWNTIME_TABLE}")
+        downtime = IntervalTree(
+            (start.toordinal(), end.toordinal(), msn) for start, end, msn in db.fetchall()
+        )
+
+        crewByBase = {}
+        db.execute("SELECT staffid, base_ops FROM flight_crew WHERE availability=1")
+        for sap, base in db.fetchall():
+            crewByBase.setdefault(base, set()).add(sap)
+        fleetByType = {}
+        db.execute("SELECT msn, type FROM aircraft_fleet WHERE availability=1")
+        for msn, actype in db.fetchall():
+            fleetByType.setdefault(actype, set()).add(msn)
+
+        Availability._version = version
+        Availability._index = {
+            "leave": leave,
+            "downtime": downtime,
+            "crewByBase": {base: frozenset(saps) for base, saps in crewByBase.items()},
+            "fleetByType": {actype: frozenset(msns) for actype, msns in fleetByType.items()},
+        }
+        return Availability._index
+
+    @staticmethod
+    def crewOnLeave(day: date) -> set:
+        return Availability.index()["leave"].stab(day.toordinal())
+
+    @staticmethod
+    def fleetDown(day: date) -> set:
+        return Availability.index()["downtime"].stab(day.toordinal())
+
+    @staticmethod
+    def availableCrew(day: date, base: str = None) -> set:
+        """
+        Returns the crew available for flight duty on a date.
+
+        Parameters:
+            day (date): The date to check.
+            base (str, optional): The base of operations (IATA code). All bases when omitted.
+
+        Returns:
+            set[int]: The SAPs (Staff IDs) of crew with the availability flag set and no leave covering 'day'.
+        """
+        crewByBase = Availability.index()["crewByBase"]
+        if base is None:
+            crew = set().union(*crewByBase.values())
+        else:
+            crew = set(crewByBase.get(base.upper(), ()))
+        return crew - Availability.crewOnLeave(day)
+
+    @staticmethod
+    def availableTails(day: date, actype: str) -> set:
+        """
+        Returns the aircraft of a type available for flying on a date.
+
+        Parameters:
+            day (date): The date to check.
+            actype (str): The aircraft type, e.g. 'A320'.
+
+        Returns:
+            set[int]: The MSNs of aircraft with the availability flag set and no downtime covering 'day'.
+        """
+        fleet = Availability.index()["fleetByType"].get(actype, frozenset())
+        return fleet - Availability.fleetDown(day)
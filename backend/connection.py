@@ -1,9 +1,190 @@
+import itertools
+import os
+import threading
+from contextlib import contextmanager
 import mysql.connector as sql
 
+SETTINGS = {
+    "host": "localhost",
+    "user": "root",
+    "password": "crewdbpw",
+    "database": "crewopsprodb",
+}
+
+# Read replicas as "host[:port]" separated by commas, e.g. "127.0.0.1:3307". They share the primary's credentials.
+REPLICAS = [
+    {**SETTINGS, "host": host, "port": int(port or 3306)}
+    for host, _, port in (
+        replica.strip().partition(":")
+        for replica in os.environ.get("CREWOPS_REPLICAS", "").split(",")
+        if replica.strip()
+    )
+]
+
+
+class _Session:
+    # A connection together with the cursor the data-access classes run their queries on
+    def __init__(self, settings: dict = None, autocommit: bool = False) -> None:
+        self.connection = sql.connect(**(settings or SETTINGS), autocommit=autocommit)
+        self.cursor = self.connection.cursor()
+
+    def close(self) -> None:
+        self.cursor.close()
+        self.connection.close()
+
+
+_shared = _Session()
+_local = threading.local()
+_replicaOrder = itertools.cycle(REPLICAS)
+
+
+def _session() -> _Session:
+    return getattr(_local, "session", None) or _shared
+
+
+def _readSession() -> _Session:
+    # Reads stay on the primary without replicas, inside a dedicated session, or while pinned after a write
+    if not REPLICAS or getattr(_local, "session", None) or getattr(_local, "pinned", False):
+        return _session()
+    if getattr(_local, "replica", None) is None:
+        # Autocommit, so every read sees the replica's latest state rather than one long-lived snapshot
+        _local.replica = _Session(next(_replicaOrder), autocommit=True)
+    return _local.replica
+
+
+class _Proxy:
+    # Forwards attribute access to the current thread's session, or the shared one
+    def __init__(self, attr: str, read: bool = False) -> None:
+        self._attr = attr
+        self._read = read
+
+    def __getattr__(self, name):
+        session = _readSession() if self._read else _session()
+        value = getattr(getattr(session, self._attr), name)
+        if name == "commit":
+            return _committing(value, session)
+        counter = getattr(_local, "counter", None)
+        if counter is not None and name in ("execute", "executemany"):
+            return _counted(value, counter)
+        return value
+
+
+def _committing(method, session: _Session):
+    def commit(*args, **kwargs):
+        method(*args, **kwargs)
+        # The rest of the request reads from the primary too, so it sees its own write
+        _local.pinned = True
+        if REPLICAS:
+            _local.wrote = _executedGtids(session)
+
+    return commit
+
+
+def _executedGtids(session: _Session) -> str:
+    # Every transaction the primary has committed, this one included. Read on a cursor of its own, so the result set of
+    # the data-access cursor is left alone
+    cursor = session.connection.cursor()
+    try:
+        cursor.execute("SELECT @@GLOBAL.gtid_executed")
+        return cursor.fetchone()[0] or ""
+    finally:
+        cursor.close()
+
+
+def _counted(method, counter: dict):
+    def call(query, *args, **kwargs):
+        counter["queries"] += 1
+        if method.__name__ == "executemany" and args:
+            counter["batched_rows"] += len(args[0])
+        return method(query, *args, **kwargs)
+
+    return call
+
+
+@contextmanager
+def counting():
+    """
+    Counts the statements the current thread runs through 'db' in the body.
+
+    Yields a dictionary whose 'queries' and 'batched_rows' (rows sent through executemany) keep growing until the body
+    exits. Counters nest: an outer count keeps its own total while an inner one is active.
+    """
+    counter = {"queries": 0, "batched_rows": 0}
+    outer = getattr(_local, "counter", None)
+    _local.counter = counter
+    try:
+        yield counter
+    finally:
+        _local.counter = outer
+        if outer is not None:
+            outer["queries"] += counter["queries"]
+            outer["batched_rows"] += counter["batched_rows"]
+
+
+@contextmanager
+def dedicated():
+    """
+    Runs the body on a private connection for the current thread.
+
+    Background work (e.g. roster builds) uses this so its long-running transaction never shares a cursor with request
+    handlers. The private connection is closed on exit.
+    """
+    _local.session = _Session()
+    try:
+        yield
+    finally:
+        _local.session.close()
+        _local.session = None
+
+
+def pinToPrimary(pinned: bool) -> None:
+    """
+    Sends the current thread's 'read_db' queries to the primary while 'pinned' is True.
+
+    The app pins a request to the primary when the replica it would read from has not applied the session's last write
+    yet (see 'replicaHas'), so a read that follows a write (e.g. '/viewCrew' after '/modifyCrew') never sees stale data.
+    """
+    _local.pinned = pinned
+
+
+def takeWrite():
+    """
+    Returns the primary's executed GTID set as of the current thread's last commit since the previous call, or None if
+    it has not committed, and resets it. Always None without replicas, where every read is on the primary anyway.
+    """
+    wrote = getattr(_local, "wrote", None)
+    _local.wrote = None
+    return wrote
+
+
+def replicaHas(gtids: str, timeout: float = 0) -> bool:
+    """
+    Returns True if the replica the current thread reads from has applied a GTID set taken from 'takeWrite'.
+
+    Parameters:
+        gtids (str): The GTID set to wait for.
+        timeout (float, optional): Seconds to wait for the replica to apply it. Defaults to 0, no waiting.
+
+    Note:
+        - Always True without replicas. Replication must run with gtid_mode=ON: an empty GTID set means the primary
+          does not track GTIDs, and the write can never be confirmed on a replica.
+    """
+    if not REPLICAS:
+        return True
+    if not gtids:
+        return False
+    _local.pinned = False
+    cursor = _readSession().cursor
+    # 0 once the set is applied, 1 on timeout
+    cursor.execute("SELECT WAIT_FOR_EXECUTED_GTID_SET(%s, %s)", (gtids, timeout))
+    return cursor.fetchone()[0] == 0
+
+
 # Connection
-connection = sql.connect(
-    host="localhost", user="root", password="crewdbpw", database="crewopsprodb"
-)
+connection = _Proxy("connection")
 
 # Cursor
-db = connection.cursor()
+db = _Proxy("cursor")
+
+# Cursor for read-only queries, served by a replica when CREWOPS_REPLICAS is set
+read_db = _Proxy("cursor", read=True)
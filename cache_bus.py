@@ -0,0 +1,78 @@
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+
+class CacheBus:
+    """
+    The 'CacheBus' class represents a local invalidation channel that keeps in-memory caches coherent across the worker
+    processes of one host.
+
+    The channel is a small memory-mapped file of 64-bit version counters, one slot per cache name. A writer bumps the
+    counter of the cache it changed, under an exclusive file lock. A cache records the counter it was built at and
+    compares it with the current value before every use, which costs one read from shared memory. A change in one
+    worker is therefore seen by the next read in every other worker, with no polling delay.
+
+    Names are hashed onto SLOTS counters. Two names sharing a slot only cause an extra rebuild, never a stale read.
+
+    Attributes:
+        PATH (str): The file backing the channel. Set CREWOPS_CACHE_BUS to share a different file.
+        SLOTS (int): The number of version counters in the file.
+
+    Methods:
+        version(name: str) -> int:
+            Returns the current version of a cache.
+
+        publish(name: str) -> int:
+            Marks a cache as changed in every process and returns its new version.
+    """
+
+    PATH = os.environ.get(
+        "CREWOPS_CACHE_BUS", os.path.join(tempfile.gettempdir(), "crewops-cache-bus")
+    )
+    SLOTS = 256
+
+    _map = None
+    _fd = None
+    _pid = None
+
+    @staticmethod
+    def _mapping() -> mmap.mmap:
+        # Mapped lazily and again after a fork, so every process holds its own view of the shared file
+        if CacheBus._map is None or CacheBus._pid != os.getpid():
+            size = CacheBus.SLOTS * 8
+            fd = os.open(CacheBus.PATH, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < size:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            CacheBus._map = mmap.mmap(fd, size)
+            CacheBus._fd = fd
+            CacheBus._pid = os.getpid()
+        return CacheBus._map
+
+    @staticmethod
+    def _offset(name: str) -> int:
+        return (zlib.crc32(name.encode()) % CacheBus.SLOTS) * 8
+
+    @staticmethod
+    def version(name: str) -> int:
+        return struct.unpack_from("<Q", CacheBus._mapping(), CacheBus._offset(name))[0]
+
+    @staticmethod
+    def publish(name: str) -> int:
+        mapping = CacheBus._mapping()
+        offset = CacheBus._offset(name)
+        fcntl.flock(CacheBus._fd, fcntl.LOCK_EX)
+        try:
+            version = struct.unpack_from("<Q", mapping, offset)[0] + 1
+            struct.pack_into("<Q", mapping, offset, version)
+        finally:
+            fcntl.flock(CacheBus._fd, fcntl.LOCK_UN)
+        return version
@@ -0,0 +1,234 @@
+import bisect
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from backend.connection import db, connection
+from cache_bus import CacheBus
+from models.change_event_model import ChangeEventModel
+
+
+class ChangeLog:
+    """
+    The 'ChangeLog' class represents an append-only log of every change made through the data-access classes, so caches
+    and reports can follow the data incrementally instead of rescanning whole tables.
+
+    Every add, modify and delete in 'FlightCrew', 'Aircraft', 'Flight', 'AMECrew', 'Training' and 'Roster' records a
+    typed event (see 'ChangeEventModel') in the transaction that makes the change, and commits both with
+    'ChangeLog.commit', so a change is never committed without its event. Events are persisted to the 'change_log'
+    table, whose AUTO_INCREMENT column gives them increasing sequence numbers, and the newest BUFFER_SIZE events are
+    kept in an in-process ring buffer.
+
+    A consumer remembers the sequence number of the last event it handled and asks for everything after it, with
+    'since' or with the blocking 'subscribe'. Offsets still in the ring buffer are answered from memory; older offsets
+    are read from the table. Other worker processes announce new events on the 'CacheBus', so the buffer only goes back
+    to the table when something was actually written.
+
+    Sequence numbers are allocated when a row is inserted, so a lower number can commit just after a higher one. An
+    event is handed out only once every lower number has been seen, or GAP_SECONDS after the next event (numbers lost
+    to a rolled back insert never appear), so a consumer that advances its offset never skips an event.
+
+    Attributes:
+        tablename (str): The name of the table in the database where the change log is stored.
+        BUFFER_SIZE (int): The number of newest events kept in memory.
+        GAP_SECONDS (float): How long a missing sequence number holds back the events after it.
+        POLL_SECONDS (float): How often 'subscribe' checks for events written by other processes.
+
+    Methods:
+        record(entity: str, action: str, key, data: dict = None) -> None:
+            Appends one event to the log, in the current transaction.
+
+        recordMany(entity: str, action: str, changes: list[tuple]) -> None:
+            Appends one event per (key, data) pair to the log, in the current transaction.
+
+        commit() -> None:
+            Commits the current transaction and announces its events to consumers.
+
+        since(offset: int, limit: int = 1000) -> list[ChangeEventModel]:
+            Returns the events after a sequence number, oldest first.
+
+        latest() -> int:
+            Returns the sequence number of the newest event that can be handed out.
+
+        subscribe(offset: int = None, stop: threading.Event = None) -> Iterator[ChangeEventModel]:
+            Yields every event after an offset, waiting for new ones, until 'stop' is set.
+    """
+
+    tablename = "change_log"
+    BUFFER_SIZE = 10000
+    GAP_SECONDS = 2.0
+    POLL_SECONDS = 0.5
+
+    _buffer = deque(maxlen=BUFFER_SIZE)
+    _settled = None  # Every event up to this sequence number is in the buffer (or lost for good)
+    _version = None
+    _lock = threading.Lock()
+    _changed = threading.Condition()
+
+    @staticmethod
+    def record(entity: str, action: str, key, data: dict = None) -> None:
+        """
+        Appends one event to the log.
+
+        Parameters:
+            entity (str): The table that changed, e.g. FlightCrew.tablename.
+            action (str): 'add', 'modify', 'delete', 'publish' or 'restore'.
+            key (int | str): The primary key of the changed row.
+            data (dict, optional): The changed fields, or the new row. Values that are not JSON types (dates, times) are
+                stored as strings.
+
+        Returns:
+            None
+
+        Note:
+            - Call it on the connection that made the change, as the last statement before 'ChangeLog.commit', so the
+              change and its event commit together. Sequence numbers are allocated here, so a transaction kept open
+              much longer than GAP_SECONDS after this call can have its event skipped by consumers.
+        """
+        ChangeLog.recordMany(entity, action, [(key, data)])
+
+    @staticmethod
+    def recordMany(entity: str, action: str, changes: list) -> None:
+        if action not in ChangeEventModel.ACTIONS:
+            raise ValueError(f"Unknown change action {action}")
+        if not changes:
+            return
+        now = datetime.now()
+        query = f"INSERT INTO {ChangeLog.tablename} (at, entity, action, entity_key, data) VALUES (%s,%s,%s,%s,%s)"
+        db.executemany(
+            query,
+            [
+                (now, entity, action, str(key), None if data is None else json.dumps(data, default=str))
+                for key, data in changes
+            ],
+        )
+
+    @staticmethod
+    def commit() -> None:
+        # Commits the change together with its events, then wakes consumers in this and other processes
+        connection.commit()
+        CacheBus.publish(ChangeLog.tablename)
+        with ChangeLog._changed:
+            ChangeLog._changed.notify_all()
+
+    @staticmethod
+    def _objectify(rows: list) -> list[ChangeEventModel]:
+        return [
+            ChangeEventModel(
+                seq=seq,
+                at=at,
+                entity=entity,
+                action=action,
+                key=key,
+                data=None if data is None else json.loads(data),
+            )
+            for seq, at, entity, action, key, data in rows
+        ]
+
+    @staticmethod
+    def _refresh() -> None:
+        # Reads only the events after the settled point, and only when some process has written since the last read
+        version = CacheBus.version(ChangeLog.tablename)
+        buffer = ChangeLog._buffer
+        unsettled = buffer and buffer[-1].seq > ChangeLog._settled
+        if version == ChangeLog._version and not unsettled:
+            return
+
+        columns = "seq, at, entity, action, entity_key, data"
+        if ChangeLog._settled is None:
+            db.execute(f"SELECT {columns} FROM {ChangeLog.tablename} ORDER BY seq DESC LIMIT {ChangeLog.BUFFER_SIZE}")
+            rows = db.fetchall()[::-1]
+            ChangeLog._settled = rows[0][0] - 1 if rows else 0
+        else:
+            db.execute(
+                f"SELECT {columns} FROM {ChangeLog.tablename} WHERE seq > %s ORDER BY seq LIMIT {ChangeLog.BUFFER_SIZE}",
+                (ChangeLog._settled,),
+            )
+            rows = db.fetchall()
+        # Ends the read snapshot, so the next refresh sees rows committed after this one
+        connection.commit()
+
+        while buffer and buffer[-1].seq > ChangeLog._settled:
+            buffer.pop()
+        buffer.extend(ChangeLog._objectify(rows))
+
+        now = datetime.now()
+        settled = ChangeLog._settled
+        for event in rows:
+            seq, at = event[0], event[1]
+            if seq != settled + 1 and (now - at).total_seconds() < ChangeLog.GAP_SECONDS:
+                break
+            settled = seq
+        ChangeLog._settled = settled
+        # A full page may have more behind it, so the next call reads again
+        ChangeLog._version = None if len(rows) == ChangeLog.BUFFER_SIZE else version
+
+    @staticmethod
+    def since(offset: int, limit: int = 1000) -> list[ChangeEventModel]:
+        """
+        Returns the events after a sequence number.
+
+        Parameters:
+            offset (int): The sequence number of the last event already handled; 0 for the whole log.
+            limit (int, optional): The most events to return.
+
+        Returns:
+            list[ChangeEventModel]: Up to 'limit' events with a sequence number above 'offset', oldest first. Pass the
+            'seq' of the last one as the next offset.
+        """
+        with ChangeLog._lock:
+            ChangeLog._refresh()
+            buffer = ChangeLog._buffer
+            settled = ChangeLog._settled
+            if offset >= settled:
+                return []
+            if buffer and offset >= buffer[0].seq - 1:
+                events = list(buffer)
+                start = bisect.bisect_right([event.seq for event in events], offset)
+                return [event for event in events[start : start + limit] if event.seq <= settled]
+
+        # Older than the ring buffer
+        db.execute(
+            f"""SELECT seq, at, entity, action, entity_key, data
+            FROM {ChangeLog.tablename}
+            WHERE seq > %s AND seq <= %s
+            ORDER BY seq LIMIT %s""",
+            (offset, settled, limit),
+        )
+        rows = db.fetchall()
+        connection.commit()
+        return ChangeLog._objectify(rows)
+
+    @staticmethod
+    def latest() -> int:
+        with ChangeLog._lock:
+            ChangeLog._refresh()
+            return ChangeLog._settled
+
+    @staticmethod
+    def subscribe(offset: int = None, stop: threading.Event = None):
+        """
+        Yields every event after an offset as it is recorded.
+
+        Parameters:
+            offset (int, optional): The sequence number of the last event already handled. Defaults to the newest
+                event, so only changes from now on are yielded.
+            stop (threading.Event, optional): Ends the subscription once set.
+
+        Yields:
+            ChangeEventModel: Each event in sequence order.
+
+        Note:
+            - Events recorded in this process wake the subscriber at once; events from other worker processes are
+              noticed within POLL_SECONDS through the 'CacheBus', without querying the table.
+        """
+        if offset is None:
+            offset = ChangeLog.latest()
+        while stop is None or not stop.is_set():
+            events = ChangeLog.since(offset)
+            if events:
+                offset = events[-1].seq
+                yield from events
+                continue
+            with ChangeLog._changed:
+                ChangeLog._changed.wait(ChangeLog.POLL_SECONDS)
@@ -0,0 +1,444 @@
+from datetime import date
+import numpy as np
+from backend.connection import db, connection, read_db
+from models.bid_model import BidModel
+
+
+class CrewBidding:
+    """
+    The 'CrewBidding' class represents the crew bidding subsystem. Flight crew submit weighted bids for a month's
+    roster: flights they want to fly, days they want off and destinations they want to fly to. The roster engine then
+    gives each day's duties to the crew who value them most, senior crew first.
+
+    A duty is either a base-to-base pairing from 'CrewPairing', which only crew of that base can fly, or a single leg.
+    One instance handles one role (P1 or P2) for one month. Crew are ordered by seniority: the rank of their
+    designation in SENIORITY, then the lower SAP.
+
+    What a crew member gets from a duty is worked out for all crew and all duties at once, as a (duties x crew) matrix
+    built with numpy when the instance is created:
+        - COVER for flying it at all, so that as many duties as possible are crewed.
+        - The weight of their bids for its flights and for the stations it lands at.
+        - Less the weight of a day off bid for that day.
+    Bid weights are scaled by seniority, the most senior crew member's counting (1 + SENIORITY_SPREAD) times the most
+    junior's. BALANCE is taken off for every duty a crew member has already flown that month, so work is spread
+    evenly when nobody bid. Crew not free that day and crew from another base on a pairing get FORBIDDEN.
+
+    Each day is then handed out in rounds, each an assignment problem solved by an auction. A round gives a crew member
+    at most one more duty; the duties left unmatched go to another round, in which crew who already hold a duty that
+    day may take one more that starts REST_MINUTES after theirs ends, or ends before theirs starts, and value it
+    BALANCE less per duty held. Rounds stop once every duty is crewed or a round crews none.
+
+    In an auction, every bidder without a match bids for the item it values most net of price, raising that item's
+    price by how much more it prefers it to its next choice. All unmatched bidders bid at once, so a round is a few
+    numpy operations over a block of the matrix, and the result is within EPSILON per duty of the best total value.
+    Crew who bid nothing value every duty alike; a rotating tie-break smaller than EPSILON gives each of them a
+    different favourite, so they spread over the duties in one round instead of all bidding for the same one.
+
+    Crew wanting the same destination value its duties alike too, and then outbid each other by little more than
+    EPSILON a round. Once few bidders are left, or rounds stop matching them, the auction hands over to shortest
+    augmenting paths over its prices, which place one bidder each and keep the result optimal.
+
+    Attributes:
+        tablename (str): The name of the table in the database where bids are stored.
+        SENIORITY (tuple): Designations from most to least senior.
+        SENIORITY_SPREAD (float): How much more the most senior crew member's bid weights count than the most junior's.
+        COVER (float): The value of crewing a duty, above any bid weight.
+        BALANCE (float): The value lost for every duty already flown in the month.
+        FORBIDDEN (float): The value of a duty a crew member can not fly.
+        REST_MINUTES (int): The least time between two duties of a crew member on one day.
+        EPSILON (float): The smallest bid increment of the auction. Half a bid weight point: smaller steps only make
+            crew competing for the same duties outbid each other for longer.
+        BLOCK_ROWS (int): Bidders evaluated together in one block of a round, which bounds the memory of a round.
+        AUGMENT_BELOW (int): Unmatched bidders left when the auction hands over to shortest augmenting paths.
+        STALL_ROUNDS (int): Rounds after which the auction also hands over if fewer than a tenth of the bidders
+            waiting at their start have been matched.
+
+    Methods:
+        addBid(sap: int, month: int, bidType: str, target: str, weight: int) -> None:
+            Records a bid.
+
+        deleteBid(bid_id: int) -> None:
+            Deletes a bid.
+
+        viewBids(month: int = None) -> list:
+            Retrieves the bids with crew names, optionally for one month only.
+
+        monthBids(month: int) -> list[tuple]:
+            Returns the (sap, bid_type, target, weight) of every bid for a month, for the roster snapshot.
+
+        seniority(crew: list[FlightCrewModel]) -> list[FlightCrewModel]:
+            Sorts crew from most to least senior.
+
+        duties(pairings: list, legs: list, schedule: FlightSchedule) -> list[tuple]:
+            Splits the daily schedule into the duties handed out to crew.
+
+        assign(day: date, flying: list[int], busy: set) -> list:
+            Gives the day's duties to crew of this role, returning the crew member for each duty.
+
+        flew(crew: list[FlightCrewModel]) -> None:
+            Counts a published duty for every crew member listed, towards BALANCE.
+
+        auction(values: np.ndarray, epsilon: float = None) -> np.ndarray:
+            Solves an assignment problem, returning the column matched to every row.
+    """
+
+    tablename = "crew_bids"
+
+    SENIORITY = ("DE", "TRI", "LTC", "SR COMMANDER", "COMMANDER", "SFO", "FO", "JFO")
+    SENIORITY_SPREAD = 1.0
+    COVER = 1000.0
+    BALANCE = 5.0
+    FORBIDDEN = -1e9
+    REST_MINUTES = 30
+    EPSILON = 0.5
+    BLOCK_ROWS = 512
+    AUGMENT_BELOW = 64
+    STALL_ROUNDS = 10
+
+    @staticmethod
+    def addBid(sap: int, month: int, bidType: str, target: str, weight: int) -> None:
+        bid = BidModel(sap=sap, month=month, bid_type=bidType, target=target, weight=weight)
+        query = f"INSERT INTO {CrewBidding.tablename} (staffid, month, bid_type, target, weight) VALUES (%s,%s,%s,%s,%s)"
+        db.execute(query, tuple(bid.model_dump().values()))
+        connection.commit()
+
+    @staticmethod
+    def deleteBid(bid_id: int) -> None:
+        db.execute(f"DELETE FROM {CrewBidding.tablename} WHERE bid_id=%s", (bid_id,))
+        if db.rowcount == 0:
+            connection.commit()
+            raise ValueError("Bid not found")
+        connection.commit()
+
+    @staticmethod
+    def viewBids(month: int = None) -> list:
+        """
+        Retrieves the bids with crew names.
+
+        Parameters:
+            month (int, optional): Only return bids for this month.
+
+        Returns:
+            list[tuple]: (bid_id, staffid, name, designation, month, bid_type, target, weight) tuples, ordered by month,
+            crew and weight (highest first).
+        """
+        query = f"""SELECT b.bid_id, b.staffid, CONCAT(fc.fname, ' ', fc.lname), fc.designation, b.month, b.bid_type,
+                b.target, b.weight
+            FROM {CrewBidding.tablename} b JOIN flight_crew fc ON b.staffid = fc.staffid"""
+        params = ()
+        if month is not None:
+            query += " WHERE b.month = %s"
+            params = (month,)
+        read_db.execute(query + " ORDER BY b.month, b.staffid, b.weight DESC", params)
+        return read_db.fetchall()
+
+    @staticmethod
+    def monthBids(month: int) -> list:
+        db.execute(
+            f"SELECT staffid, bid_type, target, weight FROM {CrewBidding.tablename} WHERE month = %s",
+            (month,),
+        )
+        return db.fetchall()
+
+    @staticmethod
+    def seniority(crew: list) -> list:
+        rank = {desig: position for position, desig in enumerate(CrewBidding.SENIORITY)}
+        return sorted(crew, key=lambda crewman: (rank.get(crewman.desig.upper(), len(rank)), crewman.sap))
+
+    @staticmethod
+    def duties(pairings: list, legs: list, schedule) -> list:
+        """
+        Splits the daily schedule into the duties handed out to crew.
+
+        Parameters:
+            pairings (list[tuple[str, tuple[int, ...]]]): The pairings picked by 'CrewPairing.select'.
+            legs (list[tuple]): The legs the pairings index into.
+            schedule (FlightSchedule): The daily schedule.
+
+        Returns:
+            list[tuple]: (base, flight numbers) of every duty: the pairings first, with their base, then every other
+            flight on its own, with a base of None.
+        """
+        paired = set()
+        duties = []
+        for base, path in pairings:
+            flightNos = tuple(legs[i][4] for i in path)
+            paired.update(flightNos)
+            duties.append((base, flightNos))
+        for flight_no in schedule.flightNo.tolist():
+            if flight_no not in paired:
+                duties.append((None, (flight_no,)))
+        return duties
+
+    def __init__(self, crew: list, bids: list, schedule, duties: list) -> None:
+        """
+        Evaluates every bid of one role against every duty.
+
+        Parameters:
+            crew (list[FlightCrewModel]): The crew of the role, in any order.
+            bids (list[tuple]): (sap, bid_type, target, weight) tuples as returned by 'monthBids'. Bids of crew not in
+                'crew', or for flights not in the schedule, are ignored.
+            schedule (FlightSchedule): The daily schedule.
+            duties (list[tuple]): The duties as returned by 'duties'.
+        """
+        self.crew = CrewBidding.seniority(crew)
+        self.position = {crewman.sap: column for column, crewman in enumerate(self.crew)}
+        self.flown = np.zeros(len(self.crew), dtype=np.float32)
+        self.dayOff = {}
+
+        size = len(self.crew)
+        scale = 1 + CrewBidding.SENIORITY_SPREAD * np.arange(size - 1, -1, -1, dtype=np.float32) / max(size - 1, 1)
+        stationCode = {station: code for code, station in enumerate(schedule.stations)}
+
+        # Stations each duty lands at, other than the base it returns to, and the minutes it spans
+        dutyOf = {}
+        lands = np.zeros((len(duties), len(schedule.stations)), dtype=np.float32)
+        self.start = np.zeros(len(duties), dtype=np.int32)
+        self.end = np.zeros(len(duties), dtype=np.int32)
+        for row, (base, flightNos) in enumerate(duties):
+            offset, clock = 0, None
+            for flight_no in flightNos:
+                dutyOf[flight_no] = row
+                index = schedule.indexOf(flight_no)
+                lands[row, schedule.arrival[index]] = 1
+                if clock is None:
+                    self.start[row] = clock = int(schedule.dep[index])
+                while int(schedule.dep[index]) + offset < clock:
+                    offset += 1440
+                clock = int(schedule.arr[index]) + offset
+            self.end[row] = clock
+            if base in stationCode:
+                lands[row, stationCode[base]] = 0
+
+        destinations = np.zeros((len(schedule.stations), size), dtype=np.float32)
+        flightRows, flightColumns, flightWeights = [], [], []
+        for sap, bidType, target, weight in bids:
+            column = self.position.get(sap)
+            if column is None:
+                continue
+            if bidType == "flight":
+                row = dutyOf.get(int(target))
+                if row is not None:
+                    flightRows.append(row)
+                    flightColumns.append(column)
+                    flightWeights.append(weight)
+            elif bidType == "destination":
+                if target in stationCode:
+                    destinations[stationCode[target], column] += weight
+            else:
+                day = target if isinstance(target, date) else date.fromisoformat(target)
+                self.dayOff.setdefault(day, np.zeros(size, dtype=np.float32))[column] += weight
+
+        values = lands @ destinations
+        np.add.at(values, (flightRows, flightColumns), np.asarray(flightWeights, dtype=np.float32))
+        values *= scale
+        values += CrewBidding.COVER
+        for penalty in self.dayOff.values():
+            penalty *= scale
+
+        # Pairings start and end at their base, so only crew based there can fly them
+        crewBase = np.array([crewman.base_ops for crewman in self.crew])
+        byBase = {}
+        for row, (base, _) in enumerate(duties):
+            if base is not None:
+                byBase.setdefault(base, []).append(row)
+        for base, rows in byBase.items():
+            values[np.ix_(rows, np.flatnonzero(crewBase != base))] = CrewBidding.FORBIDDEN
+        self.values = values
+
+    def assign(self, day: date, flying: list, busy: set) -> list:
+        """
+        Gives a day's duties to crew of this role.
+
+        Parameters:
+            day (date): The date.
+            flying (list[int]): Indices of the duties flown that day, into the 'duties' the instance was built with.
+            busy (set[int]): SAPs (Staff IDs) not free for flying that day.
+
+        Returns:
+            list: The crew member (FlightCrewModel) flying each duty of 'flying', or None where nobody could.
+
+        Note:
+            - A crew member may get several duties that do not overlap. The duties are not counted towards BALANCE
+              until they are passed to 'flew', so a duty that is not published in the end does not count.
+        """
+        if not flying or not self.crew:
+            return [None] * len(flying)
+        flying = np.asarray(flying, dtype=np.int64)
+        values = self.values[flying]
+        values -= CrewBidding.BALANCE * self.flown
+        if day in self.dayOff:
+            values -= self.dayOff[day]
+        unavailable = [self.position[sap] for sap in busy if sap in self.position]
+        values[:, unavailable] = CrewBidding.FORBIDDEN
+
+        start = self.start[flying]
+        end = self.end[flying] + CrewBidding.REST_MINUTES
+        chosen = np.full(len(flying), -1, dtype=np.int64)
+        remaining = np.arange(len(flying))
+        while remaining.size:
+            matched = CrewBidding.auction(values[remaining])
+            won = matched >= 0
+            if not won.any():
+                break
+            rows, columns = remaining[won], matched[won]
+            chosen[rows] = columns
+            remaining = remaining[~won]
+            # The crew just matched can still take the duties left that do not overlap theirs, for BALANCE less
+            clash = (start[remaining, None] < end[rows]) & (start[rows] < end[remaining, None])
+            block = values[np.ix_(remaining, columns)]
+            block -= CrewBidding.BALANCE
+            block[clash] = CrewBidding.FORBIDDEN
+            values[np.ix_(remaining, columns)] = block
+        return [self.crew[column] if column >= 0 else None for column in chosen.tolist()]
+
+    def flew(self, crew: list) -> None:
+        np.add.at(self.flown, [self.position[crewman.sap] for crewman in crew], 1)
+
+    @staticmethod
+    def auction(values: np.ndarray, epsilon: float = None) -> np.ndarray:
+        """
+        Solves an assignment problem: matches rows to columns, each at most once, maximising the total value.
+
+        Parameters:
+            values (np.ndarray): The value of matching each row to each column. Rows and columns may differ in number.
+            epsilon (float, optional): The smallest bid increment. Defaults to EPSILON.
+
+        Returns:
+            np.ndarray: The column matched to every row, or -1 for rows left unmatched.
+
+        Note:
+            - Values that are equal for a bidder are separated by a tie-break below 'epsilon' that rotates with the
+              bidder, so equal bidders start out wanting different items.
+            - Staying unmatched is worth 0, so a row whose every column is worth less than its price, such as one
+              where every column is FORBIDDEN, drops out instead of bidding.
+            - Rows and columns worth nothing to anyone, such as crew not free that day, are left out first. The
+              smaller of what remains bids: when there are more rows than columns the columns bid for rows. Extra
+              bidders would otherwise raise prices by 'epsilon' until they exceed every value before giving up.
+            - Equal bids for a column go to the lower row.
+            - The last AUGMENT_BELOW bidders, or all those left once STALL_ROUNDS rounds match less than a tenth of
+              them, are placed one at a time by a shortest augmenting path instead.
+        """
+        rows, columns = values.shape
+        useful = values > 0
+        keepRows = np.flatnonzero(useful.any(axis=1))
+        keepColumns = np.flatnonzero(useful.any(axis=0))
+        del useful
+        if keepRows.size < rows or keepColumns.size < columns:
+            chosen = np.full(rows, -1, dtype=np.int64)
+            if keepRows.size and keepColumns.size:
+                inner = CrewBidding.auction(values[np.ix_(keepRows, keepColumns)], epsilon)
+                matched = inner >= 0
+                chosen[keepRows[matched]] = keepColumns[inner[matched]]
+            return chosen
+        if rows > columns:
+            owner = CrewBidding.auction(np.ascontiguousarray(values.T), epsilon)
+            chosen = np.full(rows, -1, dtype=np.int64)
+            matched = np.flatnonzero(owner >= 0)
+            chosen[owner[matched]] = matched
+            return chosen
+
+        epsilon = CrewBidding.EPSILON if epsilon is None else epsilon
+        size = max(rows, columns)
+        prices = np.zeros(columns)
+        chosen = np.full(rows, -1, dtype=np.int64)
+        holder = np.full(columns, -1, dtype=np.int64)
+        bidding = np.ones(rows, dtype=bool)
+        everyColumn = np.arange(columns)
+        waiting = []
+        while True:
+            free = np.flatnonzero(bidding & (chosen < 0))
+            waiting.append(free.size)
+            stall = CrewBidding.STALL_ROUNDS
+            stalled = len(waiting) > stall and free.size * 10 > waiting[-1 - stall] * 9
+            if free.size <= CrewBidding.AUGMENT_BELOW or stalled:
+                for row in free.tolist():
+                    CrewBidding._augment(values, prices, chosen, holder, row)
+                return chosen
+            best = np.empty(free.size, dtype=np.int64)
+            first = np.empty(free.size)
+            second = np.empty(free.size)
+            for start in range(0, free.size, CrewBidding.BLOCK_ROWS):
+                block = free[start : start + CrewBidding.BLOCK_ROWS]
+                net = values[block] - prices
+                net += (block[:, None] + everyColumn) % size * (epsilon / size)
+                part = slice(start, start + block.size)
+                best[part] = net.argmax(axis=1)
+                everyRow = np.arange(block.size)
+                first[part] = net[everyRow, best[part]]
+                net[everyRow, best[part]] = -np.inf
+                # The next best choice is never worse than staying unmatched
+                second[part] = np.maximum(net.max(axis=1), 0) if columns > 1 else 0
+
+            out = first < 0
+            bidding[free[out]] = False
+            keep = ~out
+            free, best = free[keep], best[keep]
+            bids = prices[best] + first[keep] - second[keep] + epsilon
+
+            # Highest bid per column wins; equal bids go to the lower row
+            order = np.lexsort((free, -bids, best))
+            free, best, bids = free[order], best[order], bids[order]
+            won = np.ones(best.size, dtype=bool)
+            won[1:] = best[1:] != best[:-1]
+            free, best, bids = free[won], best[won], bids[won]
+
+            outbid = holder[best]
+            chosen[outbid[outbid >= 0]] = -1
+            holder[best] = free
+            chosen[free] = best
+            prices[best] = bids
+
+    @staticmethod
+    def _augment(values: np.ndarray, prices: np.ndarray, chosen: np.ndarray, holder: np.ndarray, source: int) -> None:
+        # Dijkstra from one unmatched row over the auction's prices: 'distance' is how much value is given up to hand
+        # each column to the path, and a row on the path may instead end it by going unmatched (worth 0). It runs in
+        # the precision of 'values', which halves the memory read for every row passed compared with float64
+        price = prices.astype(values.dtype)
+        cost = price - values[source]
+        top = max(-cost.min(), 0.0)
+        distance = cost + top
+        before = np.full(prices.size, source, dtype=np.int64)
+        waiting = np.ones(prices.size, dtype=bool)
+        passed, reached = [], []
+        leaver, leaving = source, top
+        while True:
+            column = int(distance.argmin())
+            reach = distance[column]
+            if leaving <= reach:
+                end, reach = None, leaving
+                break
+            if holder[column] < 0:
+                end = column
+                break
+            passed.append(column)
+            reached.append(reach)
+            distance[column] = np.inf
+            waiting[column] = False
+            row = holder[column]
+            cost = price - values[row]
+            top = max(-cost.min(), 0.0)
+            cost += reach + top
+            better = cost < distance
+            better &= waiting
+            np.putmask(distance, better, cost)
+            np.putmask(before, better, row)
+            if reach + top < leaving:
+                leaver, leaving = row, reach + top
+
+        # Raising the prices of the columns passed keeps them consistent for the next path
+        passed = np.array(passed, dtype=np.int64)
+        prices[passed] += reach - np.array(reached)
+        if end is None:
+            if leaver == source:
+                return
+            end = chosen[leaver]
+            chosen[leaver] = -1
+        while True:
+            row = before[end]
+            previous = chosen[row]
+            chosen[row] = end
+            holder[end] = row
+            if row == source:
+                return
+            end = previous
@@ -0,0 +1,109 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from cache_bus import CacheBus
+from backend.connection import db
+
+
+class CrewEligibility:
+    """
+    The 'CrewEligibility' class represents an expiry index over flight crew qualifications, used to keep crew whose
+    medical has lapsed off the roster and to report upcoming expiries.
+
+    The index is a pair of arrays sorted by expiry date (as date ordinals) with the crew details aligned to them, plus
+    the rank of every SAP in that order. The crew lapsed on a date are the prefix of the arrays before a binary-search
+    cutoff, so checking one crew member is O(log n) to find the cutoff and O(1) to compare ranks.
+
+    Rows are read as plain tuples and never validated through FlightCrewModel, so lapsed records do not break loading.
+
+    Attributes:
+        EXPIRY_COLUMN (str): The 'flight_crew' column holding the expiry date that gates flight duty.
+
+    Methods:
+        index() -> dict:
+            Returns the cached expiry index, building it with one query if needed.
+
+        cutoff(day: date) -> int:
+            Returns the number of crew whose qualification has expired before 'day'.
+
+        isLapsed(sap: int, day: date) -> bool:
+            Returns True when the crew member's qualification has expired before 'day'.
+
+        lapsedOn(day: date) -> set[int]:
+            Returns the SAPs (Staff IDs) of every crew member whose qualification has expired before 'day'.
+
+        expiringWithin(days: int, today: date = None) -> list[tuple]:
+            Returns crew whose qualification has expired or expires within 'days' days, soonest first.
+
+        invalidate() -> None:
+            Drops the cached index so it is rebuilt on next use.
+    """
+
+    EXPIRY_COLUMN = "medical_validity"
+
+    _index = None
+    _version = None
+
+    @staticmethod
+    def invalidate() -> None:
+        CrewEligibility._index = None
+        CacheBus.publish("eligibility")
+
+    @staticmethod
+    def index() -> dict:
+        """
+        Returns the cached expiry index, building it with one query if needed.
+
+        Returns:
+            dict: A dictionary with the following keys:
+                - expiries (list[int]): Expiry dates as ordinals, ascending.
+                - rows (list[tuple]): (staffid, name, designation, base_ops, expiry) aligned with 'expiries'.
+                - rank (dict[int, int]): Position of every SAP (Staff ID) in 'expiries'.
+        """
+        version = CacheBus.version("eligibility")
+        if CrewEligibility._index is not None and CrewEligibility._version == version:
+            return CrewEligibility._index
+        query = f"""SELECT staffid, CONCAT(fname, ' ', lname), designation, base_ops, {CrewEligibility.EXPIRY_COLUMN}
+            FROM flight_crew
+            WHERE {CrewEligibility.EXPIRY_COLUMN} IS NOT NULL
+            ORDER BY {CrewEligibility.EXPIRY_COLUMN}"""
+        db.execute(query)
+        rows = db.fetchall()
+        CrewEligibility._version = version
+        CrewEligibility._index = {
+            "expiries": [row[4].toordinal() for row in rows],
+            "rows": rows,
+            "rank": {row[0]: position for position, row in enumerate(rows)},
+        }
+        return CrewEligibility._index
+
+    @staticmethod
+    def cutoff(day: date) -> int:
+        return bisect_left(CrewEligibility.index()["expiries"], day.toordinal())
+
+    @staticmethod
+    def isLapsed(sap: int, day: date) -> bool:
+        rank = CrewEligibility.index()["rank"].get(sap)
+        return rank is not None and rank < CrewEligibility.cutoff(day)
+
+    @staticmethod
+    def lapsedOn(day: date) -> set:
+        rows = CrewEligibility.index()["rows"]
+        return {row[0] for row in rows[: CrewEligibility.cutoff(day)]}
+
+    @staticmethod
+    def expiringWithin(days: int, today: date = None) -> list:
+        """
+        Returns crew whose qualification has already expired or expires within a number of days.
+
+        Parameters:
+            days (int): The look-ahead window in days.
+            today (date, optional): The reference date. Defaults to the current date.
+
+        Returns:
+            list[tuple]: (staffid, name, designation, base_ops, expiry) tuples, soonest expiry first.
+        """
+        if today is None:
+            today = date.today()
+        index = CrewEligibility.index()
+        end = bisect_right(index["expiries"], (today + timedelta(days=days)).toordinal())
+        return index["rows"][:end]
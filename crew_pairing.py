@@ -0,0 +1,170 @@
+import os
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from flight_schedule import FlightSchedule
+
+
+class CrewPairing:
+    """
+    The 'CrewPairing' class represents the generator of multi-leg crew pairings: sequences of legs flown by one crew in
+    one duty period, starting and ending at the crew's base.
+
+    The daily schedule is treated as a connection graph: a leg can follow another when it departs from the station the
+    first one arrived at, between MIN_CONNECT and MAX_SIT minutes later. Pairings are found by a depth-first search
+    bounded by MAX_LEGS and MAX_DUTY. The search caches, per (leg, legs left), the cheapest suffixes that get back to
+    base, so a sub-path shared by many pairings is only explored once. Each base is searched in its own process.
+
+    Legs are plain (dep_min, arr_min, departure, arrival, flight_no) tuples so they can be sent to worker processes
+    cheaply.
+
+    Attributes:
+        MAX_DUTY (int): Longest duty period in minutes, from report to release.
+        MAX_LEGS (int): Most legs in one pairing.
+        MIN_CONNECT (int): Shortest time in minutes between arriving and departing on the next leg.
+        MAX_SIT (int): Longest time in minutes a crew waits on the ground between two legs.
+        REPORT_BEFORE (int): Minutes before the first departure the crew reports.
+        RELEASE_AFTER (int): Minutes after the last arrival the crew is released.
+        MAX_SUFFIXES (int): Suffixes kept per cached (leg, legs left) entry; the earliest-ending ones are kept.
+
+    Methods:
+        legs(schedule: FlightSchedule) -> list[tuple]:
+            Returns the schedule's legs sorted by departure time.
+
+        generate(legs: list[tuple], base: str) -> list[tuple[int, ...]]:
+            Returns every pairing starting and ending at 'base', as tuples of leg indices.
+
+        generateAll(legs: list[tuple], bases: Iterable[str], parallel: bool = True) -> dict[str, list[tuple[int, ...]]]:
+            Runs 'generate' for every base, one worker process per base.
+
+        select(pairings: dict[str, list[tuple[int, ...]]], legs: list[tuple], capacity: dict = None) -> list[tuple[str, tuple[int, ...]]]:
+            Picks pairings so that no leg is flown twice, most productive pairings first.
+    """
+
+    MAX_DUTY = 10 * 60
+    MAX_LEGS = 4
+    MIN_CONNECT = 30
+    MAX_SIT = 4 * 60
+    REPORT_BEFORE = 60
+    RELEASE_AFTER = 30
+    MAX_SUFFIXES = 16
+
+    @staticmethod
+    def legs(schedule: FlightSchedule) -> list:
+        return schedule.legs()
+
+    @staticmethod
+    def generate(legs: list, base: str) -> list:
+        """
+        Returns every pairing starting and ending at a base.
+
+        Parameters:
+            legs (list[tuple]): Legs as returned by 'legs', sorted by departure.
+            base (str): The crew base (IATA code).
+
+        Returns:
+            list[tuple[int, ...]]: Pairings as tuples of indices into 'legs', in flying order.
+
+        Note:
+            - Connections out of a station are found with a binary search over that station's departure times.
+            - A suffix whose duty would already exceed MAX_DUTY measured from its own first leg is never kept, and
+              suffixes are sorted by release time so extending them stops at the first one that is too late.
+        """
+        departures = {}
+        for index, leg in enumerate(legs):
+            departures.setdefault(leg[2], []).append(index)
+        depTimes = {station: [legs[i][0] for i in idxs] for station, idxs in departures.items()}
+        overhead = CrewPairing.REPORT_BEFORE + CrewPairing.RELEASE_AFTER
+        cache = {}
+
+        def suffixes(i: int, left: int) -> list:
+            key = (i, left)
+            if key in cache:
+                return cache[key]
+            dep, arr, _, to, _ = legs[i]
+            found = []
+            if to == base:
+                found.append((arr, (i,)))
+            elif left > 1 and to in departures:
+                times = depTimes[to]
+                lo = bisect_left(times, arr + CrewPairing.MIN_CONNECT)
+                hi = bisect_right(times, arr + CrewPairing.MAX_SIT)
+                for j in departures[to][lo:hi]:
+                    for end, path in suffixes(j, left - 1):
+                        if end - dep + overhead > CrewPairing.MAX_DUTY:
+                            break
+                        found.append((end, (i,) + path))
+                found.sort()
+                del found[CrewPairing.MAX_SUFFIXES:]
+            cache[key] = found
+            return found
+
+        pairings = []
+        for i in departures.get(base, []):
+            for _, path in suffixes(i, CrewPairing.MAX_LEGS):
+                pairings.append(path)
+        return pairings
+
+    @staticmethod
+    def generateAll(legs: list, bases, parallel: bool = True) -> dict:
+        """
+        Runs 'generate' for every base.
+
+        Parameters:
+            legs (list[tuple]): Legs as returned by 'legs'.
+            bases (Iterable[str]): The crew bases.
+            parallel (bool, optional): Set to False to search every base in the calling process, e.g. when the caller
+                is already a pool worker.
+
+        Returns:
+            dict[str, list[tuple[int, ...]]]: The pairings of each base.
+
+        Note:
+            - Bases are independent, so each one is searched in a separate worker process. A single base is searched
+              in the calling process to avoid the cost of starting a pool.
+        """
+        bases = sorted(set(bases))
+        if len(bases) <= 1 or not parallel:
+            return {base: CrewPairing.generate(legs, base) for base in bases}
+        with ProcessPoolExecutor(max_workers=min(len(bases), os.cpu_count() or 1)) as pool:
+            results = pool.map(CrewPairing.generate, [legs] * len(bases), bases)
+            return dict(zip(bases, results))
+
+    @staticmethod
+    def select(pairings: dict, legs: list, capacity: dict = None) -> list:
+        """
+        Picks pairings so that no leg is flown twice.
+
+        Parameters:
+            pairings (dict[str, list[tuple[int, ...]]]): Candidate pairings per base, as returned by 'generateAll'.
+            legs (list[tuple]): The legs the pairings index into.
+            capacity (dict[str, int], optional): Most pairings that may be picked per base, e.g. the number of crew
+                available there. Unlimited when omitted.
+
+        Returns:
+            list[tuple[str, tuple[int, ...]]]: The picked (base, pairing) tuples.
+
+        Note:
+            - Candidates are ranked by block minutes over duty minutes, then by number of legs, so pairings with the
+              least idle time are taken first. A candidate is taken only if none of its legs is already covered.
+        """
+        overhead = CrewPairing.REPORT_BEFORE + CrewPairing.RELEASE_AFTER
+        ranked = []
+        for base, candidates in pairings.items():
+            for path in candidates:
+                block = sum(legs[i][1] - legs[i][0] for i in path)
+                duty = legs[path[-1]][1] - legs[path[0]][0] + overhead
+                ranked.append((-block / duty, -len(path), base, path))
+        ranked.sort()
+
+        covered = set()
+        used = {}
+        chosen = []
+        for _, _, base, path in ranked:
+            if capacity is not None and used.get(base, 0) >= capacity.get(base, 0):
+                continue
+            if any(i in covered for i in path):
+                continue
+            covered.update(path)
+            used[base] = used.get(base, 0) + 1
+            chosen.append((base, path))
+        return chosen
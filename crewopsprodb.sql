@@ -18,6 +18,17 @@
 /*!40111 SET @OLD_SQL_NOTES=@@SQL_NOTES, SQL_NOTES=0 */;
 
 
+CREATE TABLE `aircraft_downtime` (
+  `downtime_id` int NOT NULL AUTO_INCREMENT,
+  `msn` int NOT NULL,
+  `start_date` date NOT NULL,
+  `end_date` date NOT NULL,
+  `reason` varchar(255) DEFAULT NULL,
+  PRIMARY KEY (`downtime_id`),
+  KEY `msn` (`msn`),
+  CONSTRAINT `aircraft_downtime_ibfk_1` FOREIGN KEY (`msn`) REFERENCES `aircraft_fleet` (`msn`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 CREATE TABLE `aircraft_fleet` (
   `msn` int NOT NULL,
   `type` char(4) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL,
@@ -28,6 +39,16 @@ CREATE TABLE `aircraft_fleet` (
   PRIMARY KEY (`msn`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+CREATE TABLE `ame_assignment` (
+  `date` date NOT NULL,
+  `flight_no` int NOT NULL,
+  `ame_id` int NOT NULL,
+  PRIMARY KEY (`date`,`flight_no`),
+  KEY `ame_id` (`ame_id`),
+  CONSTRAINT `ame_assignment_ibfk_1` FOREIGN KEY (`ame_id`) REFERENCES `ame_crew` (`staffid`) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `ame_assignment_ibfk_2` FOREIGN KEY (`date`, `flight_no`) REFERENCES `monthly_roster` (`date`, `flight_no`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 CREATE TABLE `ame_crew` (
   `staffid` int NOT NULL,
   `name` varchar(255) NOT NULL,
@@ -37,6 +58,53 @@ CREATE TABLE `ame_crew` (
   PRIMARY KEY (`staffid`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+CREATE TABLE `change_log` (
+  `seq` bigint NOT NULL AUTO_INCREMENT,
+  `at` datetime(6) NOT NULL,
+  `entity` varchar(32) NOT NULL,
+  `action` varchar(16) NOT NULL,
+  `entity_key` varchar(64) NOT NULL,
+  `data` json DEFAULT NULL,
+  PRIMARY KEY (`seq`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE `crew_bids` (
+  `bid_id` int NOT NULL AUTO_INCREMENT,
+  `staffid` int NOT NULL,
+  `month` tinyint NOT NULL,
+  `bid_type` varchar(16) NOT NULL,
+  `target` varchar(16) NOT NULL,
+  `weight` int NOT NULL,
+  PRIMARY KEY (`bid_id`),
+  KEY `month` (`month`),
+  KEY `staffid` (`staffid`),
+  CONSTRAINT `crew_bids_ibfk_1` FOREIGN KEY (`staffid`) REFERENCES `flight_crew` (`staffid`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE `crew_leave` (
+  `leave_id` int NOT NULL AUTO_INCREMENT,
+  `staffid` int NOT NULL,
+  `start_date` date NOT NULL,
+  `end_date` date NOT NULL,
+  `reason` varchar(255) DEFAULT NULL,
+  PRIMARY KEY (`leave_id`),
+  KEY `staffid` (`staffid`),
+  CONSTRAINT `crew_leave_ibfk_1` FOREIGN KEY (`staffid`) REFERENCES `flight_crew` (`staffid`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE `disruptions` (
+  `disruption_id` int NOT NULL AUTO_INCREMENT,
+  `reported_at` datetime NOT NULL,
+  `day` date NOT NULL,
+  `station` char(3) NOT NULL,
+  `kind` varchar(16) NOT NULL,
+  `msn` int DEFAULT NULL,
+  `flight_no` int DEFAULT NULL,
+  `recovered` tinyint(1) NOT NULL,
+  PRIMARY KEY (`disruption_id`),
+  KEY `station_day` (`station`,`day`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 CREATE TABLE `flight_crew` (
   `staffid` int NOT NULL AUTO_INCREMENT,
   `fname` varchar(255) DEFAULT NULL,
@@ -64,6 +132,17 @@ CREATE TABLE `flights` (
   PRIMARY KEY (`flight_no`)
 ) ENGINE=InnoDB AUTO_INCREMENT=6788 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+CREATE TABLE `maintenance_checks` (
+  `check_id` int NOT NULL AUTO_INCREMENT,
+  `msn` int NOT NULL,
+  `check_name` varchar(16) NOT NULL,
+  `engine_hours` int NOT NULL,
+  `done_on` date NOT NULL,
+  PRIMARY KEY (`check_id`),
+  KEY `msn_check` (`msn`,`check_name`),
+  CONSTRAINT `maintenance_checks_ibfk_1` FOREIGN KEY (`msn`) REFERENCES `aircraft_fleet` (`msn`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 CREATE TABLE `monthly_roster` (
   `date` date NOT NULL,
   `flight_no` int NOT NULL,
@@ -79,6 +158,17 @@ CREATE TABLE `monthly_roster` (
   CONSTRAINT `monthly_roster_ibfk_3` FOREIGN KEY (`p2_id`) REFERENCES `flight_crew` (`staffid`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+CREATE TABLE `reserve_roster` (
+  `date` date NOT NULL,
+  `staffid` int NOT NULL,
+  `base_ops` char(3) NOT NULL,
+  `position` char(2) NOT NULL,
+  PRIMARY KEY (`date`,`staffid`),
+  KEY `base_date` (`base_ops`,`date`),
+  KEY `staffid` (`staffid`),
+  CONSTRAINT `reserve_roster_ibfk_1` FOREIGN KEY (`staffid`) REFERENCES `flight_crew` (`staffid`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 CREATE TABLE `training` (
   `training_id` int NOT NULL,
   `training_name` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL,
@@ -127,6 +217,38 @@ INSERT INTO `aircraft_fleet` (`msn`, `type`, `regn`, `availability`, `engine`, `
 (30758, 'A320', 'UMK', 0, 'CFM56-5B/P', 4100),
 (50184, 'B777', 'DEF', 1, 'GE90-115B', 5500);
 
+INSERT INTO `maintenance_checks` (`msn`, `check_name`, `engine_hours`, `done_on`) VALUES
+(10109, 'A-Check', 4500, '2024-01-01'),
+(10128, 'A-Check', 4500, '2024-01-01'),
+(10201, 'A-Check', 4500, '2024-01-01'),
+(10210, 'A-Check', 4500, '2024-01-01'),
+(10238, 'A-Check', 4500, '2024-01-01'),
+(10239, 'A-Check', 3750, '2024-01-01'),
+(10243, 'A-Check', 4500, '2024-01-01'),
+(10456, 'A-Check', 3000, '2024-01-01'),
+(10467, 'A-Check', 5250, '2024-01-01'),
+(10549, 'A-Check', 4500, '2024-01-01'),
+(10652, 'A-Check', 3750, '2024-01-01'),
+(10657, 'A-Check', 4500, '2024-01-01'),
+(10673, 'A-Check', 3750, '2024-01-01'),
+(10765, 'A-Check', 4500, '2024-01-01'),
+(10782, 'A-Check', 4500, '2024-01-01'),
+(10789, 'A-Check', 4500, '2024-01-01'),
+(10875, 'A-Check', 4500, '2024-01-01'),
+(10890, 'A-Check', 4500, '2024-01-01'),
+(10901, 'A-Check', 4500, '2024-01-01'),
+(10978, 'A-Check', 3750, '2024-01-01'),
+(10986, 'A-Check', 5250, '2024-01-01'),
+(14589, 'A-Check', 4500, '2024-01-01'),
+(30309, 'A-Check', 4500, '2024-01-01'),
+(30324, 'A-Check', 4500, '2024-01-01'),
+(30345, 'A-Check', 4500, '2024-01-01'),
+(30357, 'A-Check', 3750, '2024-01-01'),
+(30502, 'A-Check', 3750, '2024-01-01'),
+(30651, 'A-Check', 4500, '2024-01-01'),
+(30758, 'A-Check', 3750, '2024-01-01'),
+(50184, 'A-Check', 5250, '2024-01-01');
+
 INSERT INTO `ame_crew` (`staffid`, `name`, `login`, `pw`, `fleet_certified`) VALUES
 (80030001, 'Aarush Sharma', '80030001', 'password1', 'A320'),
 (80030002, 'Anika Reddy', '80030002', 'password2', 'A350'),
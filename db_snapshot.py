@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from backend.connection import db, connection
+from availability import Availability
+from change_log import ChangeLog
+from crew_eligibility import CrewEligibility
+from disruption_recovery import DisruptionRecovery
+from maintenance import Maintenance
+from reserve_planner import ReservePlanner
+from route_network import RouteNetwork
+from search_index import SearchIndex
+
+
+class DatabaseSnapshot:
+    """
+    The 'DatabaseSnapshot' class represents a utility class for saving the whole database to a directory of Parquet
+    files and loading it back, as a fast alternative to replaying 'crewopsprodb.sql'.
+
+    Each table is written to '<table>.parquet' in compressed column chunks. Rows are streamed from the server and
+    written CHUNK_ROWS at a time, so memory stays flat for tables with millions of rows. 'manifest.json' records, for
+    every table, its CREATE TABLE statement, its column types and its row count.
+
+    Restoring recreates every table from the manifest with foreign key and unique checks switched off, then loads each
+    file back in CHUNK_ROWS batches through multi-row INSERTs, one transaction per table. The live change log is kept
+    rather than restored: running processes follow it by sequence number, and a log that started again lower down would
+    hide new events from them. A 'restore' event is appended to it instead.
+
+    Attributes:
+        TABLES (list): Every table, parents before the tables referencing them.
+        CHUNK_ROWS (int): Rows per Parquet row group and per INSERT batch.
+        ARROW_TYPES (dict): The Arrow type used for each MySQL data type.
+
+    Methods:
+        columns(table: str) -> list[tuple[str, str]]:
+            Returns the (name, MySQL data type) of every column of a table, in order.
+
+        dump(directory: str) -> dict:
+            Writes every table to a Parquet file in 'directory' and returns the manifest.
+
+        restore(directory: str) -> dict:
+            Replaces every table with the contents of a snapshot and returns the rows loaded per table.
+    """
+
+    TABLES = [
+        "flight_crew",
+        "ame_crew",
+        "aircraft_fleet",
+        "flights",
+        "monthly_roster",
+        "reserve_roster",
+        "training",
+        "crew_leave",
+        "crew_bids",
+        "disruptions",
+        "aircraft_downtime",
+        "maintenance_checks",
+        "ame_assignment",
+        "change_log",
+    ]
+    CHUNK_ROWS = 50000
+    ARROW_TYPES = {
+        "int": pa.int64(),
+        "bigint": pa.int64(),
+        "tinyint": pa.int64(),
+        "smallint": pa.int64(),
+        "char": pa.string(),
+        "varchar": pa.string(),
+        "text": pa.string(),
+        "date": pa.date32(),
+        "time": pa.duration("us"),
+        "datetime": pa.timestamp("us"),
+        "json": pa.string(),
+        "float": pa.float64(),
+        "double": pa.float64(),
+    }
+
+    @staticmethod
+    def columns(table: str) -> list:
+        db.execute(
+            """SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s
+            ORDER BY ordinal_position""",
+            (table,),
+        )
+        return db.fetchall()
+
+    @staticmethod
+    def dump(directory: str) -> dict:
+        """
+        Writes every table to a Parquet file.
+
+        Parameters:
+            directory (str): The snapshot directory. Created if needed; existing files are overwritten.
+
+        Returns:
+            dict: The manifest, also saved as 'manifest.json' in 'directory'.
+
+        Note:
+            - Each table is read with a single SELECT on an unbuffered cursor and written as it arrives.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = {"created": time.time(), "tables": {}}
+        for table in DatabaseSnapshot.TABLES:
+            columns = DatabaseSnapshot.columns(table)
+            db.execute(f"SHOW CREATE TABLE {table}")
+            create = db.fetchall()[0][1]
+            schema = pa.schema(
+                [(name, DatabaseSnapshot.ARROW_TYPES.get(kind, pa.string())) for name, kind in columns]
+            )
+
+            rows = 0
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"SELECT * FROM {table}")
+                with pq.ParquetWriter(os.path.join(directory, f"{table}.parquet"), schema) as writer:
+                    while True:
+                        chunk = cursor.fetchmany(DatabaseSnapshot.CHUNK_ROWS)
+                        if not chunk:
+                            break
+                        values = list(zip(*chunk))
+                        writer.write_batch(
+                            pa.record_batch(
+                                [pa.array(values[i], type=field.type) for i, field in enumerate(schema)],
+                                schema=schema,
+                            )
+                        )
+                        rows += len(chunk)
+            finally:
+                cursor.close()
+
+            manifest["tables"][table] = {"create": create, "columns": columns, "rows": rows}
+
+        with open(os.path.join(directory, "manifest.json"), "w") as file:
+            json.dump(manifest, file, indent=2)
+        return manifest
+
+    @staticmethod
+    def restore(directory: str) -> dict:
+        """
+        Replaces every table with the contents of a snapshot.
+
+        Parameters:
+            directory (str): A directory written by 'dump'.
+
+        Returns:
+            dict[str, int]: The rows loaded into each table.
+
+        Note:
+            - Every table in the manifest is dropped and recreated, so the schema is the one the snapshot was taken
+              with. Foreign key and unique checks are off while loading and switched back on afterwards.
+            - The in-memory availability, eligibility, maintenance, search and route network caches are dropped once
+              loading finishes.
+            - The change log is only loaded from the snapshot into a database that has none; an existing log keeps its
+              events and gets one 'restore' event with the rows loaded per table.
+        """
+        with open(os.path.join(directory, "manifest.json")) as file:
+            manifest = json.load(file)
+
+        db.execute("SHOW TABLES LIKE %s", (ChangeLog.tablename,))
+        keepLog = bool(db.fetchall())
+
+        loaded = {}
+        db.execute("SET FOREIGN_KEY_CHECKS=0")
+        db.execute("SET UNIQUE_CHECKS=0")
+        try:
+            for table in DatabaseSnapshot.TABLES:
+                if table not in manifest["tables"] or (table == ChangeLog.tablename and keepLog):
+                    continue
+                db.execute(f"DROP TABLE IF EXISTS {table}")
+                db.execute(manifest["tables"][table]["create"])
+
+                parquet = pq.ParquetFile(os.path.join(directory, f"{table}.parquet"))
+                names = parquet.schema_arrow.names
+                columns = ", ".join(f"`{name}`" for name in names)
+                query = f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * len(names))})"
+                rows = 0
+                for batch in parquet.iter_batches(batch_size=DatabaseSnapshot.CHUNK_ROWS):
+                    chunk = list(zip(*(column.to_pylist() for column in batch.columns)))
+                    db.executemany(query, chunk)
+                    rows += len(chunk)
+                connection.commit()
+                loaded[table] = rows
+        finally:
+            db.execute("SET UNIQUE_CHECKS=1")
+            db.execute("SET FOREIGN_KEY_CHECKS=1")
+
+        Availability.invalidate()
+        CrewEligibility.invalidate()
+        DisruptionRecovery.invalidate()
+        Maintenance.invalidate()
+        ReservePlanner.invalidate()
+        SearchIndex.invalidate()
+        RouteNetwork.invalidate()
+        ChangeLog.record("database", "restore", os.path.basename(os.path.normpath(directory))[:64], {"tables": loaded})
+        ChangeLog.commit()
+        return loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Save or load a Parquet snapshot of the CrewOps Pro database.")
+    parser.add_argument("action", choices=["dump", "restore"])
+    parser.add_argument("directory")
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    if args.action == "dump":
+        counts = {table: entry["rows"] for table, entry in DatabaseSnapshot.dump(args.directory)["tables"].items()}
+    else:
+        counts = DatabaseSnapshot.restore(args.directory)
+    for table, rows in counts.items():
+        print(f"{table:<20}{rows:>12}")
+    print(f"{args.action} took {time.perf_counter() - began:.1f}s")
@@ -0,0 +1,355 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from availability import Availability
+from backend.connection import db, connection, read_db
+from cache_bus import CacheBus
+from change_log import ChangeLog
+from flight_schedule import FlightSchedule
+from maintenance import Maintenance
+from tail_assignment import TailAssignment
+
+
+class DisruptionRecovery:
+    """
+    The 'DisruptionRecovery' class represents the engine that repairs the published roster when an aircraft goes AOG
+    (aircraft on ground), by moving the legs rostered on it to other tails of the same type.
+
+    The roster is indexed by tail: every MSN maps to its rostered days, and every day to its legs as (dep, arr,
+    departure, arrival, flight_no) tuples sorted by departure, in the minutes of 'FlightSchedule'. The index is built
+    with one query on first use and then follows the change log, so finding the legs of a tail and the gaps in another
+    tail's day are dictionary and binary search lookups.
+
+    For every day from the AOG onwards, the grounded tail's legs are handed out in blocks of consecutive legs, longest
+    first, so its rotation stays together where possible. A block fits a tail of the same type, available and not due a
+    check that day, when the tail is idle from the block's first departure until its last arrival plus the minimum
+    turnaround, and is parked at the station the block starts from and needed next at the station it ends at. The
+    tail's previous and next legs may be on the days before and after. Of the tails a block fits, the one with the
+    least idle time around it is taken, which keeps long gaps free for the blocks still to place. Legs that fit nowhere
+    stay on the grounded tail and are reported as stranded.
+
+    All moves, the engine hours they shift between tails, one 'disruptions' row per affected leg and the change log
+    events of the moves are written in a single transaction. The 'disruptions' table is the disruption history the
+    reserve planner works from.
+
+    Attributes:
+        tablename (str): The name of the table in the database where disruptions are recorded.
+        ROSTER_TABLE (str): The name of the monthly roster table.
+        IDLE_UNKNOWN (int): The idle time in minutes counted for a side of a block where the tail has no legs.
+
+    Methods:
+        aircraftDown(msn: int, start: date = None) -> dict:
+            Moves the legs of a grounded aircraft to other tails and records the disruption.
+
+        tailDay(msn: int, day: date) -> list[tuple]:
+            Returns the legs rostered on a tail on a day.
+
+        disruptions(start: date = None, end: date = None) -> list:
+            Retrieves the recorded disruptions, optionally within a period.
+
+        invalidate() -> None:
+            Drops the index so it is rebuilt on next use.
+    """
+
+    tablename = "disruptions"
+    ROSTER_TABLE = "monthly_roster"
+    IDLE_UNKNOWN = 1440
+
+    _tails = {}  # msn -> {date: [(dep, arr, departure, arrival, flight_no), ...] sorted by departure}
+    _rostered = {}  # (date, flight_no) -> msn
+    _schedule = None
+    _offset = None
+    _version = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def invalidate() -> None:
+        DisruptionRecovery._offset = None
+        CacheBus.publish("recovery")
+
+    @staticmethod
+    def _leg(flight_no: int) -> tuple:
+        schedule = DisruptionRecovery._schedule
+        try:
+            index = schedule.indexOf(flight_no)
+        except KeyError:
+            return None
+        stations = schedule.stations
+        return (
+            int(schedule.dep[index]),
+            int(schedule.arr[index]),
+            stations[schedule.departure[index]],
+            stations[schedule.arrival[index]],
+            flight_no,
+        )
+
+    @staticmethod
+    def _place(day: date, flight_no: int, msn: int) -> None:
+        DisruptionRecovery._unplace(day, flight_no)
+        leg = DisruptionRecovery._leg(flight_no)
+        if leg is None:
+            return
+        DisruptionRecovery._rostered[(day, flight_no)] = msn
+        insort(DisruptionRecovery._tails.setdefault(msn, {}).setdefault(day, []), leg)
+
+    @staticmethod
+    def _unplace(day: date, flight_no: int) -> None:
+        msn = DisruptionRecovery._rostered.pop((day, flight_no), None)
+        if msn is None:
+            return
+        legs = DisruptionRecovery._tails[msn][day]
+        legs.remove(DisruptionRecovery._leg(flight_no))
+        if not legs:
+            del DisruptionRecovery._tails[msn][day]
+
+    @staticmethod
+    def _build() -> None:
+        offset = ChangeLog.latest()
+        schedule = FlightSchedule.load()
+        db.execute(f"SELECT date, flight_no, aircraft_msn FROM {DisruptionRecovery.ROSTER_TABLE}")
+        rows = db.fetchall()
+        connection.commit()
+
+        DisruptionRecovery._schedule = schedule
+        tails, rostered = {}, {}
+        for day, flight_no, msn in rows:
+            leg = DisruptionRecovery._leg(flight_no)
+            if leg is not None:
+                rostered[(day, flight_no)] = msn
+                tails.setdefault(msn, {}).setdefault(day, []).append(leg)
+        for days in tails.values():
+            for legs in days.values():
+                legs.sort()
+        DisruptionRecovery._tails, DisruptionRecovery._rostered = tails, rostered
+        DisruptionRecovery._offset = offset
+
+    @staticmethod
+    def _apply(event) -> bool:
+        # Returns False when the event needs the index rebuilt
+        if event.entity == "flights" or (
+            event.entity == DisruptionRecovery.ROSTER_TABLE and event.action in ("publish", "delete")
+        ):
+            return False
+        if event.entity == DisruptionRecovery.ROSTER_TABLE and event.data:
+            day = event.data["flight_date"]
+            day = day if isinstance(day, date) else date.fromisoformat(str(day)[:10])
+            DisruptionRecovery._place(day, int(event.data["flight_no"]), int(event.data["msn"]))
+        elif event.entity == "aircraft_fleet" and event.action == "delete":
+            # The roster rows of a deleted aircraft go with it
+            for day, legs in DisruptionRecovery._tails.pop(int(event.key), {}).items():
+                for leg in legs:
+                    DisruptionRecovery._rostered.pop((day, leg[4]), None)
+        return True
+
+    @staticmethod
+    def _refresh() -> None:
+        version = CacheBus.version("recovery")
+        if DisruptionRecovery._offset is None or DisruptionRecovery._version != version:
+            DisruptionRecovery._build()
+            DisruptionRecovery._version = version
+        while True:
+            events = ChangeLog.since(DisruptionRecovery._offset)
+            if not events:
+                return
+            for event in events:
+                if not DisruptionRecovery._apply(event):
+                    DisruptionRecovery._build()
+                    break
+            else:
+                DisruptionRecovery._offset = events[-1].seq
+
+    @staticmethod
+    def tailDay(msn: int, day: date) -> list:
+        with DisruptionRecovery._lock:
+            DisruptionRecovery._refresh()
+            return list(DisruptionRecovery._tails.get(msn, {}).get(day, []))
+
+    @staticmethod
+    def _idle(block: list, legs: list, before: list, after: list, turnaround: int):
+        # Minutes the tail would stand idle around the block, or None if the block does not fit its day
+        first, last = block[0], block[-1]
+        position = bisect_left(legs, first)
+        idle = 0
+        if position:
+            previous, ready = legs[position - 1], legs[position - 1][1]
+        elif before:
+            previous, ready = before[-1], before[-1][1] - 1440
+        else:
+            previous = None
+        if previous is None:
+            idle += DisruptionRecovery.IDLE_UNKNOWN
+        elif previous[3] != first[2] or ready + turnaround > first[0]:
+            return None
+        else:
+            idle += first[0] - ready
+
+        if position < len(legs):
+            following, due = legs[position], legs[position][0]
+        elif after:
+            following, due = after[0], after[0][0] + 1440
+        else:
+            following = None
+        if following is None:
+            idle += DisruptionRecovery.IDLE_UNKNOWN
+        elif following[2] != last[3] or last[1] + turnaround > due:
+            return None
+        else:
+            idle += due - last[1]
+        return idle
+
+    @staticmethod
+    def aircraftDown(msn: int, start: date = None) -> dict:
+        """
+        Moves the rostered legs of a grounded aircraft to other tails of its type and records the disruption.
+
+        Parameters:
+            msn (int): The MSN of the aircraft that went AOG.
+            start (date, optional): The first day to recover. Defaults to the current date.
+
+        Returns:
+            dict: A dictionary with the following keys:
+                - msn (int): The grounded aircraft.
+                - legs (int): The number of rostered legs it had from 'start' on.
+                - moves (list[tuple]): (date, flight_no, msn, regn) of every leg moved, with the tail it moved to.
+                - stranded (list[tuple]): (date, flight_no) of the legs no tail could take, still on the grounded tail.
+                - seconds (float): The time taken.
+
+        Note:
+            - Tails of the same type that are switched off, under a downtime period or due a maintenance check on a
+              day are not used that day.
+            - Engine hours accrued for upcoming legs at publication move with the legs, as 'Roster.addRoster' would
+              have accrued them.
+        """
+        started = time.perf_counter()
+        start = start or date.today()
+        db.execute("SELECT msn, type, availability, regn FROM aircraft_fleet")
+        fleet = {row[0]: row[1:] for row in db.fetchall()}
+        connection.commit()
+        if msn not in fleet:
+            raise ValueError("Aircraft not found")
+        actype = fleet[msn][0]
+        turnaround = TailAssignment.MIN_TURNAROUND.get(actype, TailAssignment.DEFAULT_TURNAROUND)
+        sameType = [
+            tail for tail, (kind, available, _) in fleet.items() if kind == actype and available and tail != msn
+        ]
+
+        with DisruptionRecovery._lock:
+            DisruptionRecovery._refresh()
+            grounded = DisruptionRecovery._tails.get(msn, {})
+            planned = {}  # (msn, date) -> legs of that day including the blocks placed so far
+
+            def dayLegs(tail: int, day: date) -> list:
+                legs = planned.get((tail, day))
+                return legs if legs is not None else DisruptionRecovery._tails.get(tail, {}).get(day, [])
+
+            affected, moves, stranded = [], [], []
+            for day in sorted(day for day in grounded if day >= start):
+                legs = grounded[day]
+                affected += [(day, leg) for leg in legs]
+                down = Availability.fleetDown(day) | Maintenance.dueBy(day)
+                tails = [tail for tail in sameType if tail not in down]
+                yesterday, tomorrow = day - timedelta(days=1), day + timedelta(days=1)
+                first = 0
+                while first < len(legs):
+                    for last in range(len(legs), first, -1):
+                        block = legs[first:last]
+                        fits = []
+                        for tail in tails:
+                            idle = DisruptionRecovery._idle(
+                                block, dayLegs(tail, day), dayLegs(tail, yesterday), dayLegs(tail, tomorrow), turnaround
+                            )
+                            if idle is not None:
+                                fits.append((idle, tail))
+                        if fits:
+                            break
+                    if not fits:
+                        stranded.append((day, legs[first][4]))
+                        first += 1
+                        continue
+                    tail = min(fits)[1]
+                    placed = list(dayLegs(tail, day))
+                    for leg in block:
+                        insort(placed, leg)
+                        moves.append((day, leg[4], tail, fleet[tail][2]))
+                    planned[(tail, day)] = placed
+                    first = last
+
+            if affected:
+                if moves:
+                    touched = sorted({msn} | {tail for _, _, tail, _ in moves})
+                    DisruptionRecovery._accrue(-1, touched)
+                    db.executemany(
+                        f"UPDATE {DisruptionRecovery.ROSTER_TABLE} SET aircraft_msn=%s WHERE date=%s AND flight_no=%s",
+                        [(tail, day, flight_no) for day, flight_no, tail, _ in moves],
+                    )
+                    DisruptionRecovery._accrue(1, touched)
+                now = datetime.now()
+                moved = {(day, flight_no) for day, flight_no, _, _ in moves}
+                db.executemany(
+                    f"""INSERT INTO {DisruptionRecovery.tablename}
+                        (reported_at, day, station, kind, msn, flight_no, recovered)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s)""",
+                    [(now, day, leg[2], "aog", msn, leg[4], (day, leg[4]) in moved) for day, leg in affected],
+                )
+                ChangeLog.recordMany(
+                    DisruptionRecovery.ROSTER_TABLE,
+                    "modify",
+                    [
+                        (f"{day}/{flight_no}", {"flight_date": day, "flight_no": flight_no, "msn": tail})
+                        for day, flight_no, tail, _ in moves
+                    ],
+                )
+                ChangeLog.commit()
+                for day, flight_no, tail, _ in moves:
+                    DisruptionRecovery._place(day, flight_no, tail)
+
+        if moves:
+            Maintenance.invalidate()
+        return {
+            "msn": msn,
+            "legs": len(affected),
+            "moves": moves,
+            "stranded": stranded,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    @staticmethod
+    def _accrue(sign: int, msns: list) -> None:
+        # The same block hours 'Roster._accrueEngineHours' accrues, for the tails whose legs move only
+        placeholders = ",".join(["%s"] * len(msns))
+        query = f"""UPDATE aircraft_fleet af
+            JOIN (
+                SELECT r.aircraft_msn AS msn, ROUND(SUM(TIME_TO_SEC(f.duration)) / 3600) AS hours
+                FROM {DisruptionRecovery.ROSTER_TABLE} r JOIN flights f ON r.flight_no = f.flight_no
+                WHERE r.date >= CURDATE() AND r.aircraft_msn IN ({placeholders})
+                GROUP BY r.aircraft_msn
+            ) flown ON af.msn = flown.msn
+            SET af.engine_hours = af.engine_hours + {int(sign)} * flown.hours"""
+        db.execute(query, tuple(msns))
+
+    @staticmethod
+    def disruptions(start: date = None, end: date = None) -> list:
+        """
+        Retrieves the recorded disruptions.
+
+        Parameters:
+            start (date, optional): The first day to include.
+            end (date, optional): The last day to include.
+
+        Returns:
+            list[tuple]: (disruption_id, reported_at, day, station, kind, msn, flight_no, recovered) tuples, newest day
+            first.
+        """
+        query = f"SELECT * FROM {DisruptionRecovery.tablename}"
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("day >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("day <= %s")
+            params.append(end)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        read_db.execute(query + " ORDER BY day DESC, station, flight_no", tuple(params))
+        return read_db.fetchall()
@@ -1,5 +1,9 @@
 import enum
-from backend.connection import db, connection
+from datetime import date
+from availability import Availability
+from backend.connection import db, connection, read_db
+from change_log import ChangeLog
+from crew_eligibility import CrewEligibility
 from models.flight_crew_model import FlightCrewModel
 
 
@@ -23,6 +27,9 @@ class FlightCrew:
         updateAvail(sap: int, availBool: bool) -> None:
             Updates the availability status of a flight crew member in the database.
 
+        updateAvailBulk(availBool: bool, saps: list = None, base: str = None, designations: list = None) -> int:
+            Updates the availability status of every flight crew member matching a selection in one transaction.
+
         isAvailable(sap: int) -> None:
             Sets the availability status of a flight crew member to True in the database.
 
@@ -32,17 +39,17 @@ class FlightCrew:
         objectify(crew: List[List[Union[int, str, bool]]]) -> List[FlightCrewModel]:
             Converts a list of flight crew member data into a list of FlightCrewModel instances.
 
-        availableP1() -> List[FlightCrewModel]:
-            Retrieves a list of available P1 flight crew members from the database.
+        availableP1(on: date = None) -> List[FlightCrewModel]:
+            Retrieves a list of available P1 flight crew members from the database, optionally excluding crew on leave on a date.
 
-        availableP2() -> List[FlightCrewModel]:
-            Retrieves a list of available P2 flight crew members from the database.
+        availableP2(on: date = None) -> List[FlightCrewModel]:
+            Retrieves a list of available P2 flight crew members from the database, optionally excluding crew on leave on a date.
 
-        find_suitable_P1(availP1: List[FlightCrewModel], dutyTimeP1: Dict[int, int]) -> FlightCrewModel:
-            Finds the next available P1 flight crew member whose duty time has not exceeded 8 hours.
+        find_suitable_P1(availP1: List[FlightCrewModel], dutyTimeP1: Dict[int, int], busy: Set[int] = frozenset()) -> FlightCrewModel:
+            Finds the next available P1 flight crew member whose duty time has not exceeded 8 hours and who is not busy, or None.
 
-        find_suitable_P2(availP2: List[FlightCrewModel], dutyTimeP2: Dict[int, int]) -> FlightCrewModel:
-            Finds the next available P2 flight crew member whose duty time has not exceeded 8 hours.
+        find_suitable_P2(availP2: List[FlightCrewModel], dutyTimeP2: Dict[int, int], busy: Set[int] = frozenset()) -> FlightCrewModel:
+            Finds the next available P2 flight crew member whose duty time has not exceeded 8 hours and who is not busy, or None.
     """
 
     tablename = "flight_crew"
@@ -83,18 +90,22 @@ class FlightCrew:
         VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"""
         data = tuple(pilot.model_dump().values())
         db.execute(query, data)
-        connection.commit()
+        ChangeLog.record(FlightCrew.tablename, "add", pilot.sap, pilot.model_dump(exclude={"login", "pw"}))
+        ChangeLog.commit()
+        FlightCrew._invalidateCaches()
 
     @staticmethod
     def deleteCrew(sap) -> None:
         db.execute(f"DELETE FROM {FlightCrew.tablename} WHERE staffid={sap}")
-        connection.commit()
+        ChangeLog.record(FlightCrew.tablename, "delete", sap)
+        ChangeLog.commit()
+        FlightCrew._invalidateCaches()
 
     @staticmethod
     def viewCrew() -> list:
         query = f"SELECT * FROM {FlightCrew.tablename}"
-        db.execute(query)
-        crewViewList = db.fetchall()
+        read_db.execute(query)
+        crewViewList = read_db.fetchall()
 
         def replaceNonBoolean(seq):
             modifiedList = [list(item) for item in seq]
@@ -113,19 +124,65 @@ class FlightCrew:
         newData = [val2 if val2 != "" else val1 for val1, val2 in zip(oldData, formData)]  # type: ignore
         modelDict = dict(zip(list(FlightCrewModel.__annotations__.keys()), newData))
         pilot = FlightCrewModel.model_validate(modelDict)
-        db.execute(f"DELETE FROM {FlightCrew.tablename} WHERE staffid={sap}")
-        newQuery = f"""INSERT INTO {FlightCrew.tablename}
-        (staffid, fname, lname, designation, contact, atpl, license_no, medical_validity, base_ops, availability, login, pw)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"""
+        # Updated in place: a DELETE would cascade to the crew member's roster, leave, trainings, bids and standby duties
+        newQuery = f"""UPDATE {FlightCrew.tablename}
+        SET staffid=%s, fname=%s, lname=%s, designation=%s, contact=%s, atpl=%s, license_no=%s, medical_validity=%s,
+            base_ops=%s, availability=%s, login=%s, pw=%s
+        WHERE staffid=%s"""
         data = tuple(pilot.model_dump().values())
-        db.execute(newQuery, data)
-        connection.commit()
+        db.execute(newQuery, (*data, sap))
+        ChangeLog.record(FlightCrew.tablename, "modify", sap, pilot.model_dump(exclude={"login", "pw"}))
+        ChangeLog.commit()
+        FlightCrew._invalidateCaches()
+
+    @staticmethod
+    def _invalidateCaches() -> None:
+        # In-memory indexes built from flight_crew are rebuilt on next use
+        Availability.invalidate()
+        CrewEligibility.invalidate()
 
     @staticmethod
     def updateAvail(sap: int, availBool) -> None:
-        query = f"UPDATE {FlightCrew.tablename} SET availability={availBool} WHERE staffid={sap}"
-        db.execute(query)
-        connection.commit()
+        FlightCrew.updateAvailBulk(availBool, saps=[sap])
+
+    @staticmethod
+    def updateAvailBulk(availBool, saps: list = None, base: str = None, designations: list = None) -> int:
+        """
+        Updates the availability status of every flight crew member matching a selection.
+
+        Parameters:
+            availBool (bool): The new availability status.
+            saps (list[int], optional): The SAPs (Staff IDs) to update.
+            base (str, optional): Only crew based at this station.
+            designations (list[str], optional): Only crew with one of these designations.
+
+        Returns:
+            int: The number of crew members whose availability changed.
+
+        Raises:
+            ValueError: If no selection is given.
+
+        Note:
+            - Selections combine as in 'Availability.crewFilter'.
+            - The crew that will change are locked and read first, so the change log gets one event per crew member;
+              a single set-based UPDATE then changes them all, and everything commits together.
+        """
+        availBool = bool(availBool)
+        where, params = Availability.crewFilter(saps, base, designations)
+        where += " AND availability <> %s"
+        params += (availBool,)
+        db.execute(f"SELECT staffid FROM {FlightCrew.tablename} WHERE {where} FOR UPDATE", params)
+        changed = [row[0] for row in db.fetchall()]
+        if not changed:
+            connection.commit()
+            return 0
+        db.execute(f"UPDATE {FlightCrew.tablename} SET availability=%s WHERE {where}", (availBool, *params))
+        ChangeLog.recordMany(
+            FlightCrew.tablename, "modify", [(sap, {"availability": availBool}) for sap in changed]
+        )
+        ChangeLog.commit()
+        FlightCrew._invalidateCaches()
+        return len(changed)
 
     @staticmethod
     def isAvailabie(sap: int) -> None:
@@ -141,11 +198,7 @@ class FlightCrew:
         Raises:
             None
         """
-        query = (
-            f"UPDATE {FlightCrew.tablename} SET availability=True WHERE staffid={sap}"
-        )
-        db.execute(query)
-        connection.commit()
+        FlightCrew.updateAvailBulk(True, saps=[sap])
 
     @staticmethod
     def isCrewed(sap: int) -> None:
@@ -161,11 +214,7 @@ class FlightCrew:
         Raises:
             None
         """
-        query = (
-            f"UPDATE {FlightCrew.tablename} SET availability=False WHERE staffid={sap}"
-        )
-        db.execute(query)
-        connection.commit()
+        FlightCrew.updateAvailBulk(False, saps=[sap])
 
     # Returns a list of FlightCrewModel instances from an input of db.fetchall()
     @staticmethod
@@ -191,19 +240,26 @@ class FlightCrew:
 
     # Returns a list[FlightCrewModel] of Available P1
     @staticmethod
-    def availableP1() -> list[FlightCrewModel]:
+    def availableP1(on: date = None) -> list[FlightCrewModel]:
         """
         Retrieves a list of available P1 flight crew members from the database.
 
+        Parameters:
+            on (date, optional): When given, crew with a leave period covering this date are left out.
+
         Returns:
             list[FlightCrewModel]: A list of FlightCrewModel instances representing the available P1 flight crew members.
+            Crew whose medical has already lapsed are filtered out in SQL, so they never reach model validation.
 
         Raises:
             None
         """
-        query = f"SELECT * FROM {FlightCrew.tablename} WHERE designation IN ('Commander','Sr Commander','LTC', 'TRI','DE') AND availability=1"
+        query = f"SELECT * FROM {FlightCrew.tablename} WHERE designation IN ('Commander','Sr Commander','LTC', 'TRI','DE') AND availability=1 AND medical_validity >= CURDATE()"
         db.execute(query)
         crew = db.fetchall()
+        if on is not None:
+            onLeave = Availability.crewOnLeave(on)
+            crew = [crewman for crewman in crew if crewman[0] not in onLeave]
         return [
             FlightCrewModel.model_validate(
                 dict(zip(FlightCrewModel.__annotations__, crewman))
@@ -213,19 +269,26 @@ class FlightCrew:
 
     # Returns a list[FlightCrewModel] of Available P2
     @staticmethod
-    def availableP2() -> list[FlightCrewModel]:
+    def availableP2(on: date = None) -> list[FlightCrewModel]:
         """
         Retrieves a list of available P2 flight crew members from the database.
 
+        Parameters:
+            on (date, optional): When given, crew with a leave period covering this date are left out.
+
         Returns:
             list[FlightCrewModel]: A list of FlightCrewModel instances representing the available P2 flight crew members.
+            Crew whose medical has already lapsed are filtered out in SQL, so they never reach model validation.
 
         Raises:
             None
         """
-        query = f"SELECT * FROM {FlightCrew.tablename} WHERE designation IN ('JFO','FO','SFO') AND availability=1"
+        query = f"SELECT * FROM {FlightCrew.tablename} WHERE designation IN ('JFO','FO','SFO') AND availability=1 AND medical_validity >= CURDATE()"
         db.execute(query)
         crew = db.fetchall()
+        if on is not None:
+            onLeave = Availability.crewOnLeave(on)
+            crew = [crewman for crewman in crew if crewman[0] not in onLeave]
         return [
             FlightCrewModel.model_validate(
                 dict(zip(FlightCrewModel.__annotations__, crewman))
@@ -236,7 +299,7 @@ class FlightCrew:
     @staticmethod
     # Returns the list of next available P1 whose Duty Time has not exceeded 8 hrs
     def find_suitable_P1(
-        availP1: list[FlightCrewModel], dutyTimeP1: dict
+        availP1: list[FlightCrewModel], dutyTimeP1: dict, busy: set = frozenset()
     ) -> FlightCrewModel:
         """
         Returns the next available P1 flight crew member whose duty time has not exceeded 8 hours.
@@ -244,21 +307,26 @@ class FlightCrew:
         Parameters:
             availP1 (list[FlightCrewModel]): A list of available P1 flight crew members.
             dutyTimeP1 (dict): A dictionary mapping SAP (Staff ID) to duty time in hours.
+            busy (set, optional): SAPs (Staff IDs) that are not free for flying, e.g. crew in training that day.
 
         Returns:
-            FlightCrewModel: The next available P1 flight crew member whose duty time has not exceeded 8 hours.
+            FlightCrewModel: The next available P1 flight crew member whose duty time has not exceeded 8 hours, or None
+            when every crew member in the list is busy or out of duty time.
 
         Raises:
             None
+
+        Note:
+            - The list is only scanned. The caller removes the crew member it assigns.
         """
-        while dutyTimeP1[availP1[0].sap] >= 8:
-            availP1.pop(0)
-        return availP1[0]
+        return next(
+            (crewman for crewman in availP1 if dutyTimeP1[crewman.sap] < 8 and crewman.sap not in busy), None
+        )
 
     @staticmethod
     # Returns the list of next available P2 whose Duty Time has not exceeded 8 hrs
     def find_suitable_P2(
-        availP2: list[FlightCrewModel], dutyTimeP2: dict
+        availP2: list[FlightCrewModel], dutyTimeP2: dict, busy: set = frozenset()
     ) -> FlightCrewModel:
         """
         Returns the next available P2 flight crew member whose duty time has not exceeded 8 hours.
@@ -266,13 +334,18 @@ class FlightCrew:
         Parameters:
             availP2 (list[FlightCrewModel]): A list of available P2 flight crew members.
             dutyTimeP2 (dict): A dictionary mapping SAP (Staff ID) to duty time in hours.
+            busy (set, optional): SAPs (Staff IDs) that are not free for flying, e.g. crew in training that day.
 
         Returns:
-            FlightCrewModel: The next available P2 flight crew member whose duty time has not exceeded 8 hours.
+            FlightCrewModel: The next available P2 flight crew member whose duty time has not exceeded 8 hours, or None
+            when every crew member in the list is busy or out of duty time.
 
         Raises:
             None
+
+        Note:
+            - The list is only scanned. The caller removes the crew member it assigns.
         """
-        while dutyTimeP2[availP2[0].sap] >= 8:
-            availP2.pop(0)
-        return availP2[0]
+        return next(
+            (crewman for crewman in availP2 if dutyTimeP2[crewman.sap] < 8 and crewman.sap not in busy), None
+        )
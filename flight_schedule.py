@@ -0,0 +1,160 @@
+import numpy as np
+from backend.connection import db
+from flights import Flight
+
+
+class FlightSchedule:
+    """
+    The 'FlightSchedule' class represents the daily flight schedule as compact integer arrays, parsed once, for the
+    engines that do time arithmetic on it (tail assignment, crew pairing, duty and connection checks).
+
+    Times are minutes after midnight of the departure day. 'dep' is in 0-1439. 'arr' is the scheduled arrival time (the
+    'eta' of the flight), moved to the next day by adding 1440 when it is earlier than 'dep', so a flight landing after
+    midnight has an 'arr' of 1440 or more and a 'dayOffset' of 1; overnight flights are never ambiguous and block times
+    are plain differences. The stored 'duration' of a flight is not used. Stations and aircraft types are stored as small
+    integer codes into 'stations' and 'actypes'.
+
+    'FlightModel' keeps its "HH:MM" strings for validation and storage; they are parsed here, once per schedule, instead
+    of once per use.
+
+    Attributes:
+        flightNo (np.ndarray): Flight numbers (int32).
+        dep (np.ndarray): Departure minute after midnight (int16).
+        arr (np.ndarray): Arrival minute after midnight of the departure day (int16).
+        departure (np.ndarray): Code of the departure station in 'stations' (int16).
+        arrival (np.ndarray): Code of the arrival station in 'stations' (int16).
+        actype (np.ndarray): Code of the aircraft type in 'actypes' (int16).
+        stations (list[str]): The station IATA codes, sorted.
+        actypes (list[str]): The aircraft types, sorted.
+
+    Methods:
+        fromFlights(flights: list[FlightModel]) -> FlightSchedule:
+            Builds a schedule from flight models.
+
+        load() -> FlightSchedule:
+            Reads the schedule from the database, with times converted to minutes in SQL.
+
+        edited(remove: Iterable[int] = (), add: list[FlightModel] = ()) -> FlightSchedule:
+            Returns a copy of the schedule with flights dropped and added.
+
+        block -> np.ndarray:
+            Block time of every flight in minutes, 'arr' minus 'dep'.
+
+        dayOffset -> np.ndarray:
+            1 for flights landing the day after they depart, else 0.
+
+        indexOf(flight_no: int) -> int:
+            Returns the position of a flight in the arrays.
+
+        legs(actype: str = None) -> list[tuple]:
+            Returns (dep, arr, departure, arrival, flight_no) legs sorted by departure, optionally of one type only.
+    """
+
+    def __init__(self, flightNo, departure, arrival, actype, dep, arr) -> None:
+        self.stations = sorted(set(departure) | set(arrival))
+        self.actypes = sorted(set(actype))
+        stationCode = {station: code for code, station in enumerate(self.stations)}
+        typeCode = {name: code for code, name in enumerate(self.actypes)}
+
+        self.flightNo = np.asarray(flightNo, dtype=np.int32)
+        self.departure = np.array([stationCode[station] for station in departure], dtype=np.int16)
+        self.arrival = np.array([stationCode[station] for station in arrival], dtype=np.int16)
+        self.actype = np.array([typeCode[name] for name in actype], dtype=np.int16)
+        self.dep = np.asarray(dep, dtype=np.int16)
+        arr = np.asarray(arr, dtype=np.int16)
+        self.arr = np.where(arr < self.dep, arr + 1440, arr).astype(np.int16)
+        self._position = None
+        self._legs = {}
+
+    def __len__(self) -> int:
+        return len(self.flightNo)
+
+    @staticmethod
+    def fromFlights(flights: list) -> "FlightSchedule":
+        return FlightSchedule(
+            [flight.flight_no for flight in flights],
+            [flight.dep for flight in flights],
+            [flight.arr for flight in flights],
+            [flight.actype for flight in flights],
+            [Flight.minutes(flight.etd) for flight in flights],
+            [Flight.minutes(flight.eta) for flight in flights],
+        )
+
+    @staticmethod
+    def load() -> "FlightSchedule":
+        db.execute(
+            f"""SELECT flight_no, departure, arrival, aircraft_type,
+                TIME_TO_SEC(dep_time) DIV 60, TIME_TO_SEC(arr_time) DIV 60
+            FROM {Flight.tablename}"""
+        )
+        rows = db.fetchall()
+        if not rows:
+            return FlightSchedule([], [], [], [], [], [])
+        return FlightSchedule(*zip(*rows))
+
+    def edited(self, remove=(), add=()) -> "FlightSchedule":
+        """
+        Returns a copy of the schedule with flights dropped and added. The schedule itself is left unchanged.
+
+        Parameters:
+            remove (Iterable[int], optional): Flight numbers to drop.
+            add (list[FlightModel], optional): Flights to add.
+
+        Returns:
+            FlightSchedule: The edited schedule.
+        """
+        removed = set(remove)
+        keep = np.array([number not in removed for number in self.flightNo.tolist()], dtype=bool)
+        return FlightSchedule(
+            self.flightNo[keep].tolist() + [flight.flight_no for flight in add],
+            [self.stations[code] for code in self.departure[keep].tolist()] + [flight.dep for flight in add],
+            [self.stations[code] for code in self.arrival[keep].tolist()] + [flight.arr for flight in add],
+            [self.actypes[code] for code in self.actype[keep].tolist()] + [flight.actype for flight in add],
+            self.dep[keep].tolist() + [Flight.minutes(flight.etd) for flight in add],
+            (self.arr[keep] % 1440).tolist() + [Flight.minutes(flight.eta) for flight in add],
+        )
+
+    @property
+    def block(self) -> np.ndarray:
+        return self.arr - self.dep
+
+    @property
+    def dayOffset(self) -> np.ndarray:
+        return self.arr // 1440
+
+    def indexOf(self, flight_no: int) -> int:
+        if self._position is None:
+            self._position = {number: index for index, number in enumerate(self.flightNo.tolist())}
+        return self._position[flight_no]
+
+    def legs(self, actype: str = None) -> list:
+        """
+        Returns the flights as legs sorted by departure.
+
+        Parameters:
+            actype (str, optional): Only return flights of this aircraft type.
+
+        Returns:
+            list[tuple]: (dep, arr, departure, arrival, flight_no) tuples of plain ints and station codes (str), in
+            the same minutes as 'dep' and 'arr'. The list is built once per type and shared, so callers must not
+            change it.
+        """
+        if actype not in self._legs:
+            if actype is None:
+                selected = np.arange(len(self))
+            else:
+                code = self.actypes.index(actype) if actype in self.actypes else -1
+                selected = np.flatnonzero(self.actype == code)
+            stations = self.stations
+            legs = list(
+                zip(
+                    self.dep[selected].tolist(),
+                    self.arr[selected].tolist(),
+                    [stations[code] for code in self.departure[selected].tolist()],
+                    [stations[code] for code in self.arrival[selected].tolist()],
+                    self.flightNo[selected].tolist(),
+                )
+            )
+            legs.sort()
+            self._legs[actype] = legs
+        return self._legs[actype]
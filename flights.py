@@ -1,5 +1,7 @@
+from datetime import timedelta
 from models.flights_model import FlightModel
-from backend.connection import db, connection
+from backend.connection import db, read_db
+from change_log import ChangeLog
 
 
 class Flight:
@@ -14,6 +16,7 @@ class Flight:
         viewFlights() -> list: Retrieves all flights from the database.
         deleteFlight(flight_no: int) -> None: Deletes a flight from the database.
         allFlights() -> list[FlightModel]: Retrieves all flights from the database as a list of FlightModel objects.
+        minutes(value) -> int: Converts a flight time ("HH:MM", "HH:MM:SS" or a timedelta) to minutes since midnight.
 
     """
 
@@ -33,19 +36,21 @@ class Flight:
         query = f"INSERT INTO {Flight.tablename} (flight_no, departure, arrival, aircraft_type, dep_time, arr_time, duration) VALUES (%s,%s,%s,%s,%s,%s,%s)"
         data = tuple(flt.model_dump().values())
         db.execute(query, data)
-        connection.commit()
+        ChangeLog.record(Flight.tablename, "add", flt.flight_no, flt.model_dump())
+        ChangeLog.commit()
 
     @staticmethod
     def viewFlights() -> list:
         query = f"SELECT * FROM {Flight.tablename}"
-        db.execute(query)
-        return db.fetchall()
+        read_db.execute(query)
+        return read_db.fetchall()
 
     @staticmethod
     def deleteFlight(flight_no: int) -> None:
         query = f"DELETE FROM {Flight.tablename} WHERE flight_no={flight_no}"
         db.execute(query)
-        connection.commit()
+        ChangeLog.record(Flight.tablename, "delete", flight_no)
+        ChangeLog.commit()
 
     # Returns list[FlightModel] from DB
     @staticmethod
@@ -64,3 +69,20 @@ class Flight:
             FlightModel.model_validate(dict(zip(FlightModel.__annotations__, flt)))
             for flt in flights
         ]
+
+    @staticmethod
+    def minutes(value) -> int:
+        """
+        Converts a flight time to minutes since midnight.
+
+        Parameters:
+            value (str | timedelta): A time as stored on FlightModel ("HH:MM" or "HH:MM:SS") or as returned by the
+                database driver for TIME columns (timedelta).
+
+        Returns:
+            int: The number of minutes since midnight.
+        """
+        if isinstance(value, timedelta):
+            return int(value.total_seconds()) // 60
+        parts = str(value).split(":")
+        return int(parts[0]) * 60 + int(parts[1])
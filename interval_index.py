@@ -0,0 +1,157 @@
+from bisect import bisect_right
+
+
+class Timeline:
+    """
+    The 'Timeline' class represents the busy time of a single resource (a crew member, an aircraft) as a sorted list of
+    disjoint intervals.
+
+    Overlapping or touching intervals are merged when they are added, so the starts and ends lists stay sorted and every
+    lookup is a single binary search.
+
+    Attributes:
+        starts (list[int]): The start of every busy block, in ascending order.
+        ends (list[int]): The end of every busy block, aligned with 'starts'. Ends are exclusive.
+
+    Methods:
+        fromIntervals(intervals: Iterable[tuple[int, int]]) -> Timeline:
+            Builds a timeline from unsorted intervals in O(n log n).
+
+        add(start: int, end: int) -> None:
+            Marks [start, end) as busy, merging it with any neighbouring blocks.
+
+        conflict(start: int, end: int) -> Optional[tuple[int, int]]:
+            Returns the busy block overlapping [start, end), or None when the window is free.
+
+        isFree(start: int, end: int) -> bool:
+            Returns True when no busy block overlaps [start, end).
+
+        nextFree(start: int, length: int) -> int:
+            Returns the earliest point at or after 'start' where a window of 'length' is free.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self) -> None:
+        self.starts = []
+        self.ends = []
+
+    @staticmethod
+    def fromIntervals(intervals) -> "Timeline":
+        """
+        Builds a timeline from an iterable of (start, end) pairs in any order.
+
+        Parameters:
+            intervals (Iterable[tuple[int, int]]): The busy intervals. Ends are exclusive.
+
+        Returns:
+            Timeline: A timeline holding the merged intervals.
+        """
+        timeline = Timeline()
+        for start, end in sorted(intervals):
+            if timeline.ends and start <= timeline.ends[-1]:
+                if end > timeline.ends[-1]:
+                    timeline.ends[-1] = end
+            else:
+                timeline.starts.append(start)
+                timeline.ends.append(end)
+        return timeline
+
+    def add(self, start: int, end: int) -> None:
+        # First block that could touch [start, end) and one past the last such block
+        lo = bisect_right(self.ends, start - 1)
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def conflict(self, start: int, end: int):
+        i = bisect_right(self.ends, start)
+        if i < len(self.starts) and self.starts[i] < end:
+            return self.starts[i], self.ends[i]
+        return None
+
+    def isFree(self, start: int, end: int) -> bool:
+        return self.conflict(start, end) is None
+
+    def nextFree(self, start: int, length: int) -> int:
+        i = bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < start + length:
+            start = self.ends[i]
+            i += 1
+        return start
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class IntervalTree:
+    """
+    The 'IntervalTree' class represents a static centered interval tree over many keyed intervals, answering "which keys
+    cover this point" in O(log n + k).
+
+    The tree is immutable once built; callers holding one rebuild it when the underlying periods change.
+
+    Attributes:
+        size (int): The number of intervals in the tree.
+
+    Methods:
+        stab(point: int) -> set:
+            Returns the keys of every interval containing 'point'. Both ends of an interval are inclusive.
+    """
+
+    __slots__ = ("size", "_root")
+
+    def __init__(self, intervals) -> None:
+        """
+        Parameters:
+            intervals (Iterable[tuple[int, int, Hashable]]): (start, end, key) triples. Both ends are inclusive.
+        """
+        items = [(start, end, key) for start, end, key in intervals if start <= end]
+        self.size = len(items)
+        self._root = IntervalTree._build(items)
+
+    @staticmethod
+    def _build(items: list):
+        if not items:
+            return None
+        points = sorted(p for start, end, _ in items for p in (start, end))
+        center = points[len(points) // 2]
+        left, right, here = [], [], []
+        for item in items:
+            if item[1] < center:
+                left.append(item)
+            elif item[0] > center:
+                right.append(item)
+            else:
+                here.append(item)
+        byStart = sorted(here, key=lambda item: item[0])
+        byEnd = sorted(here, key=lambda item: item[1], reverse=True)
+        return (center, byStart, byEnd, IntervalTree._build(left), IntervalTree._build(right))
+
+    def stab(self, point: int) -> set:
+        keys = set()
+        node = self._root
+        while node is not None:
+            center, byStart, byEnd, left, right = node
+            if point < center:
+                for start, _, key in byStart:
+                    if start > point:
+                        break
+                    keys.add(key)
+                node = left
+            elif point > center:
+                for _, end, key in byEnd:
+                    if end < point:
+                        break
+                    keys.add(key)
+                node = right
+            else:
+                keys.update(key for _, _, key in byStart)
+                break
+        return keys
+
+    def __len__(self) -> int:
+        return self.size
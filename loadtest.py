@@ -0,0 +1,607 @@
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+import numpy as np
+
+"""
+Load-tests the CrewOps Pro routes with concurrent virtual users and reports throughput and latency per route.
+
+Virtual users run on threads for a fixed duration, each picking its next request from a weighted mix of reads and
+writes; the 'mixed' mix sends every route of the app. Requests go either through the Flask test client in this process
+(the default; each user gets its own database connection) or over loopback to a running server ('--url', e.g. one
+started with serve.py).
+
+Before the clock starts the harness seeds the data the routes work on: '--seed' flight crew, '--fleet' aircraft and as
+many AMEs, '--flights' flights between BASES, a bid and a training for the seeded crew, and the roster of '--month',
+built through '/createRoster'. Writes only touch records the harness creates (crew, AMEs, aircraft, flights, bids and
+trainings), and everything created is deleted again at the end. The roster of '--month' and the AME assignments of its
+first days are rebuilt, though, so run it against a scratch database or one saved with db_snapshot.py.
+
+The report gives, for every route, the requests per second, the p50/p95/p99 latency in milliseconds and the error rate.
+It is printed and saved as JSON ('--out'); '--compare' prints the change against an earlier saved report.
+
+Usage:
+    python loadtest.py --users 16 --duration 30 --mix mixed --seed 200 --out run.json
+    python loadtest.py --url http://127.0.0.1:8000 --compare run.json
+"""
+
+# First keys of the records the harness creates
+SEED_SAP = 91000000
+SEED_AME_SAP = 92000000
+SEED_MSN = 990000
+SEED_FLIGHT_NO = 9000
+SEED_TRGID = 990000
+BASES = ["DEL", "BOM", "BLR", "MAA", "CCU", "HYD"]
+ACTYPE = "A320"
+# The year 'Roster' builds monthly rosters for
+ROSTER_YEAR = 2024
+
+READS = {
+    "home": 2,
+    "viewCrew": 10,
+    "viewAME": 4,
+    "viewAC": 4,
+    "viewFlights": 6,
+    "viewTrainings": 3,
+    "viewRoster": 12,
+    "viewBids": 2,
+    "availability": 8,
+    "standby": 3,
+    "expiryReport": 3,
+    "maintenanceForecast": 2,
+    "departures": 4,
+    "connections": 4,
+    "search": 6,
+    "changes": 2,
+    "rosterJob": 1,
+    "rosterProfiles": 1,
+    "rosterAnalytics": 1,
+    "exportRoster": 1,
+}
+WRITES = {
+    "addCrew": 4,
+    "modifyCrew": 2,
+    "deleteCrew": 1,
+    "applyLeave": 2,
+    "bulkAvailability": 1,
+    "addAME": 1,
+    "modifyAME": 1,
+    "deleteAME": 1,
+    "assignAME": 1,
+    "addAC": 1,
+    "modifyAC": 1,
+    "deleteAC": 1,
+    "recordCheck": 1,
+    "addFlight": 1,
+    "deleteFlight": 1,
+    "addBid": 2,
+    "deleteBid": 1,
+    "addTraining": 1,
+    "scheduleTrainings": 1,
+    "deleteTraining": 1,
+    "createRoster": 1,
+    "cancelRosterJob": 1,
+    "simulateRoster": 1,
+}
+
+# (route name, weight) for each mix; the request each name sends is built by 'VirtualUser.request'
+MIXES = {
+    "read": READS,
+    "mixed": {**READS, **WRITES},
+    "write": {"viewCrew": 2, "viewRoster": 2, **WRITES},
+}
+
+
+def crewForm(sap: int) -> dict:
+    return {
+        "sap": sap,
+        "fname": "Load",
+        "lname": "Test",
+        "desig": random.choice(["Commander", "FO"]),
+        "mob": 9000000000 + sap % 1000000000,
+        "atpl": "True",
+        "license": sap,
+        "medical": (date.today() + timedelta(days=365)).isoformat(),
+        "baseops": random.choice(BASES),
+        "pw": "loadtest",
+    }
+
+
+def ameForm(sap: int) -> dict:
+    return {"sap": sap, "name": "Load Test", "fleet": ACTYPE, "pw": "loadtest"}
+
+
+def aircraftForm(msn: int) -> dict:
+    # Registrations VT-ZAA to VT-ZZZ
+    offset = msn - SEED_MSN
+    regn = "Z" + chr(ord("A") + offset // 26 % 26) + chr(ord("A") + offset % 26)
+    return {"msn": msn, "type": ACTYPE, "regn": regn, "avail": "True", "engine": "CFM56", "engine_hours": 1000}
+
+
+def flightForm(flightNo: int) -> dict:
+    dep, arr = random.sample(BASES, 2)
+    hour = 6 + flightNo % 14
+    return {
+        "flight_no": flightNo,
+        "dep": dep,
+        "arr": arr,
+        "etd": f"{hour:02d}00",
+        "eta": f"{hour + 2:02d}00",
+        "actype": ACTYPE,
+        "duration": "0200",
+    }
+
+
+def trainingForm(trgid: int, trainer: int, trainee: int, day: date) -> dict:
+    return {
+        "trgid": trgid,
+        "trgname": "Load",
+        "trgdesc": "Load test",
+        "trainerid": trainer,
+        "traineeid": trainee,
+        "trgdate": day.isoformat(),
+        "trglocation": random.choice(BASES),
+        "duration": "0200",
+    }
+
+
+class Fixture:
+    """
+    The data seeded before the run and shared by all virtual users, with the counters new records take their keys from.
+
+    Deleting routes take their keys from the pools here or from the records a user created itself; list.pop and next()
+    on itertools.count are atomic, so two users never delete or create the same record.
+    """
+
+    def __init__(self, args) -> None:
+        self.month = args.month
+        self.crew = list(range(SEED_SAP, SEED_SAP + args.seed))
+        self.ame = list(range(SEED_AME_SAP, SEED_AME_SAP + args.fleet))
+        self.aircraft = list(range(SEED_MSN, SEED_MSN + args.fleet))
+        self.flights = list(range(SEED_FLIGHT_NO, SEED_FLIGHT_NO + args.flights))
+        self.readable = []  # Every available flight crew SAP, for the read routes
+        self.bids = []
+        self.trainings = []
+        self.jobId = None
+        self.jobs = []  # Roster builds started by the users
+        self.saps = itertools.count(SEED_SAP + args.seed)
+        self.ameSaps = itertools.count(SEED_AME_SAP + args.fleet)
+        self.msns = itertools.count(SEED_MSN + args.fleet)
+        self.flightNos = itertools.count(SEED_FLIGHT_NO + args.flights)
+        # Downwards: '/scheduleTrainings' numbers its sessions after the highest training ID, which is then above these
+        self.trgids = itertools.count(SEED_TRGID, -1)
+
+    def rosterDays(self, days: int) -> tuple:
+        start = date(ROSTER_YEAR, self.month, 1)
+        return start, start + timedelta(days=days - 1)
+
+
+class Target:
+    """Sends requests either through the Flask test client or over HTTP to a running server."""
+
+    def __init__(self, url: str = None) -> None:
+        self.url = url
+        if url is None:
+            # The in-process app only signs the cookies of its own test clients
+            os.environ.setdefault("CREWOPS_SECRET_KEY", secrets.token_hex(32))
+            from app import app
+
+            self.client = app.test_client()
+        else:
+            parts = urlsplit(url)
+            self.client = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def send(self, method: str, path: str, form: dict = None) -> int:
+        return self.fetch(method, path, form)[0]
+
+    def fetch(self, method: str, path: str, form: dict = None) -> tuple:
+        """Returns the status and the body text of the response."""
+        if self.url is None:
+            if method == "GET":
+                response = self.client.get(path)
+            else:
+                response = self.client.post(path, data=form)
+            return response.status_code, response.get_data(as_text=True)
+        body = urlencode(form) if form else None
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if form else {}
+        try:
+            self.client.request(method, path, body=body, headers=headers)
+            response = self.client.getresponse()
+            return response.status, response.read().decode(errors="replace")
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request
+            self.client.close()
+            raise
+
+    def getJSON(self, path: str):
+        return json.loads(self.fetch("GET", path)[1])
+
+    def startRoster(self, month: int) -> str:
+        """Queues a build of a month's roster through '/createRoster' and returns its job ID."""
+        return re.search(r"Job (\S+) is queued", self.fetch("POST", "/createRoster", {"month": month})[1]).group(1)
+
+    def waitForRoster(self, jobId: str) -> dict:
+        while True:
+            job = self.getJSON(f"/rosterJob/{jobId}")
+            if job["status"] in ("done", "failed", "cancelled"):
+                return job
+            time.sleep(0.5)
+
+
+class VirtualUser(threading.Thread):
+    """Sends weighted random requests until the deadline and records (route, seconds, ok) per request."""
+
+    # Routes skipped while the records they need are missing, with the pool they take a record from
+    NEEDS = {
+        "viewRoster": "readable",
+        "modifyCrew": "crew",
+        "deleteCrew": "ownCrew",
+        "applyLeave": "crew",
+        "bulkAvailability": "crew",
+        "modifyAME": "ame",
+        "deleteAME": "ownAME",
+        "modifyAC": "aircraft",
+        "deleteAC": "ownAircraft",
+        "recordCheck": "aircraft",
+        "deleteFlight": "ownFlights",
+        "addBid": "crew",
+        "deleteBid": "bids",
+        "addTraining": "pairs",
+        "scheduleTrainings": "pairs",
+        "deleteTraining": "trainings",
+        "rosterJob": "job",
+        "cancelRosterJob": "job",
+    }
+
+    def __init__(self, number: int, url: str, mix: dict, deadline: float, fixture: Fixture) -> None:
+        super().__init__(daemon=True)
+        self.random = random.Random(number)
+        self.url = url
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.deadline = deadline
+        self.fixture = fixture
+        self.created = {"crew": [], "ame": [], "aircraft": [], "flights": []}
+        self.samples = []
+
+    def has(self, name: str) -> bool:
+        pools = {
+            "readable": self.fixture.readable or self.fixture.crew,
+            "crew": self.crew(),
+            "ownCrew": self.created["crew"],
+            "ame": self.fixture.ame + self.created["ame"],
+            "ownAME": self.created["ame"],
+            "aircraft": self.fixture.aircraft + self.created["aircraft"],
+            "ownAircraft": self.created["aircraft"],
+            "ownFlights": self.created["flights"],
+            "bids": self.fixture.bids,
+            "pairs": self.crew()[1:],
+            "trainings": self.fixture.trainings,
+            "job": [self.fixture.jobId] if self.fixture.jobId else [],
+        }
+        return name not in self.NEEDS or bool(pools[self.NEEDS[name]])
+
+    def crew(self) -> list:
+        return self.fixture.crew + self.created["crew"]
+
+    def request(self, name: str) -> tuple:
+        today = date.today()
+        fixture = self.fixture
+        monthStart, monthEnd = fixture.rosterDays(7)
+        if name == "home":
+            return "GET", "/", None
+        if name in ("viewCrew", "viewAME", "viewAC", "viewFlights", "viewTrainings", "maintenanceForecast"):
+            return "GET", "/" + name, None
+        if name == "viewRoster":
+            return "POST", "/viewRoster", {"sap": self.random.choice(fixture.readable or fixture.crew)}
+        if name == "viewBids":
+            return "GET", f"/viewBids?month={fixture.month}", None
+        if name == "availability":
+            day = today + timedelta(days=self.random.randrange(30))
+            return "GET", f"/availability?date={day.isoformat()}&base={self.random.choice(BASES)}", None
+        if name == "standby":
+            return "GET", f"/standby?base={self.random.choice(BASES)}", None
+        if name == "expiryReport":
+            return "GET", "/expiryReport?days=60", None
+        if name == "departures":
+            return "GET", f"/departures?station={self.random.choice(BASES)}&from=06:00&to=18:00", None
+        if name == "connections":
+            origin, destination = self.random.sample(BASES, 2)
+            return "GET", f"/connections?from={origin}&to={destination}", None
+        if name == "search":
+            return "GET", f"/search?q={self.random.choice(['Load', 'DEL', 'VT-Z', '90'])}", None
+        if name == "changes":
+            return "GET", "/changes?limit=100", None
+        if name == "rosterJob":
+            return "GET", f"/rosterJob/{fixture.jobId}", None
+        if name == "rosterProfiles":
+            return "GET", "/rosterProfiles", None
+        if name == "rosterAnalytics":
+            return "GET", "/rosterAnalytics?format=json", None
+        if name == "exportRoster":
+            form = {
+                "start": monthStart.isoformat(),
+                "end": monthEnd.isoformat(),
+                "format": self.random.choice(["csv", "ics", "network_csv"]),
+            }
+            return "POST", "/exportRoster", form
+        if name == "addCrew":
+            sap = next(fixture.saps)
+            self.created["crew"].append(sap)
+            return "POST", "/addCrew", crewForm(sap)
+        if name == "modifyCrew":
+            # Blank fields keep their values
+            form = dict.fromkeys(crewForm(0), "")
+            form.update(sap=self.random.choice(self.crew()), baseops=self.random.choice(BASES), login="")
+            return "POST", "/modifyCrew", form
+        if name == "deleteCrew":
+            return "POST", "/deleteCrew", {"sap": self.created["crew"].pop()}
+        if name == "applyLeave":
+            start = today + timedelta(days=self.random.randrange(60))
+            form = {
+                "sap": self.random.choice(self.crew()),
+                "start": start.isoformat(),
+                "end": (start + timedelta(days=2)).isoformat(),
+                "reason": "Load test",
+            }
+            return "POST", "/applyLeave", form
+        if name == "bulkAvailability":
+            start = today + timedelta(days=self.random.randrange(60))
+            form = {
+                "action": "leave",
+                "saps": " ".join(str(sap) for sap in self.random.sample(self.crew(), min(3, len(self.crew())))),
+                "start": start.isoformat(),
+                "end": (start + timedelta(days=1)).isoformat(),
+                "reason": "Load test",
+            }
+            return "POST", "/bulkAvailability", form
+        if name == "addAME":
+            sap = next(fixture.ameSaps)
+            self.created["ame"].append(sap)
+            return "POST", "/addAME", ameForm(sap)
+        if name == "modifyAME":
+            sap = self.random.choice(fixture.ame + self.created["ame"])
+            return "POST", "/modifyAME", {"sap": sap, "name": "Load Tested", "fleet": "", "login": "", "pw": ""}
+        if name == "deleteAME":
+            return "POST", "/deleteAME", {"sap": self.created["ame"].pop()}
+        if name == "assignAME":
+            start, end = fixture.rosterDays(3)
+            return "POST", "/assignAME", {"start": start.isoformat(), "end": end.isoformat()}
+        if name == "addAC":
+            msn = next(fixture.msns)
+            self.created["aircraft"].append(msn)
+            return "POST", "/addac", aircraftForm(msn)
+        if name == "modifyAC":
+            msn = self.random.choice(fixture.aircraft + self.created["aircraft"])
+            form = {"msn": msn, "type": "", "regn": "", "avail": "", "engine": ""}
+            return "POST", "/modifyAC", {**form, "engine_hours": 1000 + self.random.randrange(500)}
+        if name == "deleteAC":
+            return "POST", "/deleteAC", {"msn": self.created["aircraft"].pop()}
+        if name == "recordCheck":
+            msn = self.random.choice(fixture.aircraft + self.created["aircraft"])
+            return "POST", "/recordCheck", {"msn": msn, "check": "A-Check"}
+        if name == "addFlight":
+            flightNo = next(fixture.flightNos)
+            self.created["flights"].append(flightNo)
+            return "POST", "/addFlight", flightForm(flightNo)
+        if name == "deleteFlight":
+            return "POST", "/deleteFlight", {"flight_no": self.created["flights"].pop()}
+        if name == "addBid":
+            form = {
+                "sap": self.random.choice(self.crew()),
+                "month": fixture.month,
+                "bidType": "destination",
+                "target": self.random.choice(BASES),
+                "weight": self.random.randint(1, 10),
+            }
+            return "POST", "/addBid", form
+        if name == "deleteBid":
+            return "POST", "/deleteBid", {"bidid": fixture.bids.pop(), "month": fixture.month}
+        if name == "addTraining":
+            trainer, trainee = self.random.sample(self.crew(), 2)
+            day = today + timedelta(days=30 + self.random.randrange(60))
+            return "POST", "/addTraining.", trainingForm(next(fixture.trgids), trainer, trainee, day)
+        if name == "scheduleTrainings":
+            trainer, trainee = self.random.sample(self.crew(), 2)
+            day = today + timedelta(days=30)
+            line = f"Load,Load test,{trainer},{trainee},{self.random.choice(BASES)},0200,{day.isoformat()}"
+            return "POST", "/scheduleTrainings", {"sessions": line, "until": (day + timedelta(days=60)).isoformat()}
+        if name == "deleteTraining":
+            return "POST", "/deleteTraining", {"trgid": fixture.trainings.pop()}
+        if name == "createRoster":
+            return "POST", "/createRoster", {"month": fixture.month}
+        if name == "cancelRosterJob":
+            # The seeded build has finished, so this only measures the route
+            return "POST", f"/rosterJob/{fixture.jobId}/cancel", None
+        if name == "simulateRoster":
+            return "POST", "/simulateRoster", {"month": fixture.month, "scenarios": "{}"}
+        raise ValueError(f"Unknown route {name}")
+
+    def run(self) -> None:
+        if self.url is None:
+            from backend.connection import dedicated
+
+            with dedicated():
+                self.loop()
+        else:
+            self.loop()
+
+    def loop(self) -> None:
+        target = Target(self.url)
+        while time.perf_counter() < self.deadline:
+            name = self.random.choices(self.names, self.weights)[0]
+            if not self.has(name):
+                continue
+            try:
+                method, path, form = self.request(name)
+            except IndexError:
+                # Another user took the last record of a shared pool
+                continue
+            began = time.perf_counter()
+            try:
+                status, body = target.fetch(method, path, form)
+                ok = status < 400
+            except Exception:
+                ok = False
+            self.samples.append((name, time.perf_counter() - began, ok))
+            if name == "createRoster" and ok:
+                jobId = re.search(r"Job (\S+) is queued", body)
+                if jobId:
+                    self.fixture.jobs.append(jobId.group(1))
+        for route, key, records in (
+            ("/deleteCrew", "sap", self.created["crew"]),
+            ("/deleteAME", "sap", self.created["ame"]),
+            ("/deleteAC", "msn", self.created["aircraft"]),
+            ("/deleteFlight", "flight_no", self.created["flights"]),
+        ):
+            for record in records:
+                try:
+                    target.send("POST", route, {key: record})
+                except Exception:
+                    pass
+
+
+def seed(target: Target, fixture: Fixture) -> None:
+    """Adds the fixture's records through the app's own routes and builds the roster of its month."""
+    for sap in fixture.crew:
+        target.send("POST", "/addCrew", crewForm(sap))
+    for sap in fixture.ame:
+        target.send("POST", "/addAME", ameForm(sap))
+    for msn in fixture.aircraft:
+        target.send("POST", "/addac", aircraftForm(msn))
+    for flightNo in fixture.flights:
+        target.send("POST", "/addFlight", flightForm(flightNo))
+    for sap in fixture.crew:
+        form = {"sap": sap, "month": fixture.month, "bidType": "destination", "target": random.choice(BASES), "weight": 1}
+        target.send("POST", "/addBid", form)
+    # The IDs of the seeded bids, from the rows of the month's bid list
+    seeded = set(fixture.crew)
+    for row in target.fetch("GET", f"/viewBids?month={fixture.month}")[1].split("<tr>")[1:]:
+        cells = re.findall(r"<t[hd][^>]*>\s*(\d+)\s*</t[hd]>", row)
+        if len(cells) >= 2 and int(cells[1]) in seeded:
+            fixture.bids.append(int(cells[0]))
+    for offset, (trainer, trainee) in enumerate(zip(fixture.crew[::2], fixture.crew[1::2])):
+        trgid = next(fixture.trgids)
+        day = date.today() + timedelta(days=30 + offset % 60)
+        if target.send("POST", "/addTraining.", trainingForm(trgid, trainer, trainee, day)) < 400:
+            fixture.trainings.append(trgid)
+
+    fixture.jobId = target.startRoster(fixture.month)
+    job = target.waitForRoster(fixture.jobId)
+    print(f"Seeded the roster of month {fixture.month}: {job['status']}")
+    fixture.readable = target.getJSON(f"/availability?date={date.today().isoformat()}")["sap"]
+
+
+def teardown(target: Target, fixture: Fixture) -> None:
+    """Stops the roster builds the users started and deletes the seeded records."""
+    for jobId in fixture.jobs:
+        target.send("POST", f"/rosterJob/{jobId}/cancel")
+    for jobId in fixture.jobs:
+        target.waitForRoster(jobId)
+    # Leave, bids, trainings and roster duties of the crew and the checks of the aircraft go with them
+    for sap in fixture.crew:
+        target.send("POST", "/deleteCrew", {"sap": sap})
+    for sap in fixture.ame:
+        target.send("POST", "/deleteAME", {"sap": sap})
+    for msn in fixture.aircraft:
+        target.send("POST", "/deleteAC", {"msn": msn})
+    for flightNo in fixture.flights:
+        target.send("POST", "/deleteFlight", {"flight_no": flightNo})
+
+
+def summarise(samples: list, seconds: float) -> dict:
+    routes = {}
+    names = np.array([name for name, _, _ in samples])
+    latency = np.array([elapsed for _, elapsed, _ in samples]) * 1000
+    ok = np.array([passed for _, _, passed in samples], dtype=bool)
+    for name in sorted(set(names.tolist())) + ["ALL"]:
+        mask = np.ones(len(names), dtype=bool) if name == "ALL" else names == name
+        p50, p95, p99 = np.percentile(latency[mask], [50, 95, 99])
+        routes[name] = {
+            "requests": int(mask.sum()),
+            "rps": round(float(mask.sum()) / seconds, 1),
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+            "error_rate": round(1 - float(ok[mask].mean()), 4),
+        }
+    return routes
+
+
+def printReport(report: dict, baseline: dict = None) -> None:
+    print(f"{'route':<22}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for name, route in report["routes"].items():
+        line = (
+            f"{name:<22}{route['requests']:>9}{route['rps']:>9}{route['p50_ms']:>9}{route['p95_ms']:>9}"
+            f"{route['p99_ms']:>9}{route['error_rate']:>9.1%}"
+        )
+        before = (baseline or {}).get("routes", {}).get(name)
+        if before and before["rps"] and before["p95_ms"]:
+            line += (
+                f"   rps {route['rps'] / before['rps'] - 1:+.0%}, p95 {route['p95_ms'] / before['p95_ms'] - 1:+.0%}"
+            )
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the CrewOps Pro routes.")
+    parser.add_argument("--url", help="Base URL of a running server. The app is driven in-process when omitted.")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run for.")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--seed", type=int, default=50, help="Synthetic flight crew to add before the run.")
+    parser.add_argument("--fleet", type=int, default=10, help="Synthetic aircraft, and AMEs, to add before the run.")
+    parser.add_argument("--flights", type=int, default=40, help="Synthetic flights to add before the run.")
+    parser.add_argument("--month", type=int, default=date.today().month, help="The month whose roster is built.")
+    parser.add_argument("--out", help="Save the report as JSON to this path.")
+    parser.add_argument("--compare", help="A report saved earlier to compare against.")
+    args = parser.parse_args()
+
+    target = Target(args.url)
+    fixture = Fixture(args)
+    seed(target, fixture)
+
+    deadline = time.perf_counter() + args.duration
+    began = time.perf_counter()
+    users = [VirtualUser(n, args.url, MIXES[args.mix], deadline, fixture) for n in range(args.users)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    seconds = time.perf_counter() - began
+
+    teardown(target, fixture)
+
+    samples = [sample for user in users for sample in user.samples]
+    report = {
+        "started": time.time() - seconds,
+        "mode": args.url or "in-process",
+        "users": args.users,
+        "duration": round(seconds, 2),
+        "mix": args.mix,
+        "seed": args.seed,
+        "fleet": args.fleet,
+        "flights": args.flights,
+        "routes": summarise(samples, seconds) if samples else {},
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    printReport(report, baseline)
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+from datetime import date, timedelta
+import numpy as np
+from cache_bus import CacheBus
+from backend.connection import db, connection
+
+
+class Maintenance:
+    """
+    The 'Maintenance' class represents a forecast of when each aircraft will cross its engine-hour maintenance
+    thresholds.
+
+    Every tail's flown engine hours are projected forward at its rostered daily utilisation. 'engine_hours' already
+    includes the block time of the roster from its publication on (see 'Roster.addRoster'), so the block time rostered
+    from today on is taken off first and only projected, never counted twice.
+
+    A check falls due one interval after the engine hours at which it was last done, as recorded in the
+    'maintenance_checks' table; a check also counts as done for every check with a shorter interval. A tail that has
+    flown past a due check without it being recorded is overdue: it is due today and stays excluded from rostering until
+    the check is recorded. The forecast is worked
+    out for all tails and all thresholds at once with NumPy: hours and utilisation are vectors, the thresholds a row,
+    and the next due hours of every check and the days needed to reach it are computed as (tails x thresholds)
+    arrays. Tails that are not on the roster are projected at the fleet's mean utilisation.
+
+    Attributes:
+        THRESHOLDS (dict): Maintenance check name mapped to its interval in engine hours.
+        CHECKS_TABLE (str): The name of the table recording completed checks.
+
+    Methods:
+        recordCheck(msn: int, check: str, hours: int = None, day: date = None) -> None:
+            Records a completed check.
+
+        forecast(thresholds: dict = None, today: date = None) -> dict[int, tuple]:
+            Projects the next check of every tail.
+
+        dueBy(day: date) -> set[int]:
+            Returns the MSNs of tails projected to have reached a check threshold on or before 'day'.
+
+        invalidate() -> None:
+            Drops the cached forecast so it is recomputed on next use.
+    """
+
+    THRESHOLDS = {
+        "A-Check": 750,
+        "C-Check": 7500,
+    }
+    CHECKS_TABLE = "maintenance_checks"
+
+    _forecast = None
+    _version = None
+
+    @staticmethod
+    def invalidate() -> None:
+        Maintenance._forecast = None
+        CacheBus.publish("maintenance")
+
+    @staticmethod
+    def recordCheck(msn: int, check: str, hours: int = None, day: date = None) -> None:
+        """
+        Records a completed maintenance check.
+
+        Parameters:
+            msn (int): The MSN of the aircraft.
+            check (str): The check done, one of THRESHOLDS.
+            hours (int, optional): The engine hours it was done at. Defaults to the hours flown by 'day'.
+            day (date, optional): The date it was done. Defaults to the current date.
+
+        Raises:
+            ValueError: If the check is unknown or the aircraft is not found.
+        """
+        if check not in Maintenance.THRESHOLDS:
+            raise ValueError(f"Check should be one of {', '.join(Maintenance.THRESHOLDS)}.")
+        day = day or date.today()
+        if hours is None:
+            due = Maintenance.forecast(today=day).get(msn)
+            if due is None:
+                raise ValueError("Aircraft not found")
+            hours = due[4]
+        Maintenance.insertChecks([(msn, check, int(hours), day)])
+        connection.commit()
+        Maintenance.invalidate()
+
+    @staticmethod
+    def insertChecks(checks: list) -> None:
+        # Part of the caller's transaction; 'Aircraft.addAircraft' records a new tail's checks with the tail itself
+        db.executemany(
+            f"INSERT INTO {Maintenance.CHECKS_TABLE} (msn, check_name, engine_hours, done_on) VALUES (%s,%s,%s,%s)",
+            checks,
+        )
+
+    @staticmethod
+    def forecast(thresholds: dict = None, today: date = None) -> dict:
+        """
+        Projects the next maintenance check of every tail.
+
+        Parameters:
+            thresholds (dict, optional): Check name mapped to interval in engine hours. Defaults to THRESHOLDS.
+            today (date, optional): The date the projection starts from. Defaults to the current date.
+
+        Returns:
+            dict[int, tuple]: MSN mapped to a tuple containing the following elements in order:
+                - check (str): The name of the first check the tail will reach.
+                - due_hours (int): The engine hours at which that check falls due.
+                - due_date (Optional[date]): The projected date, or None if the tail is not flying.
+                - daily_hours (float): The daily utilisation used for the projection.
+                - hours (float): The engine hours flown by 'today'.
+                - overdue (bool): True when the tail has already flown past 'due_hours'; 'due_date' is then 'today'.
+
+        Note:
+            - Three queries are issued: one for the fleet, one for the hours of the last check of each kind per tail and
+              one aggregating rostered block time per tail, in total and from 'today' on.
+            - A check never recorded for a tail is taken as done at 0 hours.
+        """
+        if thresholds is None:
+            thresholds = Maintenance.THRESHOLDS
+        if today is None:
+            today = date.today()
+
+        db.execute("SELECT msn, engine_hours FROM aircraft_fleet")
+        fleet = db.fetchall()
+        if not fleet:
+            return {}
+        # The upcoming hours are rounded per tail exactly as 'Roster._accrueEngineHours' accrued them
+        db.execute(
+            """SELECT
+                r.aircraft_msn,
+                SUM(TIME_TO_SEC(f.duration)) / 3600,
+                DATEDIFF(MAX(r.date), MIN(r.date)) + 1,
+                ROUND(SUM(CASE WHEN r.date >= %s THEN TIME_TO_SEC(f.duration) ELSE 0 END) / 3600)
+            FROM monthly_roster r JOIN flights f ON r.flight_no = f.flight_no
+            GROUP BY r.aircraft_msn""",
+            (today,),
+        )
+        flown = {msn: (float(hours), int(days), float(upcoming)) for msn, hours, days, upcoming in db.fetchall()}
+
+        msns = np.array([row[0] for row in fleet], dtype=np.int64)
+        hours = np.array(
+            [row[1] - (flown[row[0]][2] if row[0] in flown else 0) for row in fleet], dtype=np.float64
+        )
+        daily = np.array(
+            [flown[msn][0] / flown[msn][1] if msn in flown else np.nan for msn in msns.tolist()],
+            dtype=np.float64,
+        )
+        if np.isnan(daily).all():
+            daily[:] = 0.0
+        else:
+            daily = np.where(np.isnan(daily), np.nanmean(daily), daily)
+
+        names = list(thresholds)
+        intervals = np.array([thresholds[name] for name in names], dtype=np.float64)
+        db.execute(f"SELECT msn, check_name, MAX(engine_hours) FROM {Maintenance.CHECKS_TABLE} GROUP BY msn, check_name")
+        done = {(msn, name): float(checked) for msn, name, checked in db.fetchall()}
+        last = np.array([[done.get((msn, name), 0.0) for name in names] for msn in msns.tolist()], dtype=np.float64)
+        # A check also counts for every check with a shorter interval
+        longest = np.argsort(-intervals, kind="stable")
+        last[:, longest] = np.maximum.accumulate(last[:, longest], axis=1)
+        nextDue = last + intervals[None, :]
+        overdue = hours[:, None] >= nextDue
+        with np.errstate(divide="ignore"):
+            daysLeft = np.where(
+                daily[:, None] > 0, np.ceil((nextDue - hours[:, None]) / daily[:, None]), np.inf
+            )
+        daysLeft[overdue] = 0
+        # Where two checks fall due together the larger one is reported, hence the reversed argmin
+        key = np.where(np.isinf(daysLeft), nextDue - hours[:, None], daysLeft)
+        first = len(names) - 1 - np.argmin(key[:, ::-1], axis=1)
+        rows = np.arange(len(msns))
+        firstDays = daysLeft[rows, first]
+
+        result = {}
+        for i, msn in enumerate(msns.tolist()):
+            dueDate = None if np.isinf(firstDays[i]) else today + timedelta(days=int(firstDays[i]))
+            result[msn] = (
+                names[first[i]],
+                int(nextDue[i, first[i]]),
+                dueDate,
+                float(daily[i]),
+                float(hours[i]),
+                bool(overdue[i, first[i]]),
+            )
+        return result
+
+    @staticmethod
+    def dueBy(day: date) -> set:
+        """
+        Returns the tails projected to have reached a check threshold on or before a date, overdue tails included.
+
+        Parameters:
+            day (date): The date to check.
+
+        Returns:
+            set[int]: The MSNs of the tails due for a check.
+
+        Note:
+            - The forecast with the default thresholds is cached until an aircraft or the roster changes.
+        """
+        version = CacheBus.version("maintenance")
+        if Maintenance._forecast is None or Maintenance._version != version:
+            Maintenance._forecast = Maintenance.forecast()
+            Maintenance._version = version
+        return {
+            msn
+            for msn, (_, _, dueDate, *_) in Maintenance._forecast.items()
+            if dueDate is not None and dueDate <= day
+        }
@@ -1,8 +1,12 @@
 from . import (
     aircraft_model,
     ame_crew_model,
+    bid_model,
+    change_event_model,
+    downtime_model,
     flight_crew_model,
     flights_model,
+    leave_model,
     roster_model,
     training_model,
 )
@@ -12,6 +16,10 @@ __all__ = [
     "aircraft_model",
     "ame_crew_model",
     "flights_model",
+    "leave_model",
+    "downtime_model",
     "roster_model",
     "training_model",
+    "change_event_model",
+    "bid_model",
 ]
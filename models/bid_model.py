@@ -0,0 +1,88 @@
+from datetime import date
+from typing import ClassVar
+from pydantic import BaseModel, field_validator, model_validator
+
+
+class BidModel(BaseModel):
+    """
+    The 'BidModel' class represents a roster preference submitted by a flight crew member for one month.
+
+    Attributes:
+        sap (int): The SAP (Staff ID) of the flight crew member.
+        month (int): The month of the roster the bid is for.
+        bid_type (str): What is bid for: 'flight', 'day_off' or 'destination'.
+        target (str): The flight number, the date of the day off (YYYY-MM-DD) or the destination IATA code.
+        weight (int): How much the bid matters to the crew member, from 1 to MAX_WEIGHT.
+
+    Validations:
+        - SAP Validation: The 'sap' attribute must be exactly 8 digits long.
+        - Month Validation: The 'month' attribute must be between 1 and 12.
+        - Type Validation: The 'bid_type' attribute must be one of BID_TYPES.
+        - Weight Validation: The 'weight' attribute must be between 1 and MAX_WEIGHT.
+        - Target Validation: A flight bid needs a flight number, a day off bid a date in the bid's month and a
+          destination bid a 3 letter IATA code.
+    """
+
+    BID_TYPES: ClassVar[tuple] = ("flight", "day_off", "destination")
+    MAX_WEIGHT: ClassVar[int] = 100
+
+    # Data Fields
+    sap: int
+    month: int
+    bid_type: str
+    target: str
+    weight: int
+
+    # Validations
+    # SAP Validation
+    @field_validator("sap")
+    @classmethod
+    def is_sap_valid(cls, value):
+        sap_len = 8
+        sap_str = str(value)
+        if len(sap_str) != sap_len:
+            raise ValueError(f"SAP (Staff ID) Must be exactly {sap_len} digits long.")
+        return value
+
+    # Month Validation
+    @field_validator("month")
+    @classmethod
+    def is_month_valid(cls, value):
+        if not 1 <= value <= 12:
+            raise ValueError("Month should be between 1 and 12.")
+        return value
+
+    # Bid Type Validation
+    @field_validator("bid_type")
+    @classmethod
+    def is_bid_type_valid(cls, value):
+        if value not in cls.BID_TYPES:
+            raise ValueError(f"Bid type should be one of {', '.join(cls.BID_TYPES)}.")
+        return value
+
+    # Weight Validation
+    @field_validator("weight")
+    @classmethod
+    def is_weight_valid(cls, value):
+        if not 1 <= value <= cls.MAX_WEIGHT:
+            raise ValueError(f"Weight should be between 1 and {cls.MAX_WEIGHT}.")
+        return value
+
+    # Target Validation
+    @model_validator(mode="after")
+    def is_target_valid(self):
+        target = self.target.strip()
+        if self.bid_type == "flight":
+            if not target.isdigit():
+                raise ValueError("A flight bid needs a flight number.")
+        elif self.bid_type == "day_off":
+            try:
+                day = date.fromisoformat(target)
+            except ValueError:
+                raise ValueError("A day off bid needs a date as YYYY-MM-DD.")
+            if day.month != self.month:
+                raise ValueError("The day off should be in the month bid for.")
+        elif not target.isalpha() or len(target) != 3:
+            raise ValueError("A destination bid needs a 3 letter IATA code.")
+        self.target = target.upper()
+        return self
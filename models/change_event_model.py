@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import ClassVar, Optional
+from pydantic import BaseModel, field_validator
+
+
+class ChangeEventModel(BaseModel):
+    """
+    The 'ChangeEventModel' class represents one entry of the change log. It inherits from the 'BaseModel' class provided by the 'pydantic' library.
+
+    Attributes:
+        seq (int): The sequence number of the event. Sequence numbers only ever grow.
+        at (datetime): When the change was committed.
+        entity (str): The table that changed, e.g. 'flight_crew'.
+        action (str): What happened: 'add', 'modify', 'delete', 'publish' (a whole monthly roster replaced) or
+            'restore' (the whole database loaded from a snapshot).
+        key (str): The primary key of the changed row, e.g. the SAP (Staff ID), MSN or flight number.
+        data (dict, optional): The changed fields, or the new row. None for deletes.
+
+    Validations:
+        - Action Validation: The 'action' attribute must be one of ACTIONS.
+    """
+
+    ACTIONS: ClassVar[tuple] = ("add", "modify", "delete", "publish", "restore")
+
+    # Data Fields
+    seq: int
+    at: datetime
+    entity: str
+    action: str
+    key: str
+    data: Optional[dict] = None
+
+    # Validations
+    # Action Validation
+    @field_validator("action")
+    @classmethod
+    def is_action_valid(cls, value):
+        if value not in cls.ACTIONS:
+            raise ValueError(f"Action must be one of {', '.join(cls.ACTIONS)}")
+        return value
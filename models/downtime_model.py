@@ -0,0 +1,50 @@
+from datetime import date
+from typing import Optional
+from pydantic import BaseModel, field_validator, model_validator
+
+
+class DowntimeModel(BaseModel):
+    """
+    The 'DowntimeModel' class represents a period during which an aircraft is not available for flying.
+
+    Attributes:
+        msn (int): The MSN (Manufacturer Serial Number) of the aircraft.
+        start_date (date): The first day of the downtime (inclusive).
+        end_date (date): The last day of the downtime (inclusive).
+        reason (Optional[str]): The reason for the downtime, e.g. a scheduled check. Defaults to None.
+
+    Validations:
+        - MSN Validation: The 'msn' attribute must not be empty.
+        - Reason Validation: The 'reason' attribute should not exceed 255 characters.
+        - Period Validation: The 'end_date' must not be before the 'start_date'.
+    """
+
+    # Data Fields
+    msn: int
+    start_date: date
+    end_date: date
+    reason: Optional[str] = None
+
+    # Validations
+    # MSN Validation
+    @field_validator("msn")
+    @classmethod
+    def is_msn_valid(cls, value):
+        if not value:
+            raise ValueError("MSN can not be empty")
+        return value
+
+    # Reason Validation
+    @field_validator("reason")
+    @classmethod
+    def is_reason_valid(cls, value):
+        if value is not None and len(value) > 255:
+            raise ValueError("Reason length should not exceed 255 characters.")
+        return value
+
+    # Period Validation
+    @model_validator(mode="after")
+    def is_period_valid(self):
+        if self.end_date < self.start_date:
+            raise ValueError("Downtime can not end before it starts.")
+        return self
@@ -0,0 +1,52 @@
+from datetime import date
+from typing import Optional
+from pydantic import BaseModel, field_validator, model_validator
+
+
+class LeaveModel(BaseModel):
+    """
+    The 'LeaveModel' class represents a period during which a flight crew member is not available for flight duty.
+
+    Attributes:
+        sap (int): The SAP (Staff ID) of the flight crew member.
+        start_date (date): The first day of the leave (inclusive).
+        end_date (date): The last day of the leave (inclusive).
+        reason (Optional[str]): The reason for the leave. Defaults to None.
+
+    Validations:
+        - SAP Validation: The 'sap' attribute must be exactly 8 digits long.
+        - Reason Validation: The 'reason' attribute should not exceed 255 characters.
+        - Period Validation: The 'end_date' must not be before the 'start_date'.
+    """
+
+    # Data Fields
+    sap: int
+    start_date: date
+    end_date: date
+    reason: Optional[str] = None
+
+    # Validations
+    # SAP Validation
+    @field_validator("sap")
+    @classmethod
+    def is_sap_valid(cls, value):
+        sap_len = 8
+        sap_str = str(value)
+        if len(sap_str) != sap_len:
+            raise ValueError(f"SAP (Staff ID) Must be exactly {sap_len} digits long.")
+        return value
+
+    # Reason Validation
+    @field_validator("reason")
+    @classmethod
+    def is_reason_valid(cls, value):
+        if value is not None and len(value) > 255:
+            raise ValueError("Reason length should not exceed 255 characters.")
+        return value
+
+    # Period Validation
+    @model_validator(mode="after")
+    def is_period_valid(self):
+        if self.end_date < self.start_date:
+            raise ValueError("Leave can not end before it starts.")
+        return self
@@ -0,0 +1,240 @@
+import threading
+from datetime import date, timedelta
+import numpy as np
+from availability import Availability
+from backend.connection import db, connection, read_db
+from cache_bus import CacheBus
+from change_log import ChangeLog
+from crew_eligibility import CrewEligibility
+from training import Training
+
+
+class ReservePlanner:
+    """
+    The 'ReservePlanner' class represents the planner that keeps a pool of standby (reserve) crew at every base to
+    absorb sickness and disruptions, once the monthly roster has used the crew it needs.
+
+    How many reserves a base needs on a day comes from its disruption history: the 'disruptions' rows of the last
+    HISTORY_DAYS days departing that base are counted per weekday, giving a daily rate per base and weekday. Treating
+    the disruptions of a day as a Poisson count at that rate, the base keeps the smallest number of standby crew pairs
+    that covers every disruption on SERVICE_LEVEL of its days, and never fewer than MIN_STANDBY.
+
+    Reserves are picked from the crew not rostered, in training, on leave or with a lapsed medical that day. The crew
+    are held as numpy arrays, so every day is a few masks and one sort over the whole crew list: among the free crew of
+    a base and position, those who have stood by least this month come first, then those who fly least.
+
+    The published reserves are cached per base and day and rebuilt with one query after a change, so finding who is on
+    standby at a base is a dictionary lookup.
+
+    Attributes:
+        tablename (str): The name of the table in the database where the reserve roster is stored.
+        ROSTER_TABLE (str): The name of the monthly roster table.
+        DISRUPTIONS_TABLE (str): The name of the table holding the disruption history.
+        P1_DESIGNATIONS (tuple): The designations that stand by as P1; every other designation stands by as P2.
+        HISTORY_DAYS (int): The days of disruption history the rates are taken from, a whole number of weeks.
+        SERVICE_LEVEL (float): The share of days on which the reserves should cover every disruption.
+        MIN_STANDBY (int): The fewest standby pairs kept at a base on any day.
+
+    Methods:
+        plan(start: date, end: date) -> dict:
+            Picks the standby crew of every base for every day of a period and publishes them.
+
+        required(bases: list, days: list) -> np.ndarray:
+            Returns the number of standby pairs every base needs on every day.
+
+        standby(base: str, day: date = None) -> list[tuple]:
+            Returns the crew on standby at a base on a day.
+
+        invalidate() -> None:
+            Drops the cached reserves so they are rebuilt on next use.
+    """
+
+    tablename = "reserve_roster"
+    ROSTER_TABLE = "monthly_roster"
+    DISRUPTIONS_TABLE = "disruptions"
+    P1_DESIGNATIONS = ("Commander", "Sr Commander", "LTC", "TRI", "DE")
+    HISTORY_DAYS = 364
+    SERVICE_LEVEL = 0.95
+    MIN_STANDBY = 1
+
+    _index = None
+    _version = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def invalidate() -> None:
+        ReservePlanner._index = None
+        CacheBus.publish("reserves")
+
+    @staticmethod
+    def required(bases: list, days: list) -> np.ndarray:
+        """
+        Returns the number of standby pairs every base needs on every day, from its disruption history.
+
+        Parameters:
+            bases (list[str]): The bases (IATA codes).
+            days (list[date]): The days to plan.
+
+        Returns:
+            np.ndarray: An int array of shape (len(days), len(bases)).
+
+        Note:
+            - The history is the HISTORY_DAYS days before today, read with one grouped query.
+        """
+        today = date.today()
+        query = f"""SELECT station, WEEKDAY(day), COUNT(*)
+            FROM {ReservePlanner.DISRUPTIONS_TABLE}
+            WHERE day >= %s AND day < %s
+            GROUP BY station, WEEKDAY(day)"""
+        db.execute(query, (today - timedelta(days=ReservePlanner.HISTORY_DAYS), today))
+        rows = db.fetchall()
+        connection.commit()
+
+        column = {base: position for position, base in enumerate(bases)}
+        counts = np.zeros((7, len(bases)))
+        for station, weekday, count in rows:
+            if station in column:
+                counts[int(weekday), column[station]] = count
+        rates = counts / (ReservePlanner.HISTORY_DAYS // 7)
+
+        # Smallest k with P(X <= k) >= SERVICE_LEVEL for X ~ Poisson(rate), for every base and weekday at once
+        pmf = np.exp(-rates)
+        cdf = pmf.copy()
+        need = np.zeros(rates.shape, dtype=np.int64)
+        k = 0
+        while (cdf < ReservePlanner.SERVICE_LEVEL).any():
+            short = cdf < ReservePlanner.SERVICE_LEVEL
+            need += short
+            k += 1
+            pmf = pmf * rates / k
+            cdf = cdf + pmf
+        need = np.maximum(need, ReservePlanner.MIN_STANDBY)
+        return need[[day.weekday() for day in days]]
+
+    @staticmethod
+    def plan(start: date, end: date) -> dict:
+        """
+        Picks the standby crew of every base for every day of a period and publishes them, replacing the reserves
+        previously planned for the period.
+
+        Parameters:
+            start (date): The first day to plan (inclusive).
+            end (date): The last day to plan (inclusive).
+
+        Returns:
+            dict: A dictionary with the following keys:
+                - rows (int): The number of standby duties written.
+                - short (list[tuple]): (date, base, position, needed, found) for every day a base could not be given
+                  all the reserves it needs.
+
+        Note:
+            - Run after the roster of the period is published: crew rostered on a day are not used as reserves.
+            - A standby pair is one P1 and one P2; the two positions are filled independently.
+        """
+        db.execute("SELECT staffid, designation, base_ops FROM flight_crew WHERE availability=1")
+        crew = db.fetchall()
+        db.execute(
+            f"SELECT date, p1_id, p2_id FROM {ReservePlanner.ROSTER_TABLE} WHERE date BETWEEN %s AND %s", (start, end)
+        )
+        rostered = {}
+        for day, p1, p2 in db.fetchall():
+            rostered.setdefault(day, set()).update(sap for sap in (p1, p2) if sap is not None)
+        connection.commit()
+        inTraining = Training.crewInTraining(start, end)
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+        saps = np.array([row[0] for row in crew], dtype=np.int64)
+        bases, baseOf = np.unique(np.array([row[2] for row in crew], dtype=str), return_inverse=True)
+        bases = bases.tolist()
+        isP1 = np.array([row[1] in ReservePlanner.P1_DESIGNATIONS for row in crew], dtype=bool)
+        group = baseOf * 2 + ~isP1  # Base-major, P1 before P2
+        need = ReservePlanner.required(bases, days)
+
+        flights = {}  # Days rostered in the period per SAP (Staff ID)
+        for sap in (sap for day in days for sap in rostered.get(day, ())):
+            flights[sap] = flights.get(sap, 0) + 1
+        flown = np.array([flights.get(sap, 0) for sap in saps.tolist()], dtype=np.int64)
+
+        served = np.zeros(len(saps), dtype=np.int64)
+        standby, short = [], []
+        for offset, day in enumerate(days):
+            busy = (
+                rostered.get(day, set())
+                | inTraining.get(day, set())
+                | Availability.crewOnLeave(day)
+                | CrewEligibility.lapsedOn(day)
+            )
+            free = np.flatnonzero(~np.isin(saps, np.fromiter(busy, dtype=np.int64, count=len(busy))))
+            # Free crew grouped by base and position, least served then least flown first within a group
+            free = free[np.lexsort((flown[free], served[free], group[free]))]
+            groups = group[free]
+            rank = np.arange(len(free)) - np.searchsorted(groups, groups)
+            wanted = np.repeat(need[offset], 2)
+            picked = free[rank < wanted[groups]]
+            served[picked] += 1
+            standby += [
+                (day, int(saps[i]), bases[baseOf[i]], "P1" if isP1[i] else "P2") for i in picked
+            ]
+            found = np.bincount(groups[rank < wanted[groups]], minlength=len(wanted))
+            for g in np.flatnonzero(found < wanted):
+                short.append((day, bases[g // 2], "P2" if g % 2 else "P1", int(wanted[g]), int(found[g])))
+
+        db.execute(f"DELETE FROM {ReservePlanner.tablename} WHERE date BETWEEN %s AND %s", (start, end))
+        db.executemany(
+            f"INSERT INTO {ReservePlanner.tablename} (date, staffid, base_ops, position) VALUES (%s,%s,%s,%s)",
+            standby,
+        )
+        ChangeLog.record(
+            ReservePlanner.tablename,
+            "publish",
+            f"{start}/{end}",
+            {"start": start, "end": end, "rows": len(standby)},
+        )
+        ChangeLog.commit()
+        ReservePlanner.invalidate()
+        return {"rows": len(standby), "short": short}
+
+    @staticmethod
+    def _build() -> dict:
+        query = f"""SELECT
+                r.date,
+                r.base_ops,
+                r.staffid,
+                CONCAT(fc.fname, ' ', fc.lname),
+                fc.designation,
+                r.position
+            FROM
+                {ReservePlanner.tablename} r
+                JOIN flight_crew fc ON r.staffid = fc.staffid
+            ORDER BY r.position, r.staffid"""
+        read_db.execute(query)
+        index = {}
+        for day, base, *reserve in read_db.fetchall():
+            index.setdefault((base, day), []).append(tuple(reserve))
+        return index
+
+    @staticmethod
+    def standby(base: str, day: date = None) -> list:
+        """
+        Returns the crew on standby at a base on a day.
+
+        Parameters:
+            base (str): The base of operations (IATA code).
+            day (date, optional): The day. Defaults to the current date.
+
+        Returns:
+            list[tuple]: (staffid, name, designation, position) of every reserve, P1 first. Reserves who have gone on
+            leave since the plan was published are left out.
+
+        Note:
+            - The cache follows the reserve roster and the flight crew, so renamed or deleted crew are never served.
+        """
+        day = day or date.today()
+        version = (CacheBus.version("reserves"), CacheBus.version("availability"))
+        with ReservePlanner._lock:
+            if ReservePlanner._index is None or ReservePlanner._version != version:
+                ReservePlanner._index = ReservePlanner._build()
+                ReservePlanner._version = version
+            reserves = ReservePlanner._index.get((base.upper(), day), [])
+        onLeave = Availability.crewOnLeave(day)
+        return [reserve for reserve in reserves if reserve[0] not in onLeave]
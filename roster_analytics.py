@@ -0,0 +1,215 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from backend.connection import read_db
+from crew_pairing import CrewPairing
+
+
+class RosterAnalytics:
+    """
+    The 'RosterAnalytics' class represents a utility class for measuring the quality of a published roster: how much of
+    the schedule it covers, how hard it works each crew member and aircraft, and how evenly the work is shared.
+
+    The horizon is read once, with one query per table, into columnar arrays. Every statistic is then a NumPy/pandas
+    group-by over those arrays, so the cost grows with the number of rostered legs, not with the number of crew or
+    tails, and no query is run per row.
+
+    Attributes:
+        tablename (str): The name of the table in the database where the monthly roster data is stored.
+
+    Methods:
+        horizon() -> Optional[tuple[date, date]]:
+            Returns the first and last dates of the published roster, or None when it is empty.
+
+        load(start: date, end: date) -> dict[str, pd.DataFrame]:
+            Reads the rostered legs, the schedule, the crew and the fleet for a horizon into data frames.
+
+        gini(values: np.ndarray) -> float:
+            Returns the Gini coefficient of a set of workloads; 0 is perfectly even.
+
+        summarise(start: date, end: date, frames: dict = None) -> dict:
+            Computes coverage, per-crew, per-tail and fairness statistics for a horizon.
+    """
+
+    tablename = "monthly_roster"
+
+    @staticmethod
+    def horizon():
+        read_db.execute(f"SELECT MIN(date), MAX(date) FROM {RosterAnalytics.tablename}")
+        first, last = read_db.fetchall()[0]
+        if first is None:
+            return None
+        return first, last
+
+    @staticmethod
+    def load(start: date, end: date) -> dict:
+        """
+        Reads everything needed to analyse a horizon into data frames.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Returns:
+            dict[str, pd.DataFrame]: A dictionary with the following keys:
+                - legs: day (int, days since 'start'), flight_no, msn, p1, p2, dep, arr and block, in minutes.
+                - flights: flight_no, dep, arr and block of the daily schedule, in minutes.
+                - crew: staffid, role ('P1' or 'P2') and base of every crew member with the availability flag set.
+                - fleet: msn and actype of every aircraft.
+
+        Note:
+            - Times are converted to minutes after midnight in SQL, and legs arriving past midnight get 1440 added, so
+              durations are plain integer differences.
+        """
+        read_db.execute(
+            """SELECT flight_no, TIME_TO_SEC(dep_time) DIV 60, TIME_TO_SEC(arr_time) DIV 60
+            FROM flights"""
+        )
+        flights = pd.DataFrame(read_db.fetchall(), columns=["flight_no", "dep", "arr"], dtype="int64")
+        flights["arr"] += np.where(flights["arr"] < flights["dep"], 1440, 0)
+        flights["block"] = flights["arr"] - flights["dep"]
+
+        read_db.execute(
+            f"""SELECT DATEDIFF(date, %s), flight_no, aircraft_msn, COALESCE(p1_id, 0), COALESCE(p2_id, 0)
+            FROM {RosterAnalytics.tablename}
+            WHERE date BETWEEN %s AND %s""",
+            (start, start, end),
+        )
+        legs = pd.DataFrame(
+            read_db.fetchall(), columns=["day", "flight_no", "msn", "p1", "p2"], dtype="int64"
+        )
+        legs = legs.merge(flights, on="flight_no", how="inner")
+
+        read_db.execute(
+            """SELECT staffid,
+                CASE WHEN designation IN ('Commander','Sr Commander','LTC','TRI','DE') THEN 'P1' ELSE 'P2' END,
+                base_ops
+            FROM flight_crew
+            WHERE availability=1"""
+        )
+        crew = pd.DataFrame(read_db.fetchall(), columns=["staffid", "role", "base"])
+
+        read_db.execute("SELECT msn, type FROM aircraft_fleet")
+        fleet = pd.DataFrame(read_db.fetchall(), columns=["msn", "actype"])
+        return {"legs": legs, "flights": flights, "crew": crew, "fleet": fleet}
+
+    @staticmethod
+    def gini(values: np.ndarray) -> float:
+        values = np.sort(np.asarray(values, dtype="float64"))
+        n = len(values)
+        if n == 0 or values.sum() == 0:
+            return 0.0
+        ranks = np.arange(1, n + 1)
+        return float((2 * (ranks * values).sum()) / (n * values.sum()) - (n + 1) / n)
+
+    @staticmethod
+    def summarise(start: date, end: date, frames: dict = None) -> dict:
+        """
+        Computes coverage, workload and fairness statistics for a roster horizon.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+            frames (dict, optional): Data frames as returned by 'load'. Read from the database when omitted.
+
+        Returns:
+            dict: A dictionary with the following keys:
+                - start, end (str): The horizon as ISO dates.
+                - coverage (dict): Scheduled, rostered and unassigned leg counts, and the share rostered.
+                - unassigned (list[dict]): flight_no and days_missed for every flight left unrostered at least once,
+                  most days missed first.
+                - crew (list[dict]): staffid, role, base, flights, duty_days, block_minutes and duty_minutes for every
+                  available crew member, busiest first.
+                - tails (list[dict]): msn, actype, legs, block_hours and hours_per_day for every aircraft, busiest first.
+                - fairness (dict): For 'P1' and 'P2', the mean, standard deviation, coefficient of variation, Gini
+                  coefficient, minimum and maximum of duty minutes per crew member.
+
+        Note:
+            - Duty minutes per crew member and day run from REPORT_BEFORE the first departure to RELEASE_AFTER the
+              last arrival, as in 'CrewPairing'.
+            - Crew and aircraft with no legs are kept with zero workload, so they count towards fairness.
+        """
+        if frames is None:
+            frames = RosterAnalytics.load(start, end)
+        legs, flights, crew, fleet = frames["legs"], frames["flights"], frames["crew"], frames["fleet"]
+        days = (end - start).days + 1
+
+        # Coverage: every (day, flight) pair of the schedule that has no roster row
+        scheduled = days * len(flights)
+        perFlight = legs.groupby("flight_no").size().reindex(flights["flight_no"], fill_value=0)
+        missed = (days - perFlight)[lambda missing: missing > 0].sort_values(ascending=False)
+        unassigned = int(missed.sum())
+
+        # Per crew: one row per crew member per leg, then per duty day, then per crew member
+        duties = pd.DataFrame(
+            {
+                "staffid": np.concatenate([legs["p1"].to_numpy(), legs["p2"].to_numpy()]),
+                "day": np.tile(legs["day"].to_numpy(), 2),
+                "dep": np.tile(legs["dep"].to_numpy(), 2),
+                "arr": np.tile(legs["arr"].to_numpy(), 2),
+                "block": np.tile(legs["block"].to_numpy(), 2),
+            }
+        )
+        duties = duties[duties["staffid"] != 0]
+        dutyDays = duties.groupby(["staffid", "day"]).agg(
+            first=("dep", "min"), last=("arr", "max"), block=("block", "sum"), flights=("dep", "size")
+        )
+        overhead = CrewPairing.REPORT_BEFORE + CrewPairing.RELEASE_AFTER
+        dutyDays["duty"] = dutyDays["last"] - dutyDays["first"] + overhead
+        perCrew = dutyDays.groupby(level="staffid").agg(
+            flights=("flights", "sum"),
+            duty_days=("duty", "size"),
+            block_minutes=("block", "sum"),
+            duty_minutes=("duty", "sum"),
+        )
+        perCrew = (
+            crew.set_index("staffid")
+            .join(perCrew, how="outer")
+            .fillna({"flights": 0, "duty_days": 0, "block_minutes": 0, "duty_minutes": 0})
+            .astype({"flights": "int64", "duty_days": "int64", "block_minutes": "int64", "duty_minutes": "int64"})
+            .sort_values("duty_minutes", ascending=False)
+            .reset_index()
+        )
+
+        # Per tail
+        perTail = legs.groupby("msn").agg(legs=("block", "size"), block=("block", "sum"))
+        perTail = (
+            fleet.set_index("msn")
+            .join(perTail, how="outer")
+            .fillna({"legs": 0, "block": 0})
+            .astype({"legs": "int64"})
+        )
+        perTail["block_hours"] = (perTail["block"] / 60).round(1)
+        perTail["hours_per_day"] = (perTail["block"] / 60 / days).round(2)
+        perTail = perTail.drop(columns="block").sort_values("block_hours", ascending=False).reset_index()
+
+        fairness = {}
+        for role, group in perCrew.groupby("role"):
+            duty = group["duty_minutes"].to_numpy()
+            mean = float(duty.mean())
+            fairness[role] = {
+                "crew": len(duty),
+                "mean": round(mean, 1),
+                "std": round(float(duty.std()), 1),
+                "cv": round(float(duty.std()) / mean, 3) if mean else 0.0,
+                "gini": round(RosterAnalytics.gini(duty), 3),
+                "min": int(duty.min()),
+                "max": int(duty.max()),
+            }
+
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "coverage": {
+                "scheduled": scheduled,
+                "rostered": int(len(legs)),
+                "unassigned": unassigned,
+                "share": round(len(legs) / scheduled, 4) if scheduled else 1.0,
+            },
+            "unassigned": [
+                {"flight_no": int(flight_no), "days_missed": int(count)} for flight_no, count in missed.items()
+            ],
+            "crew": perCrew.astype(object).where(perCrew.notna(), None).to_dict("records"),
+            "tails": perTail.astype(object).where(perTail.notna(), None).to_dict("records"),
+            "fairness": fairness,
+        }
@@ -0,0 +1,422 @@
+import csv
+import io
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from itertools import groupby
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from backend.connection import db, connection
+
+
+class RosterExport:
+    """
+    The 'RosterExport' class represents a utility class for exporting the monthly roster of every flight crew member at once.
+
+    The whole horizon is read in a single pass over 'monthly_roster', ordered by crew member, and every output format
+    is produced incrementally from that stream so memory stays flat regardless of the number of crew.
+
+    The network export has one row per rostered flight, for payroll and regulators. 'monthly_roster' is read with one
+    ordered query on an unbuffered cursor; names, registrations and flight details are joined in Python from lookup
+    maps loaded once (a few thousand entries), so the database streams plain roster rows. Rows are written out in
+    batches of BATCH_SIZE, so a year of about a million rows uses the same memory as a month.
+
+    Attributes:
+        tablename (str): The name of the table in the database where the monthly roster data is stored.
+        CSV_HEADER (list): The column headings written at the top of a CSV export.
+        NETWORK_SCHEMA (pa.Schema): The columns of the network export, with their Parquet types.
+        BATCH_SIZE (int): Rows fetched from the cursor, and written as one CSV chunk or Parquet row group, at a time.
+
+    Methods:
+        crewDuties(start: date, end: date) -> Iterator[tuple]:
+            Streams every rostered duty in the horizon, one row per crew member per flight, ordered by crew.
+
+        streamCSV(start: date, end: date) -> Iterator[str]:
+            Streams the roster of all crew members as a single CSV document.
+
+        streamICS(start: date, end: date) -> Iterator[bytes]:
+            Streams a ZIP bundle holding one iCalendar (.ics) file per crew member.
+
+        networkRows(start: date, end: date) -> Iterator[list[tuple]]:
+            Streams the roster of the whole network in batches, one row per rostered flight, ordered by date and flight.
+
+        streamNetworkCSV(start: date, end: date) -> Iterator[str]:
+            Streams the network roster as a CSV document.
+
+        streamNetworkXLSX(start: date, end: date) -> Iterator[bytes]:
+            Streams the network roster as an Excel workbook with one worksheet per month.
+
+        streamNetworkParquet(start: date, end: date) -> Iterator[bytes]:
+            Streams the network roster as a Parquet file.
+    """
+
+    tablename = "monthly_roster"
+
+    CSV_HEADER = [
+        "staff_id",
+        "name",
+        "role",
+        "date",
+        "flight_no",
+        "departure",
+        "arrival",
+        "dep_time",
+        "arr_time",
+        "aircraft_msn",
+    ]
+
+    NETWORK_SCHEMA = pa.schema(
+        [
+            ("date", pa.date32()),
+            ("flight_no", pa.int32()),
+            ("departure", pa.string()),
+            ("arrival", pa.string()),
+            ("dep_time", pa.string()),
+            ("arr_time", pa.string()),
+            ("aircraft_msn", pa.int32()),
+            ("regn", pa.string()),
+            ("aircraft_type", pa.string()),
+            ("p1_id", pa.int32()),
+            ("p1_name", pa.string()),
+            ("p2_id", pa.int32()),
+            ("p2_name", pa.string()),
+        ]
+    )
+
+    BATCH_SIZE = 10000
+
+    @staticmethod
+    def crewDuties(start: date, end: date):
+        """
+        Streams every rostered duty between two dates, one row per crew member per flight.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Yields:
+            tuple: A tuple containing the following elements in order:
+                - staffid (int): The SAP (Staff ID) of the crew member.
+                - name (str): The full name of the crew member.
+                - role (str): 'P1' or 'P2'.
+                - date (date): The date of the flight.
+                - flight_no (int): The flight number.
+                - departure (str): The departure station IATA code.
+                - arrival (str): The arrival station IATA code.
+                - dep_time (timedelta): The departure time as an offset from midnight.
+                - arr_time (timedelta): The arrival time as an offset from midnight.
+                - aircraft_msn (int): The MSN of the aircraft assigned to the flight.
+
+        Note:
+            - P1 and P2 duties are merged with UNION ALL and sorted by crew on the server, so the rows for one crew member
+              arrive contiguously and the export never runs a query per pilot.
+            - A dedicated unbuffered cursor is used so rows are pulled from the server as they are consumed.
+        """
+        query = f"""SELECT crew, name, role, date, flight_no, departure, arrival, dep_time, arr_time, aircraft_msn
+            FROM (
+                SELECT r.p1_id AS crew, CONCAT(fc.fname, ' ', fc.lname) AS name, 'P1' AS role, r.date,
+                    r.flight_no, f.departure, f.arrival, f.dep_time, f.arr_time, r.aircraft_msn
+                FROM {RosterExport.tablename} r
+                    JOIN flights f ON r.flight_no = f.flight_no
+                    JOIN flight_crew fc ON r.p1_id = fc.staffid
+                WHERE r.date BETWEEN %s AND %s
+                UNION ALL
+                SELECT r.p2_id, CONCAT(fc.fname, ' ', fc.lname), 'P2', r.date,
+                    r.flight_no, f.departure, f.arrival, f.dep_time, f.arr_time, r.aircraft_msn
+                FROM {RosterExport.tablename} r
+                    JOIN flights f ON r.flight_no = f.flight_no
+                    JOIN flight_crew fc ON r.p2_id = fc.staffid
+                WHERE r.date BETWEEN %s AND %s
+            ) AS duties
+            ORDER BY crew, date, dep_time"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, (start, end, start, end))
+            for row in cursor:
+                yield row
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def streamCSV(start: date, end: date):
+        """
+        Streams the roster of all crew members between two dates as a single CSV document.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Yields:
+            str: Chunks of CSV text, one chunk per crew member, preceded by the header row.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(RosterExport.CSV_HEADER)
+        for _, duties in groupby(RosterExport.crewDuties(start, end), key=lambda row: row[0]):
+            for duty in duties:
+                writer.writerow(
+                    [
+                        duty[0],
+                        duty[1],
+                        duty[2],
+                        duty[3].isoformat(),
+                        duty[4],
+                        duty[5],
+                        duty[6],
+                        RosterExport._hhmm(duty[7]),
+                        RosterExport._hhmm(duty[8]),
+                        duty[9],
+                    ]
+                )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    @staticmethod
+    def streamICS(start: date, end: date):
+        """
+        Streams a ZIP bundle holding one iCalendar (.ics) file per crew member.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Yields:
+            bytes: Chunks of the ZIP archive. A chunk is emitted after every crew member's calendar is written.
+
+        Note:
+            - The archive is written to a non-seekable sink, so zipfile emits data descriptors and never needs to go back
+              and patch earlier entries. Only the calendar of the crew member being written is held in memory.
+        """
+        sink = _ChunkSink()
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for staffid, duties in groupby(RosterExport.crewDuties(start, end), key=lambda row: row[0]):
+                with bundle.open(f"{staffid}.ics", mode="w") as ics:
+                    ics.write(RosterExport._calendar(staffid, duties, stamp).encode())
+                yield sink.drain()
+        yield sink.drain()
+
+    @staticmethod
+    def _lookups() -> tuple:
+        db.execute("SELECT staffid, CONCAT(fname, ' ', lname) FROM flight_crew")
+        crew = dict(db.fetchall())
+        db.execute("SELECT msn, regn, type FROM aircraft_fleet")
+        fleet = {msn: (regn, actype) for msn, regn, actype in db.fetchall()}
+        db.execute(
+            """SELECT flight_no, departure, arrival, TIME_FORMAT(dep_time, '%H:%i'), TIME_FORMAT(arr_time, '%H:%i')
+            FROM flights"""
+        )
+        flights = {row[0]: row[1:] for row in db.fetchall()}
+        connection.commit()
+        return crew, fleet, flights
+
+    @staticmethod
+    def networkRows(start: date, end: date):
+        """
+        Streams the roster of the whole network between two dates, one row per rostered flight.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Yields:
+            list[tuple]: Batches of at most BATCH_SIZE rows, each holding the NETWORK_SCHEMA columns in order. Rows
+            come ordered by date, then flight number.
+
+        Note:
+            - Crew, aircraft and flights are read into dictionaries first. The roster query itself has no joins and
+              follows the primary key order, so the server streams it without sorting or building a temporary table.
+            - Details of a crew member, aircraft or flight deleted since the roster was published are left empty.
+        """
+        crew, fleet, flights = RosterExport._lookups()
+        missingFlight = (None, None, None, None)
+        missingAircraft = (None, None)
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"""SELECT date, flight_no, aircraft_msn, p1_id, p2_id FROM {RosterExport.tablename}
+                WHERE date BETWEEN %s AND %s ORDER BY date, flight_no""",
+                (start, end),
+            )
+            while True:
+                rows = cursor.fetchmany(RosterExport.BATCH_SIZE)
+                if not rows:
+                    break
+                yield [
+                    (
+                        day,
+                        flight_no,
+                        *flights.get(flight_no, missingFlight),
+                        msn,
+                        *fleet.get(msn, missingAircraft),
+                        p1,
+                        crew.get(p1),
+                        p2,
+                        crew.get(p2),
+                    )
+                    for day, flight_no, msn, p1, p2 in rows
+                ]
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def streamNetworkCSV(start: date, end: date):
+        """
+        Streams the network roster between two dates as a CSV document.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Yields:
+            str: Chunks of CSV text, one per batch of rows, preceded by the header row.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(RosterExport.NETWORK_SCHEMA.names)
+        for rows in RosterExport.networkRows(start, end):
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    @staticmethod
+    def streamNetworkXLSX(start: date, end: date):
+        """
+        Streams the network roster between two dates as an Excel workbook.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Yields:
+            bytes: Chunks of the .xlsx file.
+
+        Note:
+            - The workbook is opened write-only, so openpyxl spills every worksheet to a temporary file as rows are
+              added instead of keeping cells in memory. An XLSX archive can only be finished once all sheets are
+              written, so the file is built on disk and then sent in chunks.
+            - Each month gets its own worksheet, which also keeps a year clear of Excel's limit of 1,048,576 rows
+              per sheet.
+        """
+        workbook = Workbook(write_only=True)
+        sheet = None
+        month = None
+        for rows in RosterExport.networkRows(start, end):
+            for row in rows:
+                if (row[0].year, row[0].month) != month:
+                    month = (row[0].year, row[0].month)
+                    sheet = workbook.create_sheet(title=row[0].strftime("%Y-%m"))
+                    sheet.append(RosterExport.NETWORK_SCHEMA.names)
+                sheet.append(row)
+        if sheet is None:
+            workbook.create_sheet(title="Roster").append(RosterExport.NETWORK_SCHEMA.names)
+
+        with tempfile.TemporaryFile() as output:
+            workbook.save(output)
+            output.seek(0)
+            while True:
+                chunk = output.read(1 << 20)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def streamNetworkParquet(start: date, end: date):
+        """
+        Streams the network roster between two dates as a Parquet file.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Yields:
+            bytes: Chunks of the Parquet file, one per row group of at most BATCH_SIZE rows, then the footer.
+        """
+        schema = RosterExport.NETWORK_SCHEMA
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            for rows in RosterExport.networkRows(start, end):
+                columns = zip(*rows)
+                writer.write_table(
+                    pa.Table.from_arrays(
+                        [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+                    )
+                )
+                yield sink.drain()
+        yield sink.drain()
+
+    @staticmethod
+    def _calendar(staffid: int, duties, stamp: str) -> str:
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//CrewOps Pro//Monthly Roster//EN",
+            "CALSCALE:GREGORIAN",
+        ]
+        for duty in duties:
+            depart = datetime.combine(duty[3], datetime.min.time()) + duty[7]
+            arrive = datetime.combine(duty[3], datetime.min.time()) + duty[8]
+            # Overnight flights land on the following day
+            if arrive < depart:
+                arrive += timedelta(days=1)
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{duty[3].isoformat()}-{duty[4]}-{staffid}@crewopspro",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{depart.strftime('%Y%m%dT%H%M%S')}",
+                f"DTEND:{arrive.strftime('%Y%m%dT%H%M%S')}",
+                f"SUMMARY:{duty[4]} {duty[5]}-{duty[6]} ({duty[2]})",
+                f"LOCATION:{duty[5]}",
+                f"DESCRIPTION:{'Capt' if duty[2] == 'P1' else 'F/O'} {duty[1]} - Aircraft MSN {duty[9]}",
+                "END:VEVENT",
+            ]
+        lines.append("END:VCALENDAR")
+        return "\r\n".join(RosterExport._fold(line) for line in lines) + "\r\n"
+
+    @staticmethod
+    def _fold(line: str) -> str:
+        # RFC 5545 3.1: lines over 75 octets continue on lines starting with a space, never splitting a character
+        parts, current, octets = [], "", 0
+        for char in line:
+            size = len(char.encode())
+            if octets + size > 75:
+                parts.append(current)
+                current, octets = " ", 1
+            current += char
+            octets += size
+        parts.append(current)
+        return "\r\n".join(parts)
+
+    @staticmethod
+    def _hhmm(value: timedelta) -> str:
+        minutes = int(value.total_seconds()) // 60
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only, non-seekable byte sink that hands back whatever was written since the last drain
+    def __init__(self) -> None:
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        # Parquet records where each row group starts, which only needs the total written so far
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
@@ -0,0 +1,190 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from backend.connection import dedicated
+from roster import Roster
+from roster_profile import RosterProfile
+
+
+class JobCancelled(Exception):
+    """Raised inside a roster build when its job has been cancelled."""
+
+
+class RosterJobs:
+    """
+    The 'RosterJobs' class represents a local job queue that builds monthly rosters in the background.
+
+    Submitting a build returns a job ID straight away. The build runs on a single worker thread with its own database
+    connection, so builds are serialised and never share a cursor with request handlers. The job's progress (days done,
+    pairings made, ETA), its outcome and its result can be polled through 'status'.
+
+    When the app runs as several worker processes, every state change is also written to a small JSON file in JOBS_DIR,
+    so a poll or a cancel that lands on another worker still finds the job. A cancel from another worker leaves a
+    marker file that the build checks after every day. Builds take an exclusive lock on JOBS_DIR, so only one roster is
+    built at a time across the whole host.
+
+    Attributes:
+        MAX_JOBS (int): How many finished jobs are remembered before the oldest are forgotten.
+        JOBS_DIR (str): The directory shared by all workers for job state. Set CREWOPS_JOBS_DIR to change it.
+
+    Methods:
+        submit(month: int, profile: bool = False) -> str:
+            Queues a roster build for a month and returns its job ID. With 'profile', the build is profiled stage by
+            stage and with cProfile, and the report is kept on the job and saved under RosterProfile.PROFILE_DIR.
+
+        status(jobId: str) -> Optional[dict]:
+            Returns a snapshot of a job's state, or None for an unknown job.
+
+        cancel(jobId: str) -> bool:
+            Asks a queued or running job to stop. Returns False if the job is unknown or already finished.
+    """
+
+    MAX_JOBS = 50
+    JOBS_DIR = os.environ.get(
+        "CREWOPS_JOBS_DIR", os.path.join(tempfile.gettempdir(), "crewops-roster-jobs")
+    )
+
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="roster-job")
+    _jobs = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def submit(month: int, profile: bool = False) -> str:
+        jobId = uuid.uuid4().hex
+        job = {
+            "id": jobId,
+            "month": month,
+            "profiled": profile,
+            "profile": None,
+            "status": "queued",
+            "days_done": 0,
+            "days_total": None,
+            "pairings": 0,
+            "eta_seconds": None,
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "rows": None,
+            "uncovered": None,
+            "error": None,
+            "cancel": threading.Event(),
+        }
+        with RosterJobs._lock:
+            RosterJobs._jobs[jobId] = job
+            while len(RosterJobs._jobs) > RosterJobs.MAX_JOBS:
+                oldest = next(iter(RosterJobs._jobs.values()))
+                if oldest["finished"] is None:
+                    break
+                RosterJobs._forget(RosterJobs._jobs.popitem(last=False)[0])
+        RosterJobs._save(job)
+        RosterJobs._executor.submit(RosterJobs._run, job)
+        return jobId
+
+    @staticmethod
+    def _path(jobId: str, suffix: str = ".json") -> str:
+        return os.path.join(RosterJobs.JOBS_DIR, jobId + suffix)
+
+    @staticmethod
+    def _save(job: dict) -> None:
+        os.makedirs(RosterJobs.JOBS_DIR, exist_ok=True)
+        path = RosterJobs._path(job["id"])
+        with open(path + ".tmp", "w") as file:
+            json.dump(RosterJobs._snapshot(job), file)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def _forget(jobId: str) -> None:
+        for suffix in (".json", ".cancel"):
+            try:
+                os.remove(RosterJobs._path(jobId, suffix))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _cancelled(job: dict) -> bool:
+        return job["cancel"].is_set() or os.path.exists(RosterJobs._path(job["id"], ".cancel"))
+
+    @staticmethod
+    def _run(job: dict) -> None:
+        if RosterJobs._cancelled(job):
+            RosterJobs._finish(job, "cancelled")
+            return
+
+        def progress(daysDone: int, daysTotal: int, pairings: int) -> None:
+            if RosterJobs._cancelled(job):
+                raise JobCancelled()
+            elapsed = time.time() - job["started"]
+            job["days_done"] = daysDone
+            job["days_total"] = daysTotal
+            job["pairings"] = pairings
+            job["eta_seconds"] = round(elapsed / daysDone * (daysTotal - daysDone), 1)
+            RosterJobs._save(job)
+
+        try:
+            os.makedirs(RosterJobs.JOBS_DIR, exist_ok=True)
+            with open(os.path.join(RosterJobs.JOBS_DIR, "build.lock"), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                job["status"] = "running"
+                job["started"] = time.time()
+                RosterJobs._save(job)
+                profile = RosterProfile(enabled=job["profiled"], cprofile=True)
+                profile.start()
+                try:
+                    uncovered = []
+                    with dedicated():
+                        job["rows"] = Roster.addRoster(
+                            month=job["month"], progress=progress, profile=profile, uncovered=uncovered
+                        )
+                    job["uncovered"] = len(uncovered)
+                finally:
+                    profile.stop()
+                    if job["profiled"]:
+                        job["profile"] = profile.save(job["id"])
+            RosterJobs._finish(job, "done")
+        except JobCancelled:
+            RosterJobs._finish(job, "cancelled")
+        except Exception as error:
+            job["error"] = str(error)
+            RosterJobs._finish(job, "failed")
+
+    @staticmethod
+    def _finish(job: dict, status: str) -> None:
+        job["status"] = status
+        job["eta_seconds"] = 0 if status == "done" else None
+        job["finished"] = time.time()
+        RosterJobs._save(job)
+
+    @staticmethod
+    def _snapshot(job: dict) -> dict:
+        return {key: value for key, value in job.items() if key != "cancel"}
+
+    @staticmethod
+    def status(jobId: str):
+        job = RosterJobs._jobs.get(jobId)
+        if job is not None:
+            return RosterJobs._snapshot(job)
+        # Submitted through another worker process
+        if not jobId.isalnum():
+            return None
+        try:
+            with open(RosterJobs._path(jobId)) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def cancel(jobId: str) -> bool:
+        job = RosterJobs.status(jobId)
+        if job is None or job["finished"] is not None:
+            return False
+        if jobId in RosterJobs._jobs:
+            RosterJobs._jobs[jobId]["cancel"].set()
+        else:
+            open(RosterJobs._path(jobId, ".cancel"), "w").close()
+        return True
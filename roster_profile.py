@@ -0,0 +1,141 @@
+import cProfile
+import glob
+import io
+import json
+import os
+import pstats
+import tempfile
+import time
+from contextlib import contextmanager
+from backend.connection import counting
+
+
+class RosterProfile:
+    """
+    The 'RosterProfile' class represents the timings of one roster build, broken down by pipeline stage.
+
+    Each stage records its wall-clock time and the statements it ran through 'db'; stages entered more than once (e.g.
+    once per day) accumulate. The roster pipeline also reports how many pydantic models it built for each model class.
+    When 'cprofile' is set, the whole run is profiled with cProfile as well and the top functions are kept in the report.
+
+    A disabled profile (the default everywhere in the pipeline) makes every hook a no-op.
+
+    Attributes:
+        PROFILE_DIR (str): Where reports and cProfile dumps are saved. Set CREWOPS_PROFILE_DIR to change it.
+        TOP_FUNCTIONS (int): How many functions, by cumulative time, are kept from a cProfile run.
+
+    Methods:
+        start() -> None:
+            Starts the run clock, and cProfile when enabled.
+
+        stop() -> None:
+            Stops the run clock and cProfile.
+
+        stage(name: str) -> ContextManager[None]:
+            Times the body and counts its queries under a stage name.
+
+        models(name: str, count: int) -> None:
+            Records 'count' constructions of a model class.
+
+        report() -> dict:
+            Returns the stages, model counts, total time and cProfile summary.
+
+        save(runId: str) -> dict:
+            Writes the report (and the cProfile dump) to PROFILE_DIR and returns the report.
+
+        history(limit: int = 20) -> list[dict]:
+            Returns the most recently saved reports, newest first, so builds can be compared over time.
+    """
+
+    PROFILE_DIR = os.environ.get(
+        "CREWOPS_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "crewops-profiles")
+    )
+    TOP_FUNCTIONS = 25
+
+    def __init__(self, enabled: bool = True, cprofile: bool = False) -> None:
+        self.enabled = enabled
+        self.stages = {}
+        self.modelCounts = {}
+        self.started = None
+        self.seconds = None
+        self.profiler = cProfile.Profile() if enabled and cprofile else None
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        self.started = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self) -> None:
+        if not self.enabled or self.started is None:
+            return
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.seconds = time.perf_counter() - self.started
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        began = time.perf_counter()
+        with counting() as counter:
+            try:
+                yield
+            finally:
+                entry = self.stages.setdefault(
+                    name, {"seconds": 0.0, "calls": 0, "queries": 0, "batched_rows": 0}
+                )
+                entry["seconds"] += time.perf_counter() - began
+                entry["calls"] += 1
+                entry["queries"] += counter["queries"]
+                entry["batched_rows"] += counter["batched_rows"]
+
+    def models(self, name: str, count: int) -> None:
+        if self.enabled:
+            self.modelCounts[name] = self.modelCounts.get(name, 0) + count
+
+    def report(self) -> dict:
+        report = {
+            "seconds": None if self.seconds is None else round(self.seconds, 4),
+            "stages": [
+                {"name": name, **entry, "seconds": round(entry["seconds"], 4)}
+                for name, entry in self.stages.items()
+            ],
+            "models": dict(self.modelCounts),
+            "top_functions": None,
+        }
+        if self.profiler is not None:
+            text = io.StringIO()
+            pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(
+                RosterProfile.TOP_FUNCTIONS
+            )
+            report["top_functions"] = text.getvalue()
+        return report
+
+    def save(self, runId: str) -> dict:
+        report = self.report()
+        os.makedirs(RosterProfile.PROFILE_DIR, exist_ok=True)
+        if self.profiler is not None:
+            path = os.path.join(RosterProfile.PROFILE_DIR, runId + ".prof")
+            self.profiler.dump_stats(path)
+            report["dump"] = path
+        with open(os.path.join(RosterProfile.PROFILE_DIR, runId + ".json"), "w") as file:
+            json.dump(report, file, indent=2)
+        return report
+
+    @staticmethod
+    def history(limit: int = 20) -> list:
+        paths = sorted(
+            glob.glob(os.path.join(RosterProfile.PROFILE_DIR, "*.json")), key=os.path.getmtime, reverse=True
+        )
+        reports = []
+        for path in paths[:limit]:
+            with open(path) as file:
+                report = json.load(file)
+            report["run"] = os.path.splitext(os.path.basename(path))[0]
+            report["saved"] = os.path.getmtime(path)
+            report.pop("top_functions", None)
+            reports.append(report)
+        return reports
@@ -0,0 +1,252 @@
+import threading
+from bisect import bisect_left, bisect_right
+from cache_bus import CacheBus
+from backend.connection import connection
+from change_log import ChangeLog
+from flights import Flight
+from flight_schedule import FlightSchedule
+
+
+class RouteNetwork:
+    """
+    The 'RouteNetwork' class represents the daily schedule as a graph of stations, for questions such as "which flights
+    leave DEL between 06:00 and 09:00" or "how can a passenger or positioning crew get from BOM to CCU".
+
+    Every station keeps its departures as a list of (departure minute, flight number) sorted by time, so the flights
+    leaving in a time window are one binary search away. The flights themselves are kept by number with their stations
+    and times in minutes after midnight; a flight arriving before it departs lands on the following day.
+
+    The schedule repeats daily, so a window that runs past midnight continues at the start of the next day's list.
+    Connections are found by a depth-first search that, from each arrival, only looks at the departures between
+    MIN_CONNECT and MAX_CONNECT minutes later at that station.
+
+    The graph is built with one query on first use and then follows the change log, so 'Flight.addFlight' and
+    'Flight.deleteFlight' update one station list each instead of rebuilding the graph.
+
+    Attributes:
+        MIN_CONNECT (int): Default shortest time in minutes between arriving and departing on the next flight.
+        MAX_CONNECT (int): Longest time in minutes to wait at a station for a connection.
+        MAX_STOPS (int): Default most intermediate stops on a connection.
+
+    Methods:
+        stations() -> dict[str, list[str]]:
+            Returns every station with the stations it has direct flights to.
+
+        departures(station: str, start: int = 0, end: int = 1439) -> list[dict]:
+            Returns the flights leaving a station between two times, in departure order.
+
+        connections(origin: str, destination: str, after: int = 0, before: int = 1439, minConnect: int = None,
+                    maxStops: int = None, limit: int = 20) -> list[dict]:
+            Returns the itineraries from one station to another, earliest arrival first.
+
+        invalidate() -> None:
+            Drops the graph so it is rebuilt on next use.
+    """
+
+    MIN_CONNECT = 45
+    MAX_CONNECT = 360
+    MAX_STOPS = 1
+
+    _flights = {}  # flight_no -> (departure, arrival, dep_min, arr_min, actype)
+    _departures = {}  # station -> [(dep_min, flight_no), ...] sorted
+    _offset = None
+    _version = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def invalidate() -> None:
+        RouteNetwork._offset = None
+        CacheBus.publish("network")
+
+    @staticmethod
+    def _add(flight_no: int, departure: str, arrival: str, depMin: int, arrMin: int, actype: str) -> None:
+        RouteNetwork._remove(flight_no)
+        if arrMin < depMin:
+            arrMin += 1440
+        RouteNetwork._flights[flight_no] = (departure, arrival, depMin, arrMin, actype)
+        station = RouteNetwork._departures.setdefault(departure, [])
+        station.insert(bisect_left(station, (depMin, flight_no)), (depMin, flight_no))
+
+    @staticmethod
+    def _remove(flight_no: int) -> None:
+        flight = RouteNetwork._flights.pop(flight_no, None)
+        if flight is None:
+            return
+        station = RouteNetwork._departures[flight[0]]
+        del station[bisect_left(station, (flight[2], flight_no))]
+
+    @staticmethod
+    def _build() -> None:
+        offset = ChangeLog.latest()
+        schedule = FlightSchedule.load()
+        connection.commit()
+        RouteNetwork._flights, RouteNetwork._departures = {}, {}
+        stations, actypes = schedule.stations, schedule.actypes
+        for flight_no, departure, arrival, depMin, arrMin, actype in zip(
+            schedule.flightNo.tolist(),
+            schedule.departure.tolist(),
+            schedule.arrival.tolist(),
+            schedule.dep.tolist(),
+            schedule.arr.tolist(),
+            schedule.actype.tolist(),
+        ):
+            RouteNetwork._add(flight_no, stations[departure], stations[arrival], depMin, arrMin, actypes[actype])
+        RouteNetwork._offset = offset
+
+    @staticmethod
+    def _refresh() -> None:
+        version = CacheBus.version("network")
+        if RouteNetwork._offset is None or RouteNetwork._version != version:
+            RouteNetwork._build()
+            RouteNetwork._version = version
+        while True:
+            events = ChangeLog.since(RouteNetwork._offset)
+            if not events:
+                return
+            for event in events:
+                if event.entity != Flight.tablename:
+                    continue
+                if event.action == "delete":
+                    RouteNetwork._remove(int(event.key))
+                elif event.data and "dep" in event.data:
+                    data = event.data
+                    RouteNetwork._add(
+                        int(event.key),
+                        data["dep"],
+                        data["arr"],
+                        Flight.minutes(data["etd"]),
+                        Flight.minutes(data["eta"]),
+                        data["actype"],
+                    )
+            RouteNetwork._offset = events[-1].seq
+
+    @staticmethod
+    def _window(station: str, start: int, end: int):
+        # Departures between two absolute minutes; the daily list is repeated for every day the window touches
+        times = RouteNetwork._departures.get(station, [])
+        for day in range(start // 1440, end // 1440 + 1):
+            shift = day * 1440
+            low = bisect_left(times, (start - shift, -1))
+            high = bisect_right(times, (end - shift, float("inf")))
+            for depMin, flight_no in times[low:high]:
+                yield depMin + shift, flight_no
+
+    @staticmethod
+    def _leg(flight_no: int, departs: int) -> dict:
+        departure, arrival, depMin, arrMin, actype = RouteNetwork._flights[flight_no]
+        return {
+            "flight_no": flight_no,
+            "from": departure,
+            "to": arrival,
+            "actype": actype,
+            "departs": departs,
+            "arrives": departs + arrMin - depMin,
+        }
+
+    @staticmethod
+    def stations() -> dict:
+        with RouteNetwork._lock:
+            RouteNetwork._refresh()
+            routes = {station: set() for station in RouteNetwork._departures}
+            for departure, arrival, _, _, _ in RouteNetwork._flights.values():
+                routes[departure].add(arrival)
+            return {station: sorted(arrivals) for station, arrivals in sorted(routes.items())}
+
+    @staticmethod
+    def departures(station: str, start: int = 0, end: int = 1439) -> list:
+        """
+        Returns the flights leaving a station in a time window.
+
+        Parameters:
+            station (str): The IATA code of the station.
+            start (int, optional): The earliest departure, in minutes after midnight.
+            end (int, optional): The latest departure, in minutes after midnight (inclusive). A value below 'start'
+                makes the window run past midnight, e.g. 22:00 to 02:00.
+
+        Returns:
+            list[dict]: flight_no, from, to, actype, departs and arrives (minutes after midnight; 'arrives' exceeds
+            1439 for flights landing the next day) of every flight in the window, in departure order.
+        """
+        if end < start:
+            end += 1440
+        with RouteNetwork._lock:
+            RouteNetwork._refresh()
+            return [
+                RouteNetwork._leg(flight_no, departs)
+                for departs, flight_no in RouteNetwork._window(station.upper(), start, end)
+            ]
+
+    @staticmethod
+    def connections(
+        origin: str,
+        destination: str,
+        after: int = 0,
+        before: int = 1439,
+        minConnect: int = None,
+        maxStops: int = None,
+        limit: int = 20,
+    ) -> list:
+        """
+        Returns the itineraries from one station to another.
+
+        Parameters:
+            origin (str): The IATA code of the departure station.
+            destination (str): The IATA code of the arrival station.
+            after (int, optional): The earliest departure from 'origin', in minutes after midnight.
+            before (int, optional): The latest departure from 'origin', in minutes after midnight.
+            minConnect (int, optional): The shortest connecting time in minutes. Defaults to MIN_CONNECT.
+            maxStops (int, optional): The most intermediate stops. Defaults to MAX_STOPS.
+            limit (int, optional): The most itineraries to return.
+
+        Returns:
+            list[dict]: Each itinerary as a dictionary with the following keys, earliest arrival first, then fewest
+            stops:
+                - legs (list[dict]): The flights in order, as returned by 'departures'; times count on from the day of
+                  the first departure.
+                - departs, arrives (int): The first departure and last arrival, in the same minutes.
+                - minutes (int): The total journey time.
+                - stops (int): The number of intermediate stops.
+
+        Note:
+            - An itinerary never passes through the same station twice.
+        """
+        origin, destination = origin.upper(), destination.upper()
+        minConnect = RouteNetwork.MIN_CONNECT if minConnect is None else minConnect
+        maxStops = RouteNetwork.MAX_STOPS if maxStops is None else maxStops
+        if before < after:
+            before += 1440
+        found = []
+
+        def extend(legs: list, visited: set) -> None:
+            last = legs[-1]
+            if last["to"] == destination:
+                found.append(legs)
+                return
+            if len(legs) > maxStops:
+                return
+            ready = last["arrives"] + minConnect
+            for departs, flight_no in RouteNetwork._window(
+                last["to"], ready, last["arrives"] + RouteNetwork.MAX_CONNECT
+            ):
+                arrival = RouteNetwork._flights[flight_no][1]
+                if arrival not in visited:
+                    extend(legs + [RouteNetwork._leg(flight_no, departs)], visited | {arrival})
+
+        with RouteNetwork._lock:
+            RouteNetwork._refresh()
+            for departs, flight_no in RouteNetwork._window(origin, after, before):
+                arrival = RouteNetwork._flights[flight_no][1]
+                if arrival != origin:
+                    extend([RouteNetwork._leg(flight_no, departs)], {origin, arrival})
+
+        found.sort(key=lambda legs: (legs[-1]["arrives"], len(legs), legs[0]["departs"]))
+        return [
+            {
+                "legs": legs,
+                "departs": legs[0]["departs"],
+                "arrives": legs[-1]["arrives"],
+                "minutes": legs[-1]["arrives"] - legs[0]["departs"],
+                "stops": len(legs) - 1,
+            }
+            for legs in found[:limit]
+        ]
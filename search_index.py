@@ -0,0 +1,252 @@
+import threading
+from bisect import bisect_left
+from cache_bus import CacheBus
+from backend.connection import db, connection
+from change_log import ChangeLog
+
+
+class SearchIndex:
+    """
+    The 'SearchIndex' class represents an in-memory typeahead index over flight crew names, aircraft registrations and
+    flights (number and stations), so a record can be found without paging through the full lists.
+
+    Every record is indexed under a few lower-case terms, e.g. first name, last name and SAP for a crew member. Distinct
+    terms are kept in one sorted list, so the terms starting with a prefix are a contiguous range found by binary
+    search. Each term is also split into trigrams; a query with no prefix match falls back to the terms sharing the most
+    trigrams with it, which catches typos such as 'sharam' for 'sharma'.
+
+    The index is built with one query per table on first use and then kept current from the change log: each search
+    first applies the events recorded since the last one, adding, re-indexing or removing single records. It is only
+    rebuilt from scratch after 'invalidate' (e.g. a database restore).
+
+    Attributes:
+        KINDS (tuple): The kinds of record indexed: 'crew', 'aircraft' and 'flight'.
+        ENTITIES (dict): The kind of record kept for each change log entity.
+        SIMILARITY (float): The lowest trigram similarity (0-1) a fuzzy match needs.
+
+    Methods:
+        search(query: str, kinds: list = None, limit: int = 10) -> list[dict]:
+            Returns the records matching every word of a query, prefix matches first.
+
+        invalidate() -> None:
+            Drops the index so it is rebuilt on next use.
+    """
+
+    KINDS = ("crew", "aircraft", "flight")
+    ENTITIES = {"flight_crew": "crew", "aircraft_fleet": "aircraft", "flights": "flight"}
+    SIMILARITY = 0.35
+
+    _docs = {}  # (kind, key) -> (label, terms)
+    _postings = {}  # term -> set of (kind, key)
+    _terms = []  # every term in _postings, sorted
+    _grams = {}  # trigram -> set of terms
+    _offset = None
+    _version = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def invalidate() -> None:
+        SearchIndex._offset = None
+        CacheBus.publish("search")
+
+    @staticmethod
+    def _trigrams(term: str) -> set:
+        padded = f"  {term} "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def _crew(sap, fname, lname, desig, base) -> tuple:
+        terms = {str(sap)} | set(f"{fname or ''} {lname or ''}".lower().split())
+        return f"{fname} {lname} ({desig}, {base})", terms
+
+    @staticmethod
+    def _aircraft(msn, actype, regn) -> tuple:
+        regn = str(regn).upper()
+        terms = {str(msn), regn.lower(), regn.lower().replace("-", ""), str(actype).lower()}
+        return f"{regn} ({actype}, MSN {msn})", terms
+
+    @staticmethod
+    def _flight(flight_no, dep, arr) -> tuple:
+        terms = {str(flight_no), str(dep).lower(), str(arr).lower()}
+        return f"{flight_no} {dep}-{arr}", terms
+
+    @staticmethod
+    def _add(doc: tuple, label: str, terms: set) -> None:
+        SearchIndex._remove(doc)
+        SearchIndex._docs[doc] = (label, terms)
+        for term in terms:
+            docs = SearchIndex._postings.get(term)
+            if docs is None:
+                docs = SearchIndex._postings[term] = set()
+                position = bisect_left(SearchIndex._terms, term)
+                SearchIndex._terms.insert(position, term)
+                for gram in SearchIndex._trigrams(term):
+                    SearchIndex._grams.setdefault(gram, set()).add(term)
+            docs.add(doc)
+
+    @staticmethod
+    def _remove(doc: tuple) -> None:
+        entry = SearchIndex._docs.pop(doc, None)
+        if entry is None:
+            return
+        for term in entry[1]:
+            docs = SearchIndex._postings[term]
+            docs.discard(doc)
+            if not docs:
+                # Last record using the term, so the term leaves the sorted list and the trigram postings
+                del SearchIndex._postings[term]
+                del SearchIndex._terms[bisect_left(SearchIndex._terms, term)]
+                for gram in SearchIndex._trigrams(term):
+                    SearchIndex._grams[gram].discard(term)
+
+    @staticmethod
+    def _build() -> None:
+        # The offset is taken first, so changes made while reading are applied again afterwards; applying is idempotent
+        offset = ChangeLog.latest()
+        SearchIndex._docs, SearchIndex._postings, SearchIndex._terms, SearchIndex._grams = {}, {}, [], {}
+        db.execute("SELECT staffid, fname, lname, designation, base_ops FROM flight_crew")
+        crew = db.fetchall()
+        db.execute("SELECT msn, type, regn FROM aircraft_fleet")
+        fleet = db.fetchall()
+        db.execute("SELECT flight_no, departure, arrival FROM flights")
+        flights = db.fetchall()
+        connection.commit()
+
+        docs, postings = SearchIndex._docs, SearchIndex._postings
+        for kind, rows, describe in (
+            ("crew", crew, SearchIndex._crew),
+            ("aircraft", fleet, SearchIndex._aircraft),
+            ("flight", flights, SearchIndex._flight),
+        ):
+            for row in rows:
+                doc = (kind, row[0])
+                label, terms = describe(*row)
+                docs[doc] = (label, terms)
+                for term in terms:
+                    postings.setdefault(term, set()).add(doc)
+        SearchIndex._terms = sorted(postings)
+        grams = SearchIndex._grams
+        for term in SearchIndex._terms:
+            for gram in SearchIndex._trigrams(term):
+                grams.setdefault(gram, set()).add(term)
+        SearchIndex._offset = offset
+
+    @staticmethod
+    def _apply(event) -> None:
+        kind = SearchIndex.ENTITIES.get(event.entity)
+        if kind is None:
+            return
+        key = int(event.key)
+        if event.action == "delete":
+            SearchIndex._remove((kind, key))
+            return
+        data = event.data or {}
+        if kind == "crew" and "fname" in data:
+            label, terms = SearchIndex._crew(key, data["fname"], data["lname"], data["desig"], data["base_ops"])
+        elif kind == "aircraft" and "regn" in data:
+            label, terms = SearchIndex._aircraft(key, data["actype"], data["regn"])
+        elif kind == "flight" and "dep" in data:
+            label, terms = SearchIndex._flight(key, data["dep"], data["arr"])
+        else:
+            # e.g. an availability switch, which changes nothing searchable
+            return
+        SearchIndex._add((kind, key), label, terms)
+
+    @staticmethod
+    def _refresh() -> None:
+        version = CacheBus.version("search")
+        if SearchIndex._offset is None or SearchIndex._version != version:
+            SearchIndex._build()
+            SearchIndex._version = version
+        while True:
+            events = ChangeLog.since(SearchIndex._offset)
+            if not events:
+                return
+            for event in events:
+                SearchIndex._apply(event)
+            SearchIndex._offset = events[-1].seq
+
+    @staticmethod
+    def _prefixed(token: str) -> range:
+        terms = SearchIndex._terms
+        start = bisect_left(terms, token)
+        return range(start, bisect_left(terms, token + "\uffff", start))
+
+    @staticmethod
+    def _fuzzy(token: str) -> list:
+        grams = SearchIndex._trigrams(token)
+        shared = {}
+        for gram in grams:
+            for term in SearchIndex._grams.get(gram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        scored = [
+            (count / (len(grams) + len(SearchIndex._trigrams(term)) - count), term) for term, count in shared.items()
+        ]
+        return [term for score, term in sorted(scored, reverse=True) if score >= SearchIndex.SIMILARITY]
+
+    @staticmethod
+    def search(query: str, kinds: list = None, limit: int = 10) -> list:
+        """
+        Returns the records matching every word of a query.
+
+        Parameters:
+            query (str): What the user has typed so far, e.g. 'kan sh', 'vt-ex', '6012' or 'del'.
+            kinds (list[str], optional): Only return these kinds of record ('crew', 'aircraft', 'flight').
+            limit (int, optional): The most records to return.
+
+        Returns:
+            list[dict]: 'kind', 'key' (SAP, MSN or flight number) and 'label' of each match. Records where every word
+            is the start of one of their terms come first; fuzzy matches fill any remaining places.
+
+        Note:
+            - A word's prefix range is walked in sorted order and the walk stops once 'limit' records are found, so
+              short prefixes matching thousands of records cost no more than long ones. With several words, the one
+              with the fewest matching terms drives the walk and the others are checked per record.
+        """
+        tokens = query.lower().split()
+        if not tokens:
+            return []
+        kinds = set(kinds or SearchIndex.KINDS)
+        with SearchIndex._lock:
+            SearchIndex._refresh()
+            terms, postings, docs = SearchIndex._terms, SearchIndex._postings, SearchIndex._docs
+
+            def matchesAll(doc, words):
+                docTerms = docs[doc][1]
+                return all(any(term.startswith(word) for term in docTerms) for word in words)
+
+            ranges = sorted(((SearchIndex._prefixed(token), token) for token in tokens), key=lambda pair: len(pair[0]))
+            driver, others = ranges[0][0], [token for _, token in ranges[1:]]
+            found = []
+            seen = set()
+            for position in driver:
+                for doc in postings[terms[position]]:
+                    if doc in seen or doc[0] not in kinds:
+                        continue
+                    seen.add(doc)
+                    if matchesAll(doc, others):
+                        found.append(doc)
+                        if len(found) >= limit:
+                            break
+                if len(found) >= limit:
+                    break
+
+            if len(found) < limit:
+                # Fuzzy fallback on the longest word; the other words must still match as prefixes
+                longest = max(tokens, key=len)
+                if len(longest) >= 3:
+                    rest = list(tokens)
+                    rest.remove(longest)
+                    for term in SearchIndex._fuzzy(longest):
+                        for doc in postings[term]:
+                            if doc in seen or doc[0] not in kinds:
+                                continue
+                            seen.add(doc)
+                            if matchesAll(doc, rest):
+                                found.append(doc)
+                                if len(found) >= limit:
+                                    break
+                        if len(found) >= limit:
+                            break
+
+            return [{"kind": kind, "key": key, "label": docs[(kind, key)][0]} for kind, key in found[:limit]]
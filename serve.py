@@ -0,0 +1,92 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+"""
+Runs the CrewOps Pro application as several worker processes sharing one listening socket.
+
+The parent process binds the socket and forks the workers before the application is imported, so each worker opens
+its own database connection and builds its own in-memory caches. A worker serves one request at a time on that
+connection, so run as many workers as requests should be served at once. Caches stay coherent through 'CacheBus' and
+roster jobs through the shared job directory of 'RosterJobs', so any worker can answer any request. A worker that dies
+is replaced; SIGINT or SIGTERM stops them all.
+
+Usage:
+    CREWOPS_SECRET_KEY=... python serve.py --workers 4 --port 8000
+"""
+
+
+def runWorker(sock: socket.socket, host: str, port: int) -> None:
+    from werkzeug.serving import make_server
+    from app import app
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # One request at a time: the worker's requests share its single database connection, which is not thread-safe
+    server = make_server(host, port, app, threaded=False, fd=sock.fileno())
+    server.serve_forever()
+
+
+def spawn(sock: socket.socket, host: str, port: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            runWorker(sock, host, port)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve CrewOps Pro with several worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    if not os.environ.get("CREWOPS_SECRET_KEY"):
+        # Checked before forking, so the workers do not fail at import one after another
+        sys.exit("CREWOPS_SECRET_KEY is not set: set it to a long random value to sign the session cookies.")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+
+    workers = {spawn(sock, args.host, args.port) for _ in range(args.workers)}
+    stopping = False
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            # Back off briefly so a worker that fails at start-up does not spin the CPU
+            time.sleep(1)
+            workers.add(spawn(sock, args.host, args.port))
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from models.aircraft_model import AircraftModel
+from models.flights_model import FlightModel
+from roster import Roster
+
+
+class Simulation:
+    """
+    The 'Simulation' class represents a what-if mode for roster generation. A scenario is a set of hypothetical edits
+    (extra aircraft, crew on leave, new or cancelled routes) applied to an in-memory snapshot of the month; the roster
+    engine is then run over the edited snapshot and the outcome is measured. Nothing is written to the database.
+
+    The month is snapshotted once with 'Roster.snapshot'. Scenarios are independent, so they are run on a process pool,
+    one scenario per worker, each worker searching its pairings in-process.
+
+    A scenario is a dictionary with any of the following keys:
+        - addAircraft (list[dict]): {"actype": "A320", "count": 5} entries. Hypothetical tails are numbered from one
+          past the highest MSN in the fleet.
+        - removeAircraft (list[int]): MSNs taken out of service for the whole month.
+        - crewLeave (list[dict]): {"base": "DEL"} or {"sap": 12345678} entries, with optional ISO "start" and "end"
+          dates. The whole month when the dates are omitted.
+        - addFlights (list[dict]): New daily flights, with the fields of FlightModel.
+        - removeFlights (list[int]): Flight numbers dropped from the schedule.
+
+    Methods:
+        apply(snapshot: dict, scenario: dict) -> dict:
+            Returns a copy of a snapshot with a scenario's edits applied.
+
+        metrics(snapshot: dict, pairs: list) -> dict:
+            Measures the coverage and utilization of a generated roster.
+
+        run(snapshot: dict, scenario: dict) -> dict:
+            Applies a scenario, runs the roster engine and returns its metrics.
+
+        runAll(month: int, scenarios: dict) -> dict:
+            Runs many scenarios concurrently against one snapshot, together with an unedited baseline.
+    """
+
+    @staticmethod
+    def apply(snapshot: dict, scenario: dict) -> dict:
+        """
+        Returns a copy of a snapshot with a scenario's edits applied. The snapshot passed in is left unchanged.
+
+        Parameters:
+            snapshot (dict): A snapshot taken by 'Roster.snapshot'.
+            scenario (dict): The edits to apply, as described in the class docstring.
+
+        Returns:
+            dict: The edited snapshot.
+
+        Raises:
+            ValueError: If a hypothetical aircraft or flight fails model validation.
+        """
+        edited = dict(snapshot)
+        days = sorted(snapshot["busyCrew"])
+
+        removed = set(scenario.get("removeAircraft", ()))
+        fleet = [aircraft for aircraft in snapshot["fleet"] if aircraft.msn not in removed]
+        nextMsn = max((aircraft.msn for aircraft in snapshot["fleet"]), default=0) + 1
+        for entry in scenario.get("addAircraft", ()):
+            for _ in range(int(entry.get("count", 1))):
+                fleet.append(
+                    AircraftModel(
+                        msn=nextMsn,
+                        actype=entry["actype"],
+                        regn=f"SIM{nextMsn}",
+                        availability=True,
+                        engine=None,
+                        engine_hours=0,
+                    )
+                )
+                nextMsn += 1
+        edited["fleet"] = fleet
+
+        busyCrew = {day: set(saps) for day, saps in snapshot["busyCrew"].items()}
+        crew = snapshot["p1"] + snapshot["p2"]
+        for entry in scenario.get("crewLeave", ()):
+            if "base" in entry:
+                saps = {crewman.sap for crewman in crew if crewman.base_ops == entry["base"].upper()}
+            else:
+                saps = {int(entry["sap"])}
+            start = date.fromisoformat(entry["start"]) if entry.get("start") else days[0]
+            end = date.fromisoformat(entry["end"]) if entry.get("end") else days[-1]
+            day = start
+            while day <= end:
+                if day in busyCrew:
+                    busyCrew[day] |= saps
+                day += timedelta(days=1)
+        edited["busyCrew"] = busyCrew
+
+        edited["schedule"] = snapshot["schedule"].edited(
+            scenario.get("removeFlights", ()),
+            [FlightModel.model_validate(flight) for flight in scenario.get("addFlights", ())],
+        )
+        return edited
+
+    @staticmethod
+    def metrics(snapshot: dict, pairs: list) -> dict:
+        """
+        Measures the coverage and utilization of a generated roster.
+
+        Parameters:
+            snapshot (dict): The snapshot the roster was generated from.
+            pairs (list): The roster, as returned by 'Roster.generate'.
+
+        Returns:
+            dict: A dictionary with the following keys:
+                - legs_scheduled (int): Flights in the schedule times days rostered.
+                - legs_rostered (int): Flights that got a tail and a crew.
+                - coverage (float): Share of scheduled legs rostered, between 0 and 1.
+                - uncovered_flights (dict[int, int]): Days each flight went unrostered, for flights missed at least once.
+                - tails_used (int): Aircraft that flew at least one leg.
+                - block_hours_per_tail_day (float): Average daily block hours of the aircraft that flew.
+                - crew_used (int): Crew members who flew at least one leg.
+                - crew_available (int): Crew members in the snapshot.
+                - legs_per_crew (float): Average legs flown by each crew member who flew.
+                - max_legs_per_crew (int): Most legs flown by one crew member.
+        """
+        days = len(snapshot["busyCrew"])
+        schedule = snapshot["schedule"]
+        block = dict(zip(schedule.flightNo.tolist(), schedule.block.tolist()))
+        flown = {}
+        tailMinutes = {}
+        crewLegs = {}
+        for flt_date, flight_no, aircraft, p1, p2 in pairs:
+            flown[flight_no] = flown.get(flight_no, 0) + 1
+            tailMinutes[aircraft.msn] = tailMinutes.get(aircraft.msn, 0) + block[flight_no]
+            for crewman in (p1, p2):
+                crewLegs[crewman.sap] = crewLegs.get(crewman.sap, 0) + 1
+
+        scheduled = len(schedule) * days
+        return {
+            "legs_scheduled": scheduled,
+            "legs_rostered": len(pairs),
+            "coverage": round(len(pairs) / scheduled, 4) if scheduled else 1.0,
+            "uncovered_flights": {
+                flight_no: days - flown.get(flight_no, 0)
+                for flight_no in schedule.flightNo.tolist()
+                if flown.get(flight_no, 0) < days
+            },
+            "tails_used": len(tailMinutes),
+            "block_hours_per_tail_day": (
+                round(sum(tailMinutes.values()) / 60 / len(tailMinutes) / days, 2) if tailMinutes else 0.0
+            ),
+            "crew_used": len(crewLegs),
+            "crew_available": len(snapshot["p1"]) + len(snapshot["p2"]),
+            "legs_per_crew": round(sum(crewLegs.values()) / len(crewLegs), 2) if crewLegs else 0.0,
+            "max_legs_per_crew": max(crewLegs.values(), default=0),
+        }
+
+    @staticmethod
+    def run(snapshot: dict, scenario: dict) -> dict:
+        edited = Simulation.apply(snapshot, scenario)
+        # Scenarios already fill the pool, so each one searches its pairings in-process
+        pairs = Roster.generate(edited, parallel=False)
+        return Simulation.metrics(edited, pairs)
+
+    @staticmethod
+    def runAll(month: int, scenarios: dict) -> dict:
+        """
+        Runs many scenarios concurrently against one snapshot of a month.
+
+        Parameters:
+            month (int): The month to simulate.
+            scenarios (dict[str, dict]): Scenarios by name.
+
+        Returns:
+            dict[str, dict]: The metrics of every scenario by name, plus 'baseline' for the unedited snapshot.
+
+        Note:
+            - The database is read once, in the calling process. Workers only receive the snapshot.
+        """
+        snapshot = Roster.snapshot(month)
+        scenarios = {"baseline": {}, **scenarios}
+        names = list(scenarios)
+        workers = min(len(names), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                Simulation.run, [snapshot] * len(names), [scenarios[name] for name in names]
+            )
+            return dict(zip(names, results))
@@ -0,0 +1,180 @@
+import heapq
+from flight_schedule import FlightSchedule
+
+
+class TailAssignment:
+    """
+    The 'TailAssignment' class represents the engine that assigns aircraft (tails) to the flights of a day.
+
+    Legs of one aircraft type are chained into rotations: a leg can follow another when it departs from the station the
+    previous leg arrived at, no earlier than the minimum turnaround time after arrival. Each rotation is then given one
+    tail, preferring a tail that finished the previous day at the rotation's first station and is ready in time, then a
+    tail without a known position. Tails are never moved between stations without a flight, so the legs of a rotation
+    that neither kind of tail can take are reported as uncovered.
+
+    Both steps walk the legs once in departure order with a heap of ready aircraft per station, so a day runs in
+    O(n log n) for n legs.
+
+    Attributes:
+        MIN_TURNAROUND (dict): Minimum turnaround time in minutes per aircraft type.
+        DEFAULT_TURNAROUND (int): Minimum turnaround time in minutes for types missing from MIN_TURNAROUND.
+
+    Methods:
+        legs(schedule: FlightSchedule, actype: str) -> list[tuple]:
+            Returns the (dep_min, arr_min, departure, arrival, flight_no) legs of one aircraft type sorted by departure.
+
+        rotations(legs: list[tuple], turnaround: int) -> list[list[tuple]]:
+            Chains legs into aircraft rotations with station continuity and minimum turnaround.
+
+        assign(legs: list[tuple], actype: str, tails: list, positions: dict, turnaround: int = None,
+               uncovered: list = None) -> dict[int, Any]:
+            Assigns a tail to every leg of one aircraft type for one day.
+
+        assignDay(schedule: FlightSchedule, fleet: dict[str, list], positions: dict, uncovered: list = None)
+                  -> dict[int, Any]:
+            Assigns tails to all flights of a day, one aircraft type at a time.
+    """
+
+    MIN_TURNAROUND = {
+        "A320": 40,
+        "B737": 40,
+        "B787": 75,
+        "A350": 75,
+        "B777": 90,
+    }
+    DEFAULT_TURNAROUND = 45
+
+    @staticmethod
+    def legs(schedule: FlightSchedule, actype: str) -> list:
+        """
+        Returns the legs of one aircraft type sorted by departure time.
+
+        Parameters:
+            schedule (FlightSchedule): The daily schedule.
+            actype (str): The aircraft type.
+
+        Returns:
+            list[tuple]: (dep_min, arr_min, departure, arrival, flight_no) tuples. Flights arriving before they depart
+            are treated as landing on the following day, so 'arr_min' may exceed 1440.
+        """
+        return schedule.legs(actype)
+
+    @staticmethod
+    def rotations(legs: list, turnaround: int) -> list:
+        """
+        Chains legs into aircraft rotations.
+
+        Parameters:
+            legs (list[tuple]): Legs of a single aircraft type as returned by 'legs', sorted by departure.
+            turnaround (int): The minimum turnaround time in minutes.
+
+        Returns:
+            list[list[tuple]]: The rotations, each a list of legs in flying order, sorted by first departure.
+
+        Note:
+            - Every station keeps a min-heap of rotations waiting there, keyed by the time they are ready to leave.
+              A leg extends the rotation that has been ready the longest, or opens a new rotation if none is ready.
+        """
+        rotations = []
+        waiting = {}
+        for leg in legs:
+            depMin, arrMin, dep, arr, _ = leg
+            ready = waiting.get(dep)
+            if ready and ready[0][0] <= depMin:
+                _, index = heapq.heappop(ready)
+                rotations[index].append(leg)
+            else:
+                index = len(rotations)
+                rotations.append([leg])
+            heapq.heappush(waiting.setdefault(arr, []), (arrMin + turnaround, index))
+        return rotations
+
+    @staticmethod
+    def assign(
+        legs: list, actype: str, tails: list, positions: dict, turnaround: int = None, uncovered: list = None
+    ) -> dict:
+        """
+        Assigns a tail to every leg of one aircraft type for one day.
+
+        Parameters:
+            legs (list[tuple]): The day's legs of that type as returned by 'legs', sorted by departure.
+            actype (str): The aircraft type.
+            tails (list[AircraftModel]): The aircraft of that type available on the day.
+            positions (dict): Overnight positions from the previous day, mapping MSN to a (station, ready_min) tuple
+                where 'ready_min' is measured from this day's midnight. Updated in place for the next day.
+            turnaround (int, optional): The minimum turnaround time in minutes. Looked up by type when omitted.
+            uncovered (list, optional): Receives the flight number of every leg left without a tail.
+
+        Returns:
+            dict[int, AircraftModel]: A mapping of flight number to the assigned aircraft. Flights of rotations for
+            which no tail is left are missing from the mapping.
+
+        Note:
+            - Tails without a known position (first day, newly added or back from downtime) can start any rotation.
+            - A rotation with no tail ready at its first station, and no tail without a position left, is uncovered:
+              a tail parked at another station would need a ferry flight, which the schedule does not have.
+        """
+        if not legs:
+            return {}
+        if turnaround is None:
+            turnaround = TailAssignment.MIN_TURNAROUND.get(actype, TailAssignment.DEFAULT_TURNAROUND)
+
+        parked = {}
+        floating = []
+        for tail in tails:
+            if tail.msn in positions:
+                station, ready = positions[tail.msn]
+                heapq.heappush(parked.setdefault(station, []), (ready, tail.msn, tail))
+            else:
+                floating.append(tail)
+        floating.reverse()
+
+        assignment = {}
+        for rotation in TailAssignment.rotations(legs, turnaround):
+            firstDep, _, station, _, _ = rotation[0]
+            here = parked.get(station)
+            if here and here[0][0] <= firstDep:
+                tail = heapq.heappop(here)[2]
+            elif floating:
+                tail = floating.pop()
+            else:
+                if uncovered is not None:
+                    uncovered += [leg[4] for leg in rotation]
+                continue
+            for leg in rotation:
+                assignment[leg[4]] = tail
+            lastArr, lastStation = rotation[-1][1], rotation[-1][3]
+            positions[tail.msn] = (lastStation, lastArr + turnaround - 1440)
+
+        # Tails that stayed on the ground keep their station for the next day
+        for waiting in parked.values():
+            for ready, msn, _ in waiting:
+                positions[msn] = (positions[msn][0], ready - 1440)
+        return assignment
+
+    @staticmethod
+    def assignDay(schedule: FlightSchedule, fleet: dict, positions: dict, uncovered: list = None) -> dict:
+        """
+        Assigns tails to all flights of a day.
+
+        Parameters:
+            schedule (FlightSchedule): The daily schedule.
+            fleet (dict[str, list[AircraftModel]]): The aircraft available on the day, grouped by type.
+            positions (dict): Overnight positions as described in 'assign'. Updated in place for the next day.
+            uncovered (list, optional): Receives the flight number of every leg left without a tail.
+
+        Returns:
+            dict[int, AircraftModel]: A mapping of flight number to the assigned aircraft.
+        """
+        assignment = {}
+        for actype in schedule.actypes:
+            assignment.update(
+                TailAssignment.assign(
+                    TailAssignment.legs(schedule, actype),
+                    actype,
+                    fleet.get(actype, []),
+                    positions,
+                    uncovered=uncovered,
+                )
+            )
+        return assignment
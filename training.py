@@ -1,4 +1,6 @@
-from backend.connection import db, connection
+from datetime import date
+from backend.connection import db, read_db
+from change_log import ChangeLog
 from models.training_model import TrainingModel
 
 
@@ -11,6 +13,9 @@ class Training:
 
     Methods:
         addTraining(trgdata: list) -> None: Adds a new training record to the database.
+        addTrainings(trgdataList: list[list]) -> None: Adds many training records to the database in one transaction.
+        nextTrainingId() -> int: Returns the next unused training ID.
+        crewInTraining(start: date, end: date) -> dict[date, set[int]]: Returns the trainers and trainees busy on each date.
         viewTrainings() -> list: Retrieves a list of all training records from the database.
         deleteTraining(trgid: int) -> None: Deletes a training record from the database.
 
@@ -33,7 +38,63 @@ class Training:
         )
         query = f"INSERT INTO {Training.TABLENAME} (training_id, training_name, training_desc, trainer, trainee, date, location, duration) VALUES (%s,%s,%s,%s,%s,%s,%s,%s)"
         db.execute(query, tuple(training.model_dump().values()))
-        connection.commit()
+        ChangeLog.record(Training.TABLENAME, "add", training.training_id, training.model_dump())
+        ChangeLog.commit()
+
+    @staticmethod
+    def addTrainings(trgdataList: list) -> None:
+        """
+        Adds many training records to the database in one transaction.
+
+        Parameters:
+            trgdataList (list[list]): Training records, each in the same order as accepted by 'addTraining'.
+
+        Returns:
+            None
+        """
+        trainings = [
+            TrainingModel(
+                training_id=trgdata[0],
+                training_name=trgdata[1],
+                training_desc=trgdata[2],
+                trainer_id=trgdata[3],
+                trainee_id=trgdata[4],
+                training_date=trgdata[5],
+                location=trgdata[6],
+                duration=str(trgdata[7][0]) + ":" + str(trgdata[7][1]),
+            )
+            for trgdata in trgdataList
+        ]
+        query = f"INSERT INTO {Training.TABLENAME} (training_id, training_name, training_desc, trainer, trainee, date, location, duration) VALUES (%s,%s,%s,%s,%s,%s,%s,%s)"
+        db.executemany(query, [tuple(training.model_dump().values()) for training in trainings])
+        ChangeLog.recordMany(
+            Training.TABLENAME, "add", [(training.training_id, training.model_dump()) for training in trainings]
+        )
+        ChangeLog.commit()
+
+    @staticmethod
+    def nextTrainingId() -> int:
+        db.execute(f"SELECT COALESCE(MAX(training_id), 0) + 1 FROM {Training.TABLENAME}")
+        return db.fetchone()[0]  # type: ignore
+
+    @staticmethod
+    def crewInTraining(start: date, end: date) -> dict:
+        """
+        Returns the trainers and trainees who are busy with a training on each date between two dates.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Returns:
+            dict[date, set[int]]: A mapping of date to the SAPs (Staff IDs) in training on that date.
+        """
+        query = f"SELECT date, trainer, trainee FROM {Training.TABLENAME} WHERE date BETWEEN %s AND %s"
+        db.execute(query, (start, end))
+        busy = {}
+        for day, trainer, trainee in db.fetchall():
+            busy.setdefault(day, set()).update(sap for sap in (trainer, trainee) if sap is not None)
+        return busy
 
     @staticmethod
     def viewTrainings() -> list:
@@ -50,11 +111,12 @@ class Training:
                 flight_crew fc1
                 JOIN training t ON t.trainer = fc1.staffid
                 JOIN flight_crew fc2 ON t.trainee = fc2.staffid"""
-        db.execute(query)
-        return db.fetchall()
+        read_db.execute(query)
+        return read_db.fetchall()
 
     @staticmethod
     def deleteTraining(trgid: int) -> None:
         query = f"DELETE FROM {Training.TABLENAME} WHERE training_id={trgid}"
         db.execute(query)
-        connection.commit()
+        ChangeLog.record(Training.TABLENAME, "delete", trgid)
+        ChangeLog.commit()
@@ -0,0 +1,182 @@
+from datetime import date, timedelta
+from backend.connection import db
+from interval_index import Timeline
+
+
+class TrainingScheduler:
+    """
+    The 'TrainingScheduler' class represents a conflict-aware scheduler for pilot trainings.
+
+    It keeps one Timeline per crew member holding their rostered flight duties and already planned trainings, so a
+    trainer/trainee pair can be checked against both calendars with a binary search instead of being pulled off the
+    roster altogether.
+
+    Time is measured in minutes from 0001-01-01 (date.toordinal() * 1440 + minute of day).
+
+    Attributes:
+        TRAINING_START (int): Minute of the day at which training sessions start (09:00).
+        REPORT_BEFORE (int): Minutes before departure a crew member reports for a flight duty.
+        RELEASE_AFTER (int): Minutes after arrival a crew member is released from a flight duty.
+
+    Methods:
+        load(start: date, end: date) -> TrainingScheduler:
+            Builds a scheduler from the roster and trainings between two dates using two queries.
+
+        conflict(sap: int, day: date, duration: int) -> Optional[tuple[int, int]]:
+            Returns the busy block that clashes with a training session on the given day, or None.
+
+        earliestSlot(trainer: int, trainee: int, duration: int, fromDate: date, lastDate: date = None) -> Optional[date]:
+            Finds the earliest date on or after 'fromDate' when both trainer and trainee are free for the session.
+
+        book(trainer: int, trainee: int, day: date, duration: int) -> None:
+            Marks a session as busy time for both the trainer and the trainee.
+
+        scheduleBatch(sessions: list[dict], lastDate: date = None) -> tuple[list[tuple[dict, date]], list[dict]]:
+            Places many sessions at once, earliest requested date first, and returns placed and unplaced sessions.
+    """
+
+    TRAINING_START = 9 * 60
+    REPORT_BEFORE = 60
+    RELEASE_AFTER = 30
+
+    def __init__(self, timelines: dict = None) -> None:
+        self.timelines = timelines if timelines is not None else {}
+
+    @staticmethod
+    def minutes(day: date, offset: timedelta | int = 0) -> int:
+        if isinstance(offset, timedelta):
+            offset = int(offset.total_seconds()) // 60
+        return day.toordinal() * 1440 + offset
+
+    @staticmethod
+    def load(start: date, end: date) -> "TrainingScheduler":
+        """
+        Builds a scheduler from the rostered duties and trainings between two dates.
+
+        Parameters:
+            start (date): The first date of the horizon (inclusive).
+            end (date): The last date of the horizon (inclusive).
+
+        Returns:
+            TrainingScheduler: A scheduler holding one Timeline per crew member.
+
+        Note:
+            - Only two queries are issued, one for the roster and one for trainings, regardless of the number of crew.
+              Flight times come back as minutes after midnight, so nothing is parsed per row.
+            - A flight duty spans from REPORT_BEFORE minutes ahead of departure to RELEASE_AFTER minutes after arrival.
+              Flights arriving before they depart are treated as landing on the following day.
+        """
+        intervals = {}
+        db.execute(
+            """SELECT r.p1_id, r.p2_id, r.date, TIME_TO_SEC(f.dep_time) DIV 60, TIME_TO_SEC(f.arr_time) DIV 60
+            FROM monthly_roster r JOIN flights f ON r.flight_no = f.flight_no
+            WHERE r.date BETWEEN %s AND %s""",
+            (start - timedelta(days=1), end),
+        )
+        for p1, p2, day, dep, arr in db.fetchall():
+            depart = TrainingScheduler.minutes(day, dep)
+            arrive = TrainingScheduler.minutes(day, arr)
+            if arrive < depart:
+                arrive += 1440
+            duty = (depart - TrainingScheduler.REPORT_BEFORE, arrive + TrainingScheduler.RELEASE_AFTER)
+            for sap in (p1, p2):
+                if sap is not None:
+                    intervals.setdefault(sap, []).append(duty)
+
+        db.execute(
+            "SELECT trainer, trainee, date, duration FROM training WHERE date BETWEEN %s AND %s",
+            (start, end),
+        )
+        for trainer, trainee, day, duration in db.fetchall():
+            session = TrainingScheduler._session(day, int(duration.total_seconds()) // 60)
+            for sap in (trainer, trainee):
+                if sap is not None:
+                    intervals.setdefault(sap, []).append(session)
+
+        return TrainingScheduler(
+            {sap: Timeline.fromIntervals(busy) for sap, busy in intervals.items()}
+        )
+
+    @staticmethod
+    def _session(day: date, duration: int) -> tuple:
+        begin = TrainingScheduler.minutes(day, TrainingScheduler.TRAINING_START)
+        return begin, begin + duration
+
+    def _timeline(self, sap: int) -> Timeline:
+        return self.timelines.setdefault(sap, Timeline())
+
+    def conflict(self, sap: int, day: date, duration: int):
+        return self._timeline(sap).conflict(*TrainingScheduler._session(day, duration))
+
+    def earliestSlot(self, trainer: int, trainee: int, duration: int, fromDate: date, lastDate: date = None):
+        """
+        Finds the earliest date on or after 'fromDate' when both trainer and trainee are free for the session.
+
+        Parameters:
+            trainer (int): The SAP (Staff ID) of the trainer.
+            trainee (int): The SAP (Staff ID) of the trainee.
+            duration (int): The length of the session in minutes.
+            fromDate (date): The earliest acceptable date.
+            lastDate (date, optional): The latest acceptable date. Unbounded when omitted.
+
+        Returns:
+            Optional[date]: The first conflict-free date, or None if there is none up to 'lastDate'.
+
+        Note:
+            - Each probe is a binary search on both timelines. When a probe hits a busy block the search jumps straight
+              to the first day whose session would start after that block, so days are never scanned one by one.
+        """
+        timelines = (self._timeline(trainer), self._timeline(trainee))
+        day = fromDate
+        while lastDate is None or day <= lastDate:
+            begin, end = TrainingScheduler._session(day, duration)
+            blockEnd = None
+            for timeline in timelines:
+                clash = timeline.conflict(begin, end)
+                if clash is not None and (blockEnd is None or clash[1] > blockEnd):
+                    blockEnd = clash[1]
+            if blockEnd is None:
+                return day
+            nextDay = date.fromordinal((blockEnd - TrainingScheduler.TRAINING_START + 1439) // 1440)
+            day = max(nextDay, day + timedelta(days=1))
+        return None
+
+    def book(self, trainer: int, trainee: int, day: date, duration: int) -> None:
+        session = TrainingScheduler._session(day, duration)
+        self._timeline(trainer).add(*session)
+        self._timeline(trainee).add(*session)
+
+    def scheduleBatch(self, sessions: list, lastDate: date = None) -> tuple:
+        """
+        Places many training sessions at once.
+
+        Parameters:
+            sessions (list[dict]): Sessions to place. Each dict needs the keys 'trainer', 'trainee', 'duration'
+                (minutes) and 'from_date' (date); any other keys are passed through untouched.
+            lastDate (date, optional): The latest acceptable date for any session.
+
+        Returns:
+            tuple: A tuple containing the following elements in order:
+                - placed (list[tuple[dict, date]]): Each placed session with the date it was given.
+                - unplaced (list[dict]): Sessions for which no conflict-free date exists up to 'lastDate'.
+
+        Note:
+            - Sessions are placed in order of their requested date, and each placed session is booked before the next
+              one is searched, so sessions sharing a trainer or trainee never overlap each other.
+        """
+        placed = []
+        unplaced = []
+        for session in sorted(sessions, key=lambda s: s["from_date"]):
+            day = self.earliestSlot(
+                session["trainer"],
+                session["trainee"],
+                session["duration"],
+                session["from_date"],
+                lastDate,
+            )
+            if day is None:
+                unplaced.append(session)
+                continue
+            self.book(session["trainer"], session["trainee"], day, session["duration"])
+            placed.append((session, day))
+        return placed, unplaced